@@ -15,10 +15,13 @@ class UserAdmin(BaseUserAdmin):
     ordering = ["email"]
     list_display = ["email", "is_staff", "is_active"]
     search_fields = ["email"]
+    raw_id_fields = ["employee"]
 
     # Fieldsets per la pagina di modifica utente
     fieldsets = (
         (None, {"fields": ("email", "password")}),
+        # Collegamento al dipendente: decide cosa vede l'utente (sé stesso + riporti)
+        ("Dipendente", {"fields": ("employee",)}),
         (
             "Permessi",
             {
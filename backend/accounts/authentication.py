@@ -0,0 +1,180 @@
+"""Autenticazione JWT senza SELECT sulla tabella utenti a ogni request.
+
+JWTAuthentication di SimpleJWT, dopo aver verificato la firma del token,
+esegue comunque SELECT * FROM accounts_user WHERE id = @user_id: un round
+trip al DB per ogni API call, anche quando la risposta arriva dalla cache
+(dashboard). Eppure le view leggono quasi sempre solo tre cose: chi è
+l'utente, se è HR (is_staff) e quale dipendente è (lo scope).
+
+Queste informazioni viaggiano già firmate nel token (vedi accounts/serializers.py):
+ClaimsJWTAuthentication costruisce request.user dai claim, senza query.
+Il record completo viene caricato solo se una view legge un attributo che
+non è nel token (es. first_name), passando da una piccola cache LRU
+per-processo.
+
+Il prezzo: un cambio di ruolo o una disattivazione diventano effettivi al
+prossimo refresh del token (al massimo ACCESS_TOKEN_LIFETIME), perché il
+refresh rilegge l'utente e rifirma i claim.
+
+SQL analogy: invece di rileggere la riga utente a ogni statement, la
+sessione porta con sé un contesto firmato (come SESSION_CONTEXT in
+SQL Server, impostato una volta al login in sola lettura).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+# Claim firmati nel token in aggiunta a user_id (vedi serializers.add_user_claims)
+USER_CLAIMS = ("email", "is_staff", "is_superuser", "employee_id")
+
+
+def has_user_claims(validated_token):
+    return api_settings.USER_ID_CLAIM in validated_token and all(claim in validated_token for claim in USER_CLAIMS)
+
+
+class UserRecordCache:
+    """LRU per-processo dei record utente, con TTL.
+
+    Serve solo all'idratazione pigra di ClaimsUser: pochi utenti attivi
+    contemporaneamente, letture ripetute tra una request e l'altra.
+    MAX_ENTRIES e TTL sono letti a ogni uso, così i test possono sovrascriverli.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()  # user_id -> (user, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Ritorna l'utente dalla cache o lo carica dal DB (None se non esiste più)."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        # La query è fuori dal lock: un altro thread non aspetta il nostro round trip
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            with self._lock:
+                self._entries[user_id] = (user, time.monotonic() + settings.AUTH_USER_CACHE_TTL)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > settings.AUTH_USER_CACHE_MAX_ENTRIES:
+                    self._entries.popitem(last=False)
+        return user
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Istanza unica per processo (ogni worker gunicorn ha la sua)
+user_record_cache = UserRecordCache()
+
+
+class ClaimsUser(TokenUser):
+    """request.user built from the signed token claims, without a database query.
+
+    Identity, role (is_staff/is_superuser) and scope (employee_id) come
+    from the token. Any other attribute hydrates the full User record on
+    first access, through the per-process user_record_cache.
+    """
+
+    @cached_property
+    def email(self):
+        return self.token["email"]
+
+    @cached_property
+    def employee_id(self):
+        return self.token["employee_id"]
+
+    @cached_property
+    def user(self):
+        """Il record accounts.User completo (una query, poi cache per-processo)."""
+        user = user_record_cache.get(self.id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        return user
+
+    def __str__(self):
+        return self.email
+
+    def get_username(self):
+        # USERNAME_FIELD è email: TokenUser leggerebbe un claim "username" inesistente
+        return self.email
+
+    def __getattr__(self, attr):
+        # Chiamato solo per attributi non definiti sopra o in TokenUser.
+        # TokenUser ritornerebbe None per qualsiasi nome sconosciuto: qui invece
+        # deleghiamo al record vero, così first_name, employee, ecc. funzionano.
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
+
+    # I permessi Django non sono nel token: li calcola il record vero
+    # (TokenUser risponderebbe sempre False, anche per un superuser).
+    @property
+    def groups(self):
+        return self.user.groups
+
+    @property
+    def user_permissions(self):
+        return self.user.user_permissions
+
+    def get_group_permissions(self, obj=None):
+        return self.user.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None):
+        return self.user.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None):
+        return self.user.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self.user.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self.user.has_module_perms(module)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that trusts the signed claims instead of loading the user.
+
+    Tokens issued before the claims were added (no `employee_id` claim)
+    fall back to the standard database lookup until they expire.
+    """
+
+    def get_user(self, validated_token):
+        if not has_user_claims(validated_token):
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() per le view async (employees/async_views.py).
+
+        Firma e claim si verificano senza I/O: solo i token senza claim
+        passano dalla SELECT sull'utente, in un thread.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if has_user_claims(validated_token):
+            return ClaimsUser(validated_token), validated_token
+        return await sync_to_async(super().get_user)(validated_token), validated_token
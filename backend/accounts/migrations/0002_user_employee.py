@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-19 07:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("employees", "0009_employee_hierarchy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="employee",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="user",
+                to="employees.employee",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# La blacklist dei refresh token passa da Postgres (app token_blacklist di
+# SimpleJWT, rimossa da INSTALLED_APPS) a Redis (accounts/tokens.py).
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+OUTSTANDING_TABLE = "token_blacklist_outstandingtoken"
+BLACKLISTED_TABLE = "token_blacklist_blacklistedtoken"
+
+
+def copy_unexpired_blacklist(apps, schema_editor):
+    """Copia in Redis le revoche ancora valide, così i token già revocati restano inutilizzabili.
+
+    Solo i token non ancora scaduti (al massimo REFRESH_TOKEN_LIFETIME):
+    gli altri verrebbero rifiutati comunque per la scadenza.
+    Stesso formato di chiave di accounts.tokens.blacklist_key.
+    """
+    connection = schema_editor.connection
+    if BLACKLISTED_TABLE not in connection.introspection.table_names():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT o.jti, o.expires_at
+            FROM {BLACKLISTED_TABLE} b
+            JOIN {OUTSTANDING_TABLE} o ON o.id = b.token_id
+            WHERE o.expires_at > %s
+            """,  # nosec B608: nomi di tabella costanti
+            [timezone.now()],
+        )
+        rows = cursor.fetchall()
+    if not rows:
+        return
+
+    from django.core.cache import caches
+
+    cache = caches[settings.JWT_BLACKLIST_CACHE]
+    now = timezone.now()
+    for jti, expires_at in rows:
+        cache.set(f"jwt:blacklist:{jti}", 1, timeout=int((expires_at - now).total_seconds()) + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_user_employee"),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_unexpired_blacklist, migrations.RunPython.noop),
+        # Le tabelle crescevano di una riga per ogni refresh: via, insieme allo
+        # storico delle migration dell'app, così reinstallarla le ricrea da zero.
+        migrations.RunSQL(
+            sql=[
+                f"DROP TABLE IF EXISTS {BLACKLISTED_TABLE}",
+                f"DROP TABLE IF EXISTS {OUTSTANDING_TABLE}",
+                "DELETE FROM django_migrations WHERE app = 'token_blacklist'",
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -32,11 +32,21 @@ class User(AbstractUser):
     last_login, date_joined, groups, user_permissions.
 
     Phase 1: solo autenticazione (login/logout/refresh).
-    Phase 3 (US-012): aggiunta OneToOneField verso Employee per RBAC.
+    Phase 3 (US-012): OneToOneField verso Employee per RBAC.
+    I dati visibili a ogni utente sono filtrati da employees/scoping.py.
     """
 
     username = None  # Rimuove il campo username di AbstractUser
     email = models.EmailField(unique=True)
+    # Il dipendente che corrisponde a questo account (null per account tecnici/HR).
+    # employee_id viaggia con la riga dell'utente: nessuna query in più per lo scope.
+    employee = models.OneToOneField(
+        "employees.Employee",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="user",
+    )
 
     USERNAME_FIELD = "email"  # Campo usato per il login
     REQUIRED_FIELDS = []  # email è già required via USERNAME_FIELD
@@ -0,0 +1,9 @@
+"""Estensioni drf-spectacular per l'app accounts."""
+
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """Same Bearer scheme as SimpleJWT: only the server-side user lookup differs."""
+
+    target_class = "accounts.authentication.ClaimsJWTAuthentication"
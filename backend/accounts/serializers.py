@@ -0,0 +1,74 @@
+"""Serializer dei token JWT con i claim usati da ClaimsJWTAuthentication.
+
+Login e refresh sono gli unici momenti in cui si legge la riga utente:
+qui i dati che servono a ogni request (ruolo e scope) vengono firmati nel
+token, così le API call successive non devono più rileggerli.
+
+Tutti usano BlacklistableRefreshToken: la blacklist è su Redis (accounts/tokens.py).
+"""
+
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenBlacklistSerializer, TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import BlacklistableRefreshToken
+
+
+def add_user_claims(token, user):
+    """Firma nel token i claim letti da ClaimsUser (vedi authentication.USER_CLAIMS)."""
+    token["email"] = user.email
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    token["employee_id"] = user.employee_id
+    return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login: the refresh token (and every access token derived from it) carries the claims."""
+
+    token_class = BlacklistableRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh: re-reads the user once and re-signs the claims.
+
+    Without this, the claims would stay frozen at login time for the whole
+    life of the refresh token: a change of role, scope or a deactivation
+    would only apply after the next login. Re-signing here bounds the
+    staleness to ACCESS_TOKEN_LIFETIME at the cost of one query per refresh.
+    """
+
+    token_class = BlacklistableRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        add_user_claims(refresh, user)
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # SET NX su Redis: se un altro refresh ha già ruotato questo token
+            # (replay o doppio click), il secondo viene rifiutato.
+            if api_settings.BLACKLIST_AFTER_ROTATION and not refresh.blacklist():
+                raise TokenError("Token is blacklisted")
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+
+        return data
+
+
+class ClaimsTokenBlacklistSerializer(TokenBlacklistSerializer):
+    """Logout: revokes the refresh token in the Redis blacklist."""
+
+    token_class = BlacklistableRefreshToken
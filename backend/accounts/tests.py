@@ -3,8 +3,9 @@
 Testa il flusso completo JWT:
 - Login: POST {email, password} → {access, refresh}
 - Refresh: POST {refresh} → {access, refresh} (token rotation)
-- Logout: POST {refresh} → blacklist (il token non è più usabile)
+- Logout: POST {refresh} → blacklist su Redis (il token non è più usabile)
 - Protected endpoints: senza token → 401, con token → 200
+- Claims: ruolo e scope firmati nel token, nessuna SELECT sull'utente per request
 
 SQL analogy:
 - Login = CREATE SESSION con credenziali
@@ -13,10 +14,22 @@ SQL analogy:
 - 401 = DENY su endpoint protetto
 """
 
+import time
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from employees.models import Employee
+
+from .authentication import ClaimsUser
+from .tokens import BlacklistableRefreshToken, blacklist_key
 
 User = get_user_model()
 
@@ -141,6 +154,65 @@ class JWTLogoutTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class RedisTokenBlacklistTest(TestCase):
+    """The refresh-token blacklist lives in the cache (Redis) with a TTL, not in Postgres.
+
+    SQL analogy: niente tabella di revoche da ripulire con un job notturno:
+    ogni revoca ha la sua retention e sparisce quando il token scade.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create_user(email="admin@minijethr.local", password="securepass123")
+        response = self.client.post(
+            "/api/auth/login/",
+            {"email": "admin@minijethr.local", "password": "securepass123"},
+            format="json",
+        )
+        self.refresh_token = response.data["refresh"]
+
+    def refresh(self, token):
+        return self.client.post("/api/auth/refresh/", {"refresh": token}, format="json")
+
+    def test_rotated_token_expires_with_the_token(self):
+        token = BlacklistableRefreshToken(self.refresh_token)
+
+        with patch.object(cache, "add", wraps=cache.add) as cache_add:
+            self.assertEqual(self.refresh(self.refresh_token).status_code, status.HTTP_200_OK)
+
+        key, _value = cache_add.call_args.args
+        self.assertEqual(key, blacklist_key(token["jti"]))
+        # TTL = vita residua del token (1 giorno), non infinito
+        remaining = token["exp"] - int(time.time())
+        self.assertAlmostEqual(cache_add.call_args.kwargs["timeout"], remaining, delta=5)
+
+    def test_refresh_writes_nothing_to_the_database(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.refresh(self.refresh_token)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Solo la rilettura dell'utente per i claim, nessun INSERT di token
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertTrue(ctx.captured_queries[0]["sql"].startswith("SELECT"))
+
+    def test_rotated_token_cannot_be_reused(self):
+        self.assertEqual(self.refresh(self.refresh_token).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.refresh(self.refresh_token).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_concurrent_rotation_only_succeeds_once(self):
+        """Due refresh che superano entrambi il controllo: SET NX fa vincere solo il primo."""
+        token = BlacklistableRefreshToken(self.refresh_token)
+
+        self.assertTrue(token.blacklist())
+        self.assertFalse(token.blacklist())
+
+    def test_unavailable_blacklist_fails_closed(self):
+        with patch.object(cache, "get", side_effect=ConnectionError("redis down")):
+            response = self.refresh(self.refresh_token)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
 class JWTProtectedEndpointTest(TestCase):
     """Tests that API endpoints require authentication."""
 
@@ -170,3 +242,95 @@ class JWTProtectedEndpointTest(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
         response = self.client.get("/api/employees/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ClaimsAuthenticationTest(TestCase):
+    """Requests are authenticated from the signed token claims, without reading accounts_user.
+
+    SQL analogy: il contesto di sessione (ruolo, scope) viene firmato una volta
+    al login invece di rileggere la riga utente a ogni statement.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.employee = Employee.objects.create(
+            first_name="Mario",
+            last_name="Rossi",
+            email="mario.rossi@example.com",
+            hire_date="2024-01-15",
+        )
+        self.user = User.objects.create_user(
+            email="mario@minijethr.local",
+            password="securepass123",
+            first_name="Mario",
+            employee=self.employee,
+        )
+        self.tokens = self.login()
+
+    def login(self):
+        response = self.client.post(
+            "/api/auth/login/",
+            {"email": "mario@minijethr.local", "password": "securepass123"},
+            format="json",
+        )
+        return response.data
+
+    def use_token(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_access_token_carries_role_and_scope(self):
+        token = AccessToken(self.tokens["access"])
+
+        self.assertEqual(token["email"], "mario@minijethr.local")
+        self.assertFalse(token["is_staff"])
+        self.assertFalse(token["is_superuser"])
+        self.assertEqual(token["employee_id"], self.employee.pk)
+
+    def test_request_does_not_query_user_table(self):
+        self.use_token(self.tokens["access"])
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/employees/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Lo scope (solo sé stesso) arriva dal claim employee_id
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.employee.pk])
+        self.assertFalse(any("accounts_user" in query["sql"] for query in ctx.captured_queries))
+
+    def test_full_user_hydrated_lazily_and_cached_per_process(self):
+        token = AccessToken(self.tokens["access"])
+        request_user = ClaimsUser(token)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(request_user.first_name, "Mario")
+            self.assertEqual(request_user.date_joined, self.user.date_joined)
+        # Una nuova request dello stesso utente trova il record nella cache del processo
+        with self.assertNumQueries(0):
+            self.assertEqual(ClaimsUser(token).first_name, "Mario")
+
+    def test_refresh_re_signs_changed_claims(self):
+        self.user.is_staff = True
+        self.user.save()
+
+        response = self.client.post("/api/auth/refresh/", {"refresh": self.tokens["refresh"]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(AccessToken(response.data["access"])["is_staff"])
+        self.assertTrue(RefreshToken(response.data["refresh"])["is_staff"])
+
+    def test_refresh_rejected_for_deactivated_user(self):
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.post("/api/auth/refresh/", {"refresh": self.tokens["refresh"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_without_claims_falls_back_to_user_lookup(self):
+        """Token emessi prima dei claim: la request funziona, con la SELECT di una volta."""
+        self.use_token(str(AccessToken.for_user(self.user)))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/employees/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(any("accounts_user" in query["sql"] for query in ctx.captured_queries))
@@ -0,0 +1,82 @@
+"""Blacklist dei refresh token su Redis, con scadenza automatica.
+
+L'app token_blacklist di SimpleJWT salva in Postgres una riga
+OutstandingToken per ogni token emesso e una BlacklistedToken per ogni
+token revocato: con la rotazione attiva, ogni refresh scrive più righe e
+le tabelle crescono per sempre (serve un cron con flushexpiredtokens).
+
+Qui la blacklist è una chiave Redis per jti, con TTL pari alla vita
+residua del token: quando il token scadrebbe comunque, anche la chiave
+sparisce. Nessuna tabella, nessuna pulizia, e un refresh costa sempre
+due comandi Redis (GET + SET NX), qualunque sia lo storico dei login.
+
+SQL analogy: invece di una tabella di revoche con un job di purge
+notturno, una tabella temporale con retention automatica per riga.
+"""
+
+import logging
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+def blacklist_key(jti):
+    return f"jwt:blacklist:{jti}"
+
+
+def _blacklist_cache():
+    return caches[settings.JWT_BLACKLIST_CACHE]
+
+
+def is_blacklisted(jti):
+    """True se il jti è in blacklist.
+
+    Se Redis non risponde il token viene rifiutato (fail closed): meglio
+    un nuovo login che accettare un refresh token revocato.
+    """
+    try:
+        return _blacklist_cache().get(blacklist_key(jti)) is not None
+    except Exception as exc:
+        logger.warning("Token blacklist check failed: %s", exc)
+        raise TokenError("Token blacklist unavailable") from exc
+
+
+def blacklist_jti(jti, expires_at):
+    """Mette in blacklist un jti fino alla scadenza del token.
+
+    Ritorna False se il jti era già in blacklist. add() è atomico
+    (SET NX): se due refresh concorrenti presentano lo stesso token,
+    solo uno dei due lo ruota.
+    """
+    ttl = int(expires_at - datetime.now(timezone.utc).timestamp())
+    if ttl <= 0:
+        # Già scaduto: verrebbe rifiutato comunque, non serve ricordarlo
+        return True
+    try:
+        return _blacklist_cache().add(blacklist_key(jti), 1, timeout=ttl)
+    except Exception as exc:
+        logger.warning("Token blacklist insert failed: %s", exc)
+        raise TokenError("Token blacklist unavailable") from exc
+
+
+class BlacklistableRefreshToken(RefreshToken):
+    """Refresh token whose blacklist lives in the cache (Redis), not in Postgres.
+
+    Same interface as SimpleJWT's blacklist app: verify() rejects
+    blacklisted tokens and blacklist() revokes one.
+    """
+
+    def verify(self):
+        super().verify()
+        if is_blacklisted(self[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        """Revoca il token. False se era già stato revocato (es. refresh concorrente)."""
+        return blacklist_jti(self[api_settings.JTI_CLAIM], self["exp"])
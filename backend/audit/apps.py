@@ -0,0 +1,18 @@
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete, post_save
+
+
+class AuditConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "audit"
+
+    def ready(self):
+        from .models import AuditedModelMixin
+        from .services import capture_delete, capture_save
+
+        # Collega i receiver solo ai model che usano il mixin: gli altri
+        # model non pagano nemmeno la chiamata al signal.
+        for model in apps.get_models():
+            if issubclass(model, AuditedModelMixin):
+                post_save.connect(capture_save, sender=model, dispatch_uid=f"audit_save_{model._meta.label}")
+                post_delete.connect(capture_delete, sender=model, dispatch_uid=f"audit_delete_{model._meta.label}")
@@ -0,0 +1,38 @@
+"""Middleware che rende la request corrente visibile all'audit trail."""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .services import current_request
+
+
+class AuditActorMiddleware:
+    """Stores the current request in a context variable for the audit trail.
+
+    The user is read lazily when a row is saved: with JWT the user is
+    authenticated by DRF inside the view, after every middleware has run.
+    Sync and async capable, so it does not push async views into a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            current_request.reset(token)
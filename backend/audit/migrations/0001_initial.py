@@ -0,0 +1,115 @@
+# Generated by Django 5.1.15 on 2026-10-19 09:40
+
+from datetime import date
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+# Django non sa creare tabelle partizionate: la tabella è creata in SQL,
+# lo stato del model viene registrato separatamente (SeparateDatabaseAndState).
+#
+# PRIMARY KEY (id, changed_at): in PostgreSQL ogni vincolo UNIQUE di una
+# tabella partizionata deve includere la chiave di partizione.
+# Niente FK: la history deve sopravvivere alla cancellazione del dipendente.
+CREATE_TABLE_SQL = """
+CREATE SEQUENCE audit_auditentry_id_seq;
+
+CREATE TABLE audit_auditentry (
+    id bigint NOT NULL DEFAULT nextval('audit_auditentry_id_seq'),
+    changed_at timestamp with time zone NOT NULL,
+    model varchar(100) NOT NULL,
+    object_id bigint NOT NULL,
+    employee_id bigint NULL,
+    action varchar(10) NOT NULL,
+    changes jsonb NOT NULL,
+    actor_id bigint NULL,
+    actor varchar(254) NOT NULL,
+    PRIMARY KEY (id, changed_at)
+) PARTITION BY RANGE (changed_at);
+
+ALTER SEQUENCE audit_auditentry_id_seq OWNED BY audit_auditentry.id;
+
+-- Indice sul padre: PostgreSQL lo crea su ogni partizione, presente e futura.
+CREATE INDEX audit_employee_history_idx ON audit_auditentry (employee_id, changed_at DESC, id DESC);
+
+-- Append-only: nessuna riga di audit può essere modificata o cancellata.
+-- La retention si fa con DROP TABLE della partizione del mese (non passa dal trigger).
+CREATE FUNCTION audit_append_only() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    RAISE EXCEPTION 'audit_auditentry is append-only (% not allowed)', TG_OP;
+END;
+$$;
+
+CREATE TRIGGER audit_append_only
+BEFORE UPDATE OR DELETE ON audit_auditentry
+FOR EACH ROW EXECUTE FUNCTION audit_append_only();
+"""
+
+DROP_TABLE_SQL = """
+DROP TABLE audit_auditentry CASCADE;
+DROP FUNCTION audit_append_only();
+"""
+
+
+def create_initial_partitions(apps, schema_editor):
+    """Mese corrente e i due successivi; gli altri li crea l'AuditWriter al bisogno."""
+    today = date.today()
+    month = date(today.year, today.month, 1)
+    for _ in range(3):
+        following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        schema_editor.execute(
+            f"CREATE TABLE audit_auditentry_p{month:%Y_%m} PARTITION OF audit_auditentry "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00+00') TO ('{following.isoformat()} 00:00+00')"
+        )
+        month = following
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_TABLE_SQL, reverse_sql=DROP_TABLE_SQL),
+                migrations.RunPython(create_initial_partitions, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name="AuditEntry",
+                    fields=[
+                        ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                        ("changed_at", models.DateTimeField(default=django.utils.timezone.now)),
+                        ("model", models.CharField(max_length=100)),
+                        ("object_id", models.BigIntegerField()),
+                        ("employee_id", models.BigIntegerField(blank=True, null=True)),
+                        (
+                            "action",
+                            models.CharField(
+                                choices=[("create", "Create"), ("update", "Update"), ("delete", "Delete")],
+                                max_length=10,
+                            ),
+                        ),
+                        ("changes", models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                        ("actor_id", models.BigIntegerField(blank=True, null=True)),
+                        ("actor", models.CharField(blank=True, default="", max_length=254)),
+                    ],
+                    options={
+                        "ordering": ["-changed_at", "-id"],
+                        "indexes": [
+                            models.Index(
+                                models.F("employee_id"),
+                                models.F("changed_at").desc(),
+                                models.F("id").desc(),
+                                name="audit_employee_history_idx",
+                            )
+                        ],
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class AuditedModelMixin:
+    """Opt-in field-level audit trail for a model (US-003).
+
+    Remembers the values loaded from the database, so that post_save can
+    compute the diff without re-reading the row. Only the raw tuple is
+    kept here: conversion and comparison happen at save time, so list
+    endpoints loading hundreds of rows pay almost nothing.
+
+    `audit_employee_field` names the attribute that links a row to its
+    employee, used to query one employee's full history.
+    """
+
+    audit_employee_field = "employee_id"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._audit_loaded = dict(zip(field_names, values))
+        return instance
+
+
+class AuditEntry(models.Model):
+    """One field-level change to an audited row: who, when, what.
+
+    Append-only and partitioned by month on `changed_at` (migration 0001):
+    UPDATE and DELETE are rejected by a trigger, and old months are purged
+    by dropping whole partitions. The table has no foreign keys, so the
+    history survives the deletion of the employee or the user.
+
+    SQL analogy: a temporal history table (SYSTEM_VERSIONING = ON) on a
+    partition scheme by month, written by a separate process instead of
+    by the trigger of the audited table.
+    """
+
+    class Action(models.TextChoices):
+        CREATE = "create", "Create"
+        UPDATE = "update", "Update"
+        DELETE = "delete", "Delete"
+
+    id = models.BigAutoField(primary_key=True)
+    changed_at = models.DateTimeField(default=timezone.now)
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    employee_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=10, choices=Action.choices)
+    # {"field": [old, new], ...}
+    changes = models.JSONField(encoder=DjangoJSONEncoder)
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    actor = models.CharField(max_length=254, blank=True, default="")
+
+    class Meta:
+        ordering = ["-changed_at", "-id"]
+        indexes = [
+            models.Index(
+                "employee_id",
+                models.F("changed_at").desc(),
+                models.F("id").desc(),
+                name="audit_employee_history_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model}#{self.object_id} {self.action} by {self.actor or 'system'}"
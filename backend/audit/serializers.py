@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+from .models import AuditEntry
+
+
+class AuditEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEntry
+        fields = ["id", "changed_at", "model", "object_id", "action", "changes", "actor_id", "actor"]
+        read_only_fields = fields
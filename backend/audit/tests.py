@@ -0,0 +1,236 @@
+"""Tests for the field-level audit trail (US-003).
+
+conftest.py imposta AUDIT_ASYNC=False: le righe vengono scritte subito,
+nella transazione del test. I test della modalità asincrona la
+riattivano e verificano che la request non scriva nulla sul DB.
+
+SQL analogy: verifichiamo che la history table riceva solo le colonne
+cambiate, che sia append-only e che la partizione del mese esista.
+"""
+
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from employees.models import Contract, Employee, OnboardingStep, OnboardingTemplate
+from employees.services import start_onboarding_propagation
+
+from .models import AuditEntry
+from .services import AuditWriter, audit_writer
+
+User = get_user_model()
+
+
+def create_employee(**overrides):
+    data = {
+        "first_name": "Mario",
+        "last_name": "Rossi",
+        "email": "mario.rossi@example.com",
+        "role": "employee",
+        "hire_date": "2024-01-15",
+    }
+    data.update(overrides)
+    return Employee.objects.create(**data)
+
+
+class AuditCaptureTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email="hr@minijethr.local", password="testpass123", is_staff=True)
+        self.client.force_authenticate(user=self.user)
+
+    def test_create_records_all_fields(self):
+        employee = create_employee()
+
+        entry = AuditEntry.objects.get(model="employees.employee")
+        self.assertEqual(entry.action, AuditEntry.Action.CREATE)
+        self.assertEqual(entry.object_id, employee.pk)
+        self.assertEqual(entry.employee_id, employee.pk)
+        self.assertEqual(entry.changes["hire_date"], [None, "2024-01-15"])
+        self.assertNotIn("updated_at", entry.changes)
+
+    def test_update_records_only_changed_fields_and_actor(self):
+        employee = create_employee()
+
+        response = self.client.patch(f"/api/employees/{employee.pk}/", {"department": "Engineering"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        entry = AuditEntry.objects.filter(action=AuditEntry.Action.UPDATE).get()
+        self.assertEqual(entry.changes, {"department": ["", "Engineering"]})
+        self.assertEqual(entry.actor_id, self.user.pk)
+        self.assertEqual(entry.actor, "hr@minijethr.local")
+
+    def test_save_without_changes_records_nothing(self):
+        employee = Employee.objects.get(pk=create_employee().pk)
+        employee.save()
+
+        self.assertFalse(AuditEntry.objects.filter(action=AuditEntry.Action.UPDATE).exists())
+
+    def test_consecutive_saves_diff_against_previous_save(self):
+        employee = create_employee()
+        employee.department = "HR"
+        employee.save()
+        employee.department = "IT"
+        employee.save()
+
+        changes = list(
+            AuditEntry.objects.filter(action=AuditEntry.Action.UPDATE).order_by("id").values_list("changes", flat=True)
+        )
+        self.assertEqual(changes, [{"department": ["", "HR"]}, {"department": ["HR", "IT"]}])
+
+    def test_contract_delete_is_linked_to_employee(self):
+        employee = create_employee()
+        contract = Contract.objects.create(
+            employee=employee, contract_type="indeterminato", ccnl="commercio", ral="30000.00", start_date="2024-01-15"
+        )
+        Contract.objects.get(pk=contract.pk).delete()
+
+        entry = AuditEntry.objects.get(model="employees.contract", action=AuditEntry.Action.DELETE)
+        self.assertEqual(entry.employee_id, employee.pk)
+        self.assertEqual(entry.changes["ral"], ["30000.00", None])
+
+    def test_batch_step_update_is_audited(self):
+        OnboardingTemplate.objects.create(name="Badge", order=1)
+        employee = create_employee()
+        step = OnboardingStep.objects.get(employee=employee)
+
+        response = self.client.patch(
+            f"/api/employees/{employee.pk}/onboarding/", [{"id": step.pk, "notes": "ritirato"}], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        entry = AuditEntry.objects.get(model="employees.onboardingstep", action=AuditEntry.Action.UPDATE)
+        self.assertEqual(entry.changes, {"notes": ["", "ritirato"]})
+        self.assertEqual(entry.actor, "hr@minijethr.local")
+
+    def test_bulk_created_steps_are_audited(self):
+        """Gli step creati all'assunzione (bulk_create) e dalla propagazione (INSERT raw)."""
+        badge = OnboardingTemplate.objects.create(name="Badge", order=1)
+        employee = create_employee()
+
+        entry = AuditEntry.objects.get(model="employees.onboardingstep")
+        self.assertEqual(entry.action, AuditEntry.Action.CREATE)
+        self.assertEqual(entry.employee_id, employee.pk)
+        self.assertEqual(entry.changes["template_id"], [None, badge.pk])
+
+        laptop = OnboardingTemplate.objects.create(name="Laptop", order=2)
+        start_onboarding_propagation(laptop)
+
+        step = OnboardingStep.objects.get(employee=employee, template=laptop)
+        entry = AuditEntry.objects.get(model="employees.onboardingstep", object_id=step.pk)
+        self.assertEqual(entry.action, AuditEntry.Action.CREATE)
+        self.assertEqual(entry.employee_id, employee.pk)
+        self.assertEqual(
+            entry.changes,
+            {
+                "id": [None, step.pk],
+                "employee_id": [None, employee.pk],
+                "template_id": [None, laptop.pk],
+                "is_completed": [None, False],
+                "completed_at": [None, None],
+                "notes": [None, ""],
+            },
+        )
+
+    def test_audit_table_is_append_only(self):
+        create_employee()
+
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                AuditEntry.objects.update(actor="tampered")
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic():
+                AuditEntry.objects.all().delete()
+
+    def test_history_endpoint_lists_employee_changes_newest_first(self):
+        employee = create_employee()
+        other = create_employee(email="anna@example.com")
+        Contract.objects.create(
+            employee=employee, contract_type="stagista", ccnl="commercio", ral="15000.00", start_date="2024-01-15"
+        )
+        self.client.delete(f"/api/employees/{employee.pk}/")  # soft delete: la history resta consultabile
+
+        response = self.client.get(f"/api/employees/{employee.pk}/history/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(
+            [(r["model"], r["action"]) for r in results],
+            [("employees.employee", "update"), ("employees.contract", "create"), ("employees.employee", "create")],
+        )
+        self.assertEqual(results[0]["changes"], {"is_active": [True, False]})
+        self.assertNotIn(other.pk, [r["object_id"] for r in results if r["model"] == "employees.employee"])
+
+
+class AuditAsyncTest(TestCase):
+    def setUp(self):
+        # In setUp: il fixture autouse di conftest viene applicato dopo i decorator di classe
+        async_settings = override_settings(AUDIT_ASYNC=True)
+        async_settings.enable()
+        self.addCleanup(async_settings.disable)
+
+    def test_request_thread_does_not_write_audit_rows(self):
+        employee = create_employee()
+        employee.department = "HR"
+
+        with patch.object(audit_writer, "put") as mock_put:
+            with CaptureQueriesContext(connection) as ctx:
+                with self.captureOnCommitCallbacks(execute=True):
+                    employee.save()
+
+        self.assertFalse([q for q in ctx.captured_queries if "audit_auditentry" in q["sql"]])
+        mock_put.assert_called_once()
+        self.assertEqual(mock_put.call_args.args[0][0]["changes"], {"department": ["", "HR"]})
+
+    def test_rolled_back_change_is_not_queued(self):
+        with patch.object(audit_writer, "put") as mock_put:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError):
+                    with transaction.atomic():
+                        create_employee()
+                        raise RuntimeError("request failed")
+
+        mock_put.assert_not_called()
+
+
+class AuditWriterTest(TestCase):
+    def entry(self, changed_at, object_id=1):
+        return {
+            "changed_at": changed_at,
+            "model": "employees.employee",
+            "object_id": object_id,
+            "employee_id": object_id,
+            "action": AuditEntry.Action.UPDATE,
+            "changes": {"department": ["", "HR"]},
+            "actor_id": None,
+            "actor": "",
+        }
+
+    def test_flush_writes_queue_in_one_insert(self):
+        writer = AuditWriter()
+        now = datetime.now(dt_timezone.utc)
+        for i in range(3):
+            writer._queue.put(self.entry(now, object_id=i))
+
+        with CaptureQueriesContext(connection) as ctx:
+            writer.flush()
+
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "audit_auditentry"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(AuditEntry.objects.count(), 3)
+
+    def test_missing_monthly_partition_is_created(self):
+        writer = AuditWriter()
+        writer.write([self.entry(datetime(2031, 5, 17, tzinfo=dt_timezone.utc))])
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('audit_auditentry_p2031_05')")
+            self.assertIsNotNone(cursor.fetchone()[0])
+        self.assertEqual(AuditEntry.objects.filter(changed_at__year=2031).count(), 1)
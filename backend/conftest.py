@@ -24,6 +24,12 @@ def celery_eager_mode(settings):
     """
     settings.CELERY_TASK_ALWAYS_EAGER = True
     settings.CELERY_TASK_EAGER_PROPAGATES = True
+    # Stessa idea per l'outbox: il task parte subito invece di aspettare
+    # il dispatcher. I test dell'outbox lo disattivano esplicitamente.
+    settings.OUTBOX_ALWAYS_EAGER = True
+    # E per l'audit: righe scritte subito, nella transazione del test
+    # (il thread writer userebbe un'altra connessione, fuori dal rollback).
+    settings.AUDIT_ASYNC = False
 
 
 @pytest.fixture(autouse=True)
@@ -39,6 +45,8 @@ def use_local_cache(settings):
 
     Il clear() garantisce isolamento: ogni test parte con cache vuota,
     così un test non può "inquinare" il successivo con dati cachati.
+    Va svuotato anche il livello in-process di two_tier_cache (L1),
+    che sopravvive tra i test perché vive nel modulo, non in CACHES.
     """
     settings.CACHES = {
         "default": {
@@ -47,4 +55,10 @@ def use_local_cache(settings):
     }
     from django.core.cache import cache
 
+    from accounts.authentication import user_record_cache
+    from minijet.cache import two_tier_cache
+
     cache.clear()
+    two_tier_cache.clear_local()
+    # Idem per i record utente cachati da ClaimsJWTAuthentication
+    user_record_cache.clear()
@@ -9,3 +9,8 @@ class EmployeeAdmin(admin.ModelAdmin):
     list_filter = ["role", "is_active", "department"]
     search_fields = ["first_name", "last_name", "email"]
     ordering = ["last_name", "first_name"]
+    raw_id_fields = ["manager"]
+
+    def get_queryset(self, request):
+        # L'admin deve vedere anche i dipendenti disattivati (filtro is_active)
+        return Employee.all_objects.all()
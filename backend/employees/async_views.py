@@ -0,0 +1,201 @@
+"""Versioni async delle GET più frequenti, per il deploy sotto ASGI.
+
+Sotto ASGI una view sync occupa un thread del pool per tutta la request.
+Le GET qui sotto girano invece sull'event loop: le query passano
+dall'ORM async di Django (acount, aget, async for) e la dashboard da
+two_tier_cache.aget_or_set (una lettura L1 non esce nemmeno dall'event
+loop). Un processo regge così molti client concorrenti, come i polling
+della dashboard, senza esaurire il pool.
+
+DRF non ha view async: qui si riusano i pezzi della view DRF che non
+eseguono query (get_queryset, filter_queryset, permessi, serializer,
+exception handler) e si sostituiscono solo i punti in cui la view sync
+valuta i queryset. Stesso JSON, stessa paginazione, stessi errori.
+
+Route servite (solo GET, senza suffisso di formato):
+- employee-list / employee-detail
+- employee-contract-list
+- employee-onboarding-list
+- dashboard-stats
+
+Attive con ASYNC_READ_VIEWS=True, da usare solo con un server ASGI: sotto
+WSGI ogni view async costerebbe un event loop per request. Gli altri
+metodi sulle stesse URL (POST, PATCH, ...) vanno alle view DRF di sempre.
+
+SQL analogy: come passare da una connessione per sessione bloccata in
+attesa a I/O asincrono: il worker non resta fermo mentre aspetta il DB.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.urls import URLPattern, URLResolver
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from minijet.cache import two_tier_cache
+from minijet.replicas import use_database
+
+from .views import DASHBOARD_CACHE_KEY
+
+
+async def authenticate(request):
+    """Come Request._authenticate di DRF, con aauthenticate() quando l'autenticatore lo offre."""
+    for authenticator in request.authenticators:
+        if hasattr(authenticator, "aauthenticate"):
+            user_auth = await authenticator.aauthenticate(request)
+        else:
+            user_auth = await sync_to_async(authenticator.authenticate)(request)
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+    request._not_authenticated()
+
+
+async def paginate(view, queryset):
+    """PageNumberPagination.paginate_queryset con COUNT e fetch della pagina async.
+
+    Returns:
+        list | None: gli oggetti della pagina, None se la view non pagina.
+    """
+    pagination = view.paginator
+    if pagination is None:
+        return None
+    pagination.request = view.request
+    page_size = pagination.get_page_size(view.request)
+    if not page_size:
+        return None
+
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    # count è una cached_property: calcolata qui con acount(), la validazione
+    # del numero di pagina e i link next/previous non eseguono altre query
+    paginator.count = await queryset.acount()
+    page_number = pagination.get_page_number(view.request, paginator)
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    pagination.page.object_list = [obj async for obj in pagination.page.object_list]
+    return pagination.page.object_list
+
+
+async def list_objects(view):
+    """ListModelMixin.list con l'ORM async."""
+    queryset = view.filter_queryset(view.get_queryset())
+    page = await paginate(view, queryset)
+    if page is not None:
+        return view.get_paginated_response(view.get_serializer(page, many=True).data)
+    objects = [obj async for obj in queryset]
+    return Response(view.get_serializer(objects, many=True).data)
+
+
+async def retrieve_object(view):
+    """RetrieveModelMixin.retrieve con l'ORM async (stessi 404 di get_object)."""
+    queryset = view.filter_queryset(view.get_queryset())
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    try:
+        obj = await aget_object_or_404(queryset, **{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+    except (TypeError, ValueError, ValidationError):
+        raise Http404
+    view.check_object_permissions(view.request, obj)
+    return Response(view.get_serializer(obj).data)
+
+
+async def dashboard_stats(view):
+    """DashboardView.get: cache a due livelli async, statistiche con l'ORM async su MISS."""
+    data = await two_tier_cache.aget_or_set(DASHBOARD_CACHE_KEY, view.abuild_stats, settings.CACHE_DASHBOARD_TTL)
+    return Response(data)
+
+
+# Nome della route → lettura async (ritorna una Response DRF) al posto della GET sync
+ASYNC_READERS = {
+    "employee-list": list_objects,
+    "employee-detail": retrieve_object,
+    "employee-contract-list": list_objects,
+    "employee-onboarding-list": list_objects,
+    "dashboard-stats": dashboard_stats,
+}
+
+
+async def dispatch(callback, read, request, args, kwargs):
+    """APIView.dispatch per una GET, con autenticazione e query async.
+
+    Returns:
+        HttpResponse: già renderizzata. Una Response DRF verrebbe
+        renderizzata dall'handler ASGI in un thread (sync_to_async).
+    """
+    view = callback.cls(**callback.initkwargs)
+    actions = getattr(callback, "actions", None)
+    if actions:
+        view.action_map = actions
+        view.action = actions["get"]
+    # Solo JSON: il Browsable API fa query sync durante il render
+    view.renderer_classes = [JSONRenderer]
+    view.args, view.kwargs, view.headers = args, kwargs, view.default_response_headers
+    view.request = request = view.initialize_request(request, *args, **kwargs)
+
+    try:
+        view.format_kwarg = view.get_format_suffix(**kwargs)
+        neg = view.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+        request.version, request.versioning_scheme = view.determine_version(request, *args, **kwargs)
+        await authenticate(request)
+        view.check_permissions(request)
+        view.check_throttles(request)
+        # Replica o primario come nella view sync (ReplicaReadMixin): il
+        # ContextVar arriva anche nel thread delle query (sync_to_async).
+        # Senza repliche niente salto di thread per leggere la cache.
+        database = None
+        if settings.DATABASE_REPLICAS:
+            database = await sync_to_async(view.replica_database)(request)
+        with use_database(database):
+            response = await read(view)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+
+    response = view.finalize_response(request, response, *args, **kwargs)
+    response.render()
+    return HttpResponse(response.content, status=response.status_code, headers=dict(response.items()))
+
+
+def async_reads(callback, read):
+    """La view DRF `callback` con le GET servite da `read` sull'event loop.
+
+    functools.wraps copia cls, initkwargs, actions e csrf_exempt: router,
+    schema OpenAPI e CSRF vedono la view DRF originale.
+    """
+    sync_view = sync_to_async(callback)
+
+    @functools.wraps(callback)
+    async def view(request, *args, **kwargs):
+        if request.method != "GET" or "format" in kwargs:
+            return await sync_view(request, *args, **kwargs)
+        return await dispatch(callback, read, request, args, kwargs)
+
+    return view
+
+
+def with_async_reads(patterns):
+    """Copia di `patterns` con le route di ASYNC_READERS servite dalle view async."""
+    result = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern,
+                with_async_reads(pattern.url_patterns),
+                pattern.default_kwargs,
+                pattern.app_name,
+                pattern.namespace,
+            )
+        elif isinstance(pattern, URLPattern) and pattern.name in ASYNC_READERS:
+            callback = async_reads(pattern.callback, ASYNC_READERS[pattern.name])
+            pattern = URLPattern(pattern.pattern, callback, pattern.default_args, pattern.name)
+        result.append(pattern)
+    return result
@@ -0,0 +1,249 @@
+"""Benchmark dei percorsi caldi dell'API, con baseline salvate nel repo.
+
+Uso (su un database dedicato, mai su quello di sviluppo):
+    DB_NAME=minijethr_bench python manage.py migrate
+    DB_NAME=minijethr_bench python manage.py benchmark --employees 1000 --seed
+    DB_NAME=minijethr_bench python manage.py benchmark --employees 100000 --save-baseline
+
+Per ogni scenario misura latenza p50/p95/p99 e richieste al secondo
+(sequenziali, un solo processo): le request passano da tutto lo stack
+Django in-process (middleware, autenticazione JWT, view, serializer,
+render), senza rete né server HTTP davanti.
+
+Scenari:
+- employee_list:        GET /api/employees/?page=N (prime 50 pagine)
+- employee_detail:      GET /api/employees/{id}/
+- dashboard_miss:       GET /api/dashboard/stats/ con cache invalidata
+- dashboard_hit:        GET /api/dashboard/stats/ con cache calda
+- contract_list:        GET /api/employees/{id}/contracts/
+- create_onboarding:    create_onboarding_steps_for_employee() (in transazione annullata)
+
+Le baseline stanno in benchmarks/baselines.json, una per taglia
+(1k, 100k, 1m), con il seed e la data di riferimento (--as-of) del
+dataset di seed_data. Senza --save-baseline i risultati vengono confrontati con
+la baseline della stessa taglia: p95 più alto o RPS più basso oltre
+--threshold vengono segnalati come regressione (--fail-on-regression per
+uscire con errore, es. in una pipeline).
+
+SQL analogy: come confrontare le statistiche di sys.dm_exec_query_stats
+prima e dopo un deploy, ma per endpoint invece che per query.
+"""
+
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.serializers import ClaimsTokenObtainPairSerializer
+from employees.management.commands.seed_data import DEFAULT_AS_OF
+from employees.models import Contract, Employee, OnboardingStep
+from employees.services import create_onboarding_steps_for_employee
+from employees.views import DASHBOARD_CACHE_KEY
+from minijet.cache import two_tier_cache
+
+BASELINES_PATH = Path(settings.BASE_DIR) / "benchmarks" / "baselines.json"
+BENCHMARK_USER_EMAIL = "benchmark@minijethr.local"
+# Seed fisso: stesso dataset (seed_data) e stesse pagine a ogni esecuzione
+RANDOM_SEED = 42
+
+
+def size_label(employees):
+    """1000 → "1k", 100000 → "100k", 1000000 → "1m"."""
+    if employees >= 1_000_000 and employees % 1_000_000 == 0:
+        return f"{employees // 1_000_000}m"
+    if employees >= 1000 and employees % 1000 == 0:
+        return f"{employees // 1000}k"
+    return str(employees)
+
+
+def summarize(latencies, elapsed):
+    """p50/p95/p99 in millisecondi e richieste al secondo."""
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """Scenari peggiorati oltre la soglia rispetto alla baseline.
+
+    Returns:
+        list[str]: una riga descrittiva per metrica peggiorata.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms → {current['p95_ms']} ms")
+        if current["rps"] < previous["rps"] * (1 - threshold):
+            regressions.append(f"{name}: rps {previous['rps']} → {current['rps']}")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = "Benchmark API hot paths (p50/p95/p99, rps) and compare with the stored baselines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, required=True, help="Expected dataset size (1000, 100000, 1000000).")
+        parser.add_argument("--seed", action="store_true", help="Load the dataset with seed_data first (empty database).")
+        parser.add_argument(
+            "--as-of",
+            type=date.fromisoformat,
+            default=DEFAULT_AS_OF,
+            help="Reference date of the seed_data dataset (recorded in the baseline).",
+        )
+        parser.add_argument("--iterations", type=int, default=200, help="Timed iterations per scenario.")
+        parser.add_argument("--warmup", type=int, default=20, help="Untimed iterations per scenario.")
+        parser.add_argument("--scenario", action="append", help="Run only these scenarios (repeatable).")
+        parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline for this size.")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression (0.2 = 20%%).")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error on regressions.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(RANDOM_SEED)
+        target = options["employees"]
+        label = size_label(target)
+
+        if options["seed"]:
+            call_command("seed_data", employees=target, seed=RANDOM_SEED, as_of=options["as_of"], stdout=self.stdout)
+        actual = Employee.objects.count()
+        if abs(actual - target) > target * 0.05:
+            raise CommandError(f"Database has {actual} active employees, expected ~{target}. Use --seed.")
+
+        self.client = self.authenticated_client()
+        self.employee_ids = list(Employee.objects.values_list("pk", flat=True))
+        self.with_contracts = list(Contract.objects.values_list("employee_id", flat=True).distinct()[:10_000])
+
+        scenarios = {
+            "employee_list": self.employee_list,
+            "employee_detail": self.employee_detail,
+            "dashboard_miss": self.dashboard_miss,
+            "dashboard_hit": self.dashboard_hit,
+            "contract_list": self.contract_list,
+            "create_onboarding": self.create_onboarding,
+        }
+        selected = options["scenario"] or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        results = {}
+        for name in selected:
+            results[name] = self.run_scenario(scenarios[name], options["warmup"], options["iterations"])
+            self.stdout.write(
+                f"{name:<20} p50 {results[name]['p50_ms']:>8} ms  p95 {results[name]['p95_ms']:>8} ms  "
+                f"p99 {results[name]['p99_ms']:>8} ms  {results[name]['rps']:>8} rps"
+            )
+
+        baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+        if options["save_baseline"]:
+            baselines[label] = {
+                "employees": actual,
+                # Il dataset di seed_data: stesso seed e stessa data = stesse righe
+                "dataset": {"seed": RANDOM_SEED, "as_of": options["as_of"].isoformat()},
+                "recorded_at": timezone.now().date().isoformat(),
+                "environment": self.environment(),
+                "iterations": options["iterations"],
+                "scenarios": {**baselines.get(label, {}).get("scenarios", {}), **results},
+            }
+            BASELINES_PATH.parent.mkdir(exist_ok=True)
+            BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline {label} saved to {BASELINES_PATH}"))
+            return
+
+        if label not in baselines:
+            self.stdout.write(self.style.WARNING(f"No baseline for {label}: run with --save-baseline to record one."))
+            return
+        regressions = find_regressions(results, baselines[label]["scenarios"], options["threshold"])
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(f"REGRESSION {line}"))
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regressions against baseline {label}.")
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against baseline {label}."))
+
+    # --- Misura ------------------------------------------------------------
+
+    def run_scenario(self, scenario, warmup, iterations):
+        """Esegue lo scenario: ogni chiamata ritorna la propria durata in secondi."""
+        for _ in range(warmup):
+            scenario()
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            latencies.append(scenario())
+        return summarize(latencies, time.perf_counter() - started)
+
+    def timed_get(self, url):
+        start = time.perf_counter()
+        response = self.client.get(url)
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            raise CommandError(f"GET {url} returned {response.status_code}")
+        return elapsed
+
+    def employee_list(self):
+        pages = max(1, min(50, len(self.employee_ids) // settings.REST_FRAMEWORK["PAGE_SIZE"]))
+        return self.timed_get(f"/api/employees/?page={self.rng.randint(1, pages)}")
+
+    def employee_detail(self):
+        return self.timed_get(f"/api/employees/{self.rng.choice(self.employee_ids)}/")
+
+    def dashboard_miss(self):
+        two_tier_cache.invalidate(DASHBOARD_CACHE_KEY)
+        return self.timed_get("/api/dashboard/stats/")
+
+    def dashboard_hit(self):
+        return self.timed_get("/api/dashboard/stats/")
+
+    def contract_list(self):
+        return self.timed_get(f"/api/employees/{self.rng.choice(self.with_contracts)}/contracts/")
+
+    def create_onboarding(self):
+        employee = Employee.objects.get(pk=self.rng.choice(self.employee_ids))
+        # Transazione annullata: ogni iterazione riparte dagli stessi dati
+        with transaction.atomic():
+            OnboardingStep.objects.filter(employee=employee).delete()
+            start = time.perf_counter()
+            create_onboarding_steps_for_employee(employee)
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
+
+    # --- Setup -------------------------------------------------------------
+
+    def authenticated_client(self):
+        """Client HR autenticato con un vero access token (passa da ClaimsJWTAuthentication)."""
+        user, _ = get_user_model().objects.get_or_create(email=BENCHMARK_USER_EMAIL, defaults={"is_staff": True})
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        host = next((h for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+        client = APIClient(HTTP_HOST=host)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def environment(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW server_version")
+            (postgres,) = cursor.fetchone()
+        return {
+            "python": platform.python_version(),
+            "postgres": postgres,
+            "cache": settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1],
+            "machine": platform.machine(),
+        }
@@ -0,0 +1,120 @@
+"""Profilo dei tempi di avvio: quanto costano gli import di ogni processo.
+
+Uso:
+    python manage.py importtime                 # django.setup(): ogni manage.py, test, worker
+    python manage.py importtime worker          # boot di un worker Celery (prima del broker)
+    python manage.py importtime web             # processo web: setup + URLconf (prima request)
+    python manage.py importtime migrate         # `manage.py migrate --help`: setup + modulo del comando
+
+Ogni misura gira in un interprete nuovo (`python -X importtime`), --runs
+volte: riporta la mediana del tempo totale (avvio dell'interprete
+compreso) e, dall'ultima esecuzione, i package e i moduli più costosi.
+
+- packages: tempo "self" sommato per package di primo livello (django,
+  celery, rest_framework, ...): chi pesa sull'avvio;
+- modules: tempo cumulativo dei moduli, figli compresi: da dove parte
+  una catena di import costosa (es. accounts.schema → drf_spectacular).
+
+Il profilo worker include i system check di Django che Celery esegue al
+boot (importano tutto l'URLconf, schema OpenAPI compreso), a meno di
+CELERY_SKIP_CHECKS=true come nel worker di docker-compose.
+
+Un package che compare senza servire al processo va importato più tardi
+(import locale nella funzione che lo usa), come Celery in
+employees/tasks.py e outbox/services.py.
+
+SQL analogy: come SET STATISTICS TIME sul login, invece che sulla query:
+quanto tempo passa prima che la sessione possa fare qualcosa.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SETUP = "import django; django.setup()"
+PROFILES = {
+    "setup": SETUP,
+    # Quello che fa `celery -A minijet worker` prima di collegarsi al broker
+    "worker": "from minijet.celery import app; app.loader.import_default_modules()",
+    "web": SETUP + "; from django.urls import get_resolver; get_resolver().url_patterns",
+}
+
+
+def parse_importtime(output):
+    """Righe di `python -X importtime` → lista di (modulo, self µs, cumulativo µs).
+
+    Formato: "import time: <self> | <cumulative> | <modulo indentato>".
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # riga di intestazione
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def package_times(modules):
+    """Tempo self (µs) sommato per package di primo livello, dal più costoso."""
+    totals = Counter()
+    for name, self_us, _cumulative in modules:
+        totals[name.split(".", 1)[0]] += self_us
+    return totals.most_common()
+
+
+class Command(BaseCommand):
+    help = "Profile process cold start: wall time and import cost per package (python -X importtime)."
+
+    # Lancia solo sottoprocessi: i check li farebbe pagare due volte
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "target",
+            nargs="?",
+            default="setup",
+            help=f"One of {', '.join(PROFILES)}, or a management command name (profiled as `<command> --help`).",
+        )
+        parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time (median reported).")
+        parser.add_argument("--top", type=int, default=15, help="Packages and modules to list.")
+
+    def handle(self, *args, **options):
+        target = options["target"]
+        if target in PROFILES:
+            argv = [sys.executable, "-X", "importtime", "-c", PROFILES[target]]
+        else:
+            argv = [sys.executable, "-X", "importtime", "manage.py", target, "--help"]
+        if options["runs"] <= 0:
+            raise CommandError("--runs must be positive.")
+
+        timings = []
+        for _ in range(options["runs"]):
+            started = time.perf_counter()
+            result = subprocess.run(argv, cwd=settings.BASE_DIR, capture_output=True, text=True)
+            timings.append((time.perf_counter() - started) * 1000)
+            if result.returncode != 0:
+                raise CommandError(f"{target} failed:\n{result.stderr[-2000:]}")
+
+        modules = parse_importtime(result.stderr)
+        imports_ms = sum(self_us for _name, self_us, _cumulative in modules) / 1000
+        self.stdout.write(
+            f"{target}: {statistics.median(timings):.0f} ms median wall time over {len(timings)} runs "
+            f"(min {min(timings):.0f}, max {max(timings):.0f}); "
+            f"{len(modules)} modules imported in {imports_ms:.0f} ms"
+        )
+
+        self.stdout.write(f"\n{'package':<40} {'self ms':>9}")
+        for package, self_us in package_times(modules)[: options["top"]]:
+            self.stdout.write(f"{package:<40} {self_us / 1000:>9.1f}")
+
+        self.stdout.write(f"\n{'module':<60} {'cumulative ms':>14}")
+        heaviest = sorted(modules, key=lambda module: module[2], reverse=True)
+        for name, _self_us, cumulative_us in heaviest[: options["top"]]:
+            self.stdout.write(f"{name:<60} {cumulative_us / 1000:>14.1f}")
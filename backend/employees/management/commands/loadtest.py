@@ -0,0 +1,528 @@
+"""Load test end-to-end: utenti simulati contro un'istanza in esecuzione.
+
+Uso (contro un ambiente di load test, mai contro produzione: i toggle
+dell'onboarding modificano i dati):
+    python manage.py loadtest --url http://localhost:8000 --email hr@minijethr.local \\
+        --users 50 --duration 300 --ramp-up 30
+
+A differenza di `benchmark` (in-process, sequenziale) qui le request
+passano dalla rete e dal server vero (gunicorn/uvicorn, worker, pool di
+connessioni): serve a dimensionare worker e connessioni al DB.
+
+Ogni utente simulato fa login su /api/auth/login/ (rinnovando l'access
+token con /api/auth/refresh/ quando scade), poi ripete il mix di traffico
+con una pausa casuale tra un'azione e l'altra (--think-time):
+- employee_list:      GET /api/employees/?page=N (soprattutto le prime pagine)
+- employee_detail:    GET /api/employees/{id}/
+- contract_list:      GET /api/employees/{id}/contracts/
+- onboarding_toggle:  GET /api/employees/{id}/onboarding/ + PATCH di uno step
+e in parallelo, come la SPA aperta su una scheda, interroga la dashboard
+ogni --dashboard-interval secondi (5 minuti di default).
+
+Alla fine riporta, per endpoint: richieste, throughput, latenza
+p50/p95/p99 e tasso di errore (status >= 400, timeout, connessioni cadute).
+
+Con --server-pid (server sulla stessa macchina, Linux) riporta anche i
+core occupati dal server durante il test, il throughput per core e la
+memoria (RSS/PSS/USS) del master e di ogni worker: stessi numeri per
+gunicorn.conf.py e per runserver, a parità di carico.
+
+Solo libreria standard (asyncio + stream TCP, HTTP/1.1 keep-alive): gira
+su qualsiasi macchina con il repo, senza dipendenze aggiuntive. Non tocca
+il database locale.
+
+SQL analogy: come un replay di un trace di SQL Profiler con N sessioni
+concorrenti, invece di misurare una query alla volta.
+"""
+
+import asyncio
+import json
+import os
+import random
+import ssl
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.management.commands.benchmark import summarize
+
+# Peso di ogni azione nel mix (la dashboard è a parte, a intervallo fisso)
+TRAFFIC_MIX = {
+    "employee_list": 40,
+    "employee_detail": 30,
+    "contract_list": 20,
+    "onboarding_toggle": 10,
+}
+# Pagina media della lista: gli utenti guardano quasi sempre le prime pagine
+MEAN_LIST_PAGE = 5
+USER_AGENT = "minijet-loadtest"
+
+
+class HTTPConnection:
+    """One keep-alive HTTP/1.1 connection (a simulated browser connection).
+
+    Not safe for concurrent requests: each coroutine uses its own.
+    """
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.netloc = parts.netloc
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, payload=None, headers=None):
+        """Esegue una request e ritorna (status, body JSON o None).
+
+        Una connessione keep-alive può essere stata chiusa dal server mentre
+        era inattiva: in quel caso (e solo in quello) la request viene
+        ripetuta una volta su una connessione nuova.
+        """
+        reused = self.writer is not None
+        try:
+            return await asyncio.wait_for(self._roundtrip(method, path, payload, headers), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+            return await asyncio.wait_for(self._roundtrip(method, path, payload, headers), self.timeout)
+        except BaseException:
+            # Timeout o cancellazione a metà risposta: la connessione non è più riusabile
+            await self.close()
+            raise
+
+    async def _roundtrip(self, method, path, payload, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+        body = b"" if payload is None else json.dumps(payload).encode()
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.netloc}",
+            f"User-Agent: {USER_AGENT}",
+            "Accept: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if payload is not None:
+            lines.append("Content-Type: application/json")
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the server")
+        version, status = status_line.split()[:2]
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == b"HTTP/1.1" and response_headers.get("connection", "").lower() != "close"
+        if "content-length" in response_headers:
+            data = await self.reader.readexactly(int(response_headers["content-length"]))
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            data = await self._read_chunked()
+        elif method == "HEAD" or status in (b"204", b"304"):
+            data = b""
+        else:
+            # Né lunghezza né chunked: il corpo finisce con la connessione
+            data = await self.reader.read()
+            keep_alive = False
+        if not keep_alive:
+            await self.close()
+
+        is_json = response_headers.get("content-type", "").startswith("application/json")
+        return int(status), json.loads(data) if data and is_json else None
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                # Trailer (di solito vuoto) fino alla riga vuota
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        self.reader = self.writer = None
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint, shared by all simulated users."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)  # endpoint -> status (o nome eccezione) -> richieste
+
+    def record(self, endpoint, elapsed, outcome):
+        """outcome: status HTTP, oppure il nome dell'eccezione se la risposta non è arrivata."""
+        if isinstance(outcome, int):
+            self.latencies[endpoint].append(elapsed)
+        self.outcomes[endpoint][outcome] += 1
+
+    def report(self, elapsed):
+        """Una riga per endpoint (più il totale) con rps, percentili ed errori.
+
+        Returns:
+            dict[str, dict]: endpoint -> requests, rps, p50_ms/p95_ms/p99_ms, error_rate, errors.
+        """
+        rows = {}
+        all_latencies = []
+        all_outcomes = Counter()
+        for endpoint in sorted(self.outcomes):
+            rows[endpoint] = self._row(self.latencies[endpoint], self.outcomes[endpoint], elapsed)
+            all_latencies.extend(self.latencies[endpoint])
+            all_outcomes.update(self.outcomes[endpoint])
+        if all_outcomes:
+            rows["TOTAL"] = self._row(all_latencies, all_outcomes, elapsed)
+        return rows
+
+    @staticmethod
+    def _row(latencies, outcomes, elapsed):
+        requests = sum(outcomes.values())
+        errors = {str(outcome): count for outcome, count in outcomes.items() if not is_success(outcome)}
+        # summarize vuole almeno due campioni
+        percentiles = summarize(latencies * 2 if len(latencies) == 1 else latencies, elapsed) if latencies else {}
+        return {
+            "requests": requests,
+            "rps": round(requests / elapsed, 1),
+            "p50_ms": percentiles.get("p50_ms"),
+            "p95_ms": percentiles.get("p95_ms"),
+            "p99_ms": percentiles.get("p99_ms"),
+            "error_rate": sum(errors.values()) / requests,
+            "errors": errors,
+        }
+
+
+def is_success(outcome):
+    return isinstance(outcome, int) and outcome < 400
+
+
+class ServerProcesses:
+    """CPU time and memory of a local server process tree, read from /proc (Linux).
+
+    `pid` is the root of the tree: the gunicorn master, or runserver.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        if not Path(f"/proc/{pid}/stat").exists():
+            raise CommandError(f"No process {pid} in /proc: --server-pid needs Linux and a server on this machine.")
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+
+    @staticmethod
+    def _stat(pid):
+        """Campi di /proc/<pid>/stat dal terzo in poi (il nome tra parentesi può contenere spazi)."""
+        return Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+
+    def tree(self):
+        """Il pid radice e tutti i discendenti ancora vivi."""
+        parents = {}
+        for entry in Path("/proc").iterdir():
+            if entry.name.isdigit():
+                try:
+                    parents[int(entry.name)] = int(self._stat(entry.name)[1])
+                except (OSError, IndexError):
+                    continue  # processo terminato durante la scansione
+        pids = [self.pid]
+        for pid in pids:
+            pids.extend(child for child, parent in parents.items() if parent == pid)
+        return pids
+
+    def cpu_seconds(self):
+        """CPU user+system dell'albero, compresi i worker già terminati.
+
+        I worker riciclati (max_requests) escono durante il test: il loro tempo
+        resta nei campi cutime/cstime del padre che li ha raccolti.
+        """
+        ticks = 0
+        for pid in self.tree():
+            try:
+                fields = self._stat(pid)
+            except OSError:
+                continue
+            ticks += int(fields[11]) + int(fields[12])  # utime, stime
+            if pid == self.pid:
+                ticks += int(fields[13]) + int(fields[14])  # cutime, cstime
+        return ticks / self.clock_ticks
+
+    def memory(self):
+        """RSS, PSS e USS in MB per processo.
+
+        RSS conta per intero le pagine condivise (copy-on-write dopo il fork),
+        PSS le divide tra i processi che le condividono, USS sono le sole
+        pagine private: con preload_app e gc.freeze() PSS e USS per worker
+        scendono, l'RSS quasi non cambia.
+
+        Returns:
+            dict[int, dict]: pid -> rss_mb, pss_mb, uss_mb.
+        """
+        usage = {}
+        for pid in self.tree():
+            try:
+                lines = Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]
+            except OSError:
+                continue
+            kb = {name: int(value.split()[0]) for name, value in (line.split(":", 1) for line in lines)}
+            usage[pid] = {
+                "rss_mb": round(kb["Rss"] / 1024, 1),
+                "pss_mb": round(kb["Pss"] / 1024, 1),
+                "uss_mb": round((kb["Private_Clean"] + kb["Private_Dirty"]) / 1024, 1),
+            }
+        return usage
+
+
+class SimulatedUser:
+    """One HR user: logs in, browses with think time and polls the dashboard."""
+
+    def __init__(self, options, recorder, rng):
+        self.options = options
+        self.recorder = recorder
+        self.rng = rng
+        self.access = None
+        self.refresh = None
+        self.pages = 1
+        self.employee_ids = []
+
+    async def call(self, connection, endpoint, method, path, payload=None, authenticated=True):
+        """Request cronometrata e registrata; su 401 rinnova il token e riprova una volta."""
+        for attempt in range(2):
+            headers = {"Authorization": f"Bearer {self.access}"} if authenticated else None
+            start = time.perf_counter()
+            try:
+                status, data = await connection.request(method, path, payload, headers)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as exc:
+                self.recorder.record(endpoint, time.perf_counter() - start, type(exc).__name__)
+                return None, None
+            self.recorder.record(endpoint, time.perf_counter() - start, status)
+            if status == 401 and authenticated and attempt == 0 and await self.renew(connection):
+                continue
+            return status, data
+
+    async def login(self, connection):
+        credentials = {"email": self.options["email"], "password": self.options["password"]}
+        status, data = await self.call(
+            connection, "POST /api/auth/login/", "POST", "/api/auth/login/", credentials, authenticated=False
+        )
+        if status != 200:
+            return False
+        self.access, self.refresh = data["access"], data["refresh"]
+        return True
+
+    async def renew(self, connection):
+        """Access token scaduto: refresh (con rotazione), o un nuovo login se anche il refresh è scaduto."""
+        status, data = await self.call(
+            connection,
+            "POST /api/auth/refresh/",
+            "POST",
+            "/api/auth/refresh/",
+            {"refresh": self.refresh},
+            authenticated=False,
+        )
+        if status == 200:
+            self.access = data["access"]
+            self.refresh = data.get("refresh", self.refresh)
+            return True
+        return await self.login(connection)
+
+    async def run(self, start_delay, deadline):
+        await asyncio.sleep(start_delay)
+        connection = HTTPConnection(self.options["url"], self.options["timeout"])
+        try:
+            if not await self.login(connection):
+                return
+            poller = asyncio.create_task(self.poll_dashboard(deadline))
+            try:
+                # Prima pagina: numero di pagine e primi id da cui partire
+                await self.employee_list(connection, page=1)
+                actions = list(TRAFFIC_MIX)
+                weights = list(TRAFFIC_MIX.values())
+                while time.monotonic() < deadline:
+                    await self.think(deadline)
+                    if time.monotonic() >= deadline:
+                        break
+                    action = self.rng.choices(actions, weights)[0]
+                    await getattr(self, action)(connection)
+            finally:
+                await poller
+        finally:
+            await connection.close()
+
+    async def think(self, deadline):
+        pause = self.rng.expovariate(1 / self.options["think_time"]) if self.options["think_time"] > 0 else 0
+        await asyncio.sleep(min(pause, max(0.0, deadline - time.monotonic())))
+
+    async def poll_dashboard(self, deadline):
+        """Dashboard aperta: una GET ogni dashboard_interval, con fase casuale per utente."""
+        interval = self.options["dashboard_interval"]
+        connection = HTTPConnection(self.options["url"], self.options["timeout"])
+        try:
+            # Offset casuale: gli utenti non interrogano tutti nello stesso istante
+            next_poll = time.monotonic() + self.rng.uniform(0, interval)
+            while True:
+                await asyncio.sleep(max(0.0, min(next_poll, deadline) - time.monotonic()))
+                if time.monotonic() >= deadline:
+                    return
+                await self.call(connection, "GET /api/dashboard/stats/", "GET", "/api/dashboard/stats/")
+                next_poll += interval
+        finally:
+            await connection.close()
+
+    # --- Azioni del mix ----------------------------------------------------
+
+    async def employee_list(self, connection, page=None):
+        if page is None:
+            page = min(self.pages, int(self.rng.expovariate(1 / MEAN_LIST_PAGE)) + 1)
+        status, data = await self.call(connection, "GET /api/employees/", "GET", f"/api/employees/?page={page}")
+        if status == 200 and data["results"]:
+            if page == 1:
+                # La prima pagina dà la dimensione di pagina: ceil(count / page_size)
+                self.pages = -(-data["count"] // len(data["results"]))
+            known = set(self.employee_ids)
+            self.employee_ids.extend(e["id"] for e in data["results"] if e["id"] not in known)
+
+    async def employee_detail(self, connection):
+        if self.employee_ids:
+            employee_id = self.rng.choice(self.employee_ids)
+            await self.call(connection, "GET /api/employees/{id}/", "GET", f"/api/employees/{employee_id}/")
+
+    async def contract_list(self, connection):
+        if self.employee_ids:
+            employee_id = self.rng.choice(self.employee_ids)
+            await self.call(
+                connection, "GET /api/employees/{id}/contracts/", "GET", f"/api/employees/{employee_id}/contracts/"
+            )
+
+    async def onboarding_toggle(self, connection):
+        if not self.employee_ids:
+            return
+        employee_id = self.rng.choice(self.employee_ids)
+        path = f"/api/employees/{employee_id}/onboarding/"
+        status, data = await self.call(connection, "GET /api/employees/{id}/onboarding/", "GET", path)
+        steps = (data["results"] if isinstance(data, dict) else data) if status == 200 else None
+        if steps:
+            step = self.rng.choice(steps)
+            await self.call(
+                connection,
+                "PATCH /api/employees/{id}/onboarding/{id}/",
+                "PATCH",
+                f"{path}{step['id']}/",
+                {"is_completed": not step["is_completed"]},
+            )
+
+
+class Command(BaseCommand):
+    help = "Replay a realistic traffic mix against a running instance and report throughput, latency and errors."
+    # Parla solo HTTP con l'istanza sotto test: nessun controllo sul progetto locale
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the instance under test.")
+        parser.add_argument("--email", required=True, help="Login email shared by the simulated users.")
+        parser.add_argument(
+            "--password",
+            default=os.environ.get("LOADTEST_PASSWORD"),
+            help="Login password (default: $LOADTEST_PASSWORD).",
+        )
+        parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users.")
+        parser.add_argument("--duration", type=float, default=60, help="Test length in seconds, ramp-up included.")
+        parser.add_argument("--ramp-up", type=float, default=10, help="Seconds over which users are started.")
+        parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between actions, in seconds.")
+        parser.add_argument("--dashboard-interval", type=float, default=300, help="Dashboard polling period per user.")
+        parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds.")
+        parser.add_argument("--random-seed", type=int, default=None, help="Seed for a reproducible traffic mix.")
+        parser.add_argument(
+            "--server-pid",
+            type=int,
+            help="PID of a local server (gunicorn master, runserver): report CPU cores used and memory per process.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["password"]:
+            raise CommandError("Pass --password or set LOADTEST_PASSWORD.")
+        if options["users"] <= 0 or options["duration"] <= 0:
+            raise CommandError("--users and --duration must be positive.")
+        options["url"] = options["url"].rstrip("/")
+
+        server = ServerProcesses(options["server_pid"]) if options["server_pid"] else None
+
+        self.stdout.write(f"{options['users']} users for {options['duration']:.0f}s against {options['url']}")
+        cpu_before = server.cpu_seconds() if server else None
+        recorder, elapsed = asyncio.run(self.run_load(options))
+        rows = recorder.report(elapsed)
+        self.print_report(rows, elapsed)
+        if server:
+            self.print_server_report(server, server.cpu_seconds() - cpu_before, elapsed, rows.get("TOTAL"))
+
+    async def run_load(self, options):
+        recorder = Recorder()
+        # Login di prova: credenziali sbagliate o istanza giù → errore subito, non N utenti falliti
+        probe = SimulatedUser(options, Recorder(), random.Random())
+        connection = HTTPConnection(options["url"], options["timeout"])
+        try:
+            if not await probe.login(connection):
+                raise CommandError(f"Login failed on {options['url']}/api/auth/login/: {dict(probe.recorder.outcomes)}")
+        finally:
+            await connection.close()
+
+        rng = random.Random(options["random_seed"])
+        started = time.monotonic()
+        deadline = started + options["duration"]
+        step = options["ramp_up"] / options["users"]
+        users = [SimulatedUser(options, recorder, random.Random(rng.random())) for _ in range(options["users"])]
+        await asyncio.gather(*(user.run(index * step, deadline) for index, user in enumerate(users)))
+        return recorder, time.monotonic() - started
+
+    def print_report(self, rows, elapsed):
+        self.stdout.write(f"\nCompleted in {elapsed:.1f}s")
+        self.stdout.write(
+            f"{'endpoint':<42} {'requests':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}"
+        )
+        for endpoint, row in rows.items():
+            line = (
+                f"{endpoint:<42} {row['requests']:>9} {row['rps']:>8} {row['p50_ms'] or '-':>9} "
+                f"{row['p95_ms'] or '-':>9} {row['p99_ms'] or '-':>9} {row['error_rate']:>8.1%}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row["errors"] else line)
+        for endpoint, row in rows.items():
+            if row["errors"] and endpoint != "TOTAL":
+                details = ", ".join(f"{outcome} x{count}" for outcome, count in sorted(row["errors"].items()))
+                self.stdout.write(f"  {endpoint}: {details}")
+
+    def print_server_report(self, server, cpu_seconds, elapsed, total):
+        """Core occupati, throughput per core e memoria per processo del server sotto test."""
+        cores = cpu_seconds / elapsed
+        self.stdout.write(f"\nServer pid {server.pid}: {cpu_seconds:.1f} CPU seconds, {cores:.2f} cores busy")
+        if total and cores:
+            self.stdout.write(f"Throughput per core: {total['rps'] / cores:.1f} rps")
+        usage = server.memory()
+        self.stdout.write(f"{'pid':>8} {'process':<8} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9}")
+        for pid, row in usage.items():
+            role = "root" if pid == server.pid else "worker"
+            self.stdout.write(f"{pid:>8} {role:<8} {row['rss_mb']:>9} {row['pss_mb']:>9} {row['uss_mb']:>9}")
+        workers = [row for pid, row in usage.items() if pid != server.pid]
+        if workers:
+            averages = {key: round(sum(row[key] for row in workers) / len(workers), 1) for key in workers[0]}
+            self.stdout.write(
+                f"Per worker (mean of {len(workers)}): RSS {averages['rss_mb']} MB, "
+                f"PSS {averages['pss_mb']} MB, USS {averages['uss_mb']} MB"
+            )
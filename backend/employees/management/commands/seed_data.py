@@ -0,0 +1,398 @@
+"""Dataset sintetico realistico per ambienti di load test e benchmark.
+
+Uso (su un database dedicato e vuoto, mai su quello di sviluppo):
+    DB_NAME=minijethr_bench python manage.py migrate
+    DB_NAME=minijethr_bench python manage.py seed_data --employees 1000000
+
+Genera:
+- dipendenti attivi (--employees) più una quota di ex dipendenti (--leavers),
+  con un organigramma a più livelli (un manager ogni 10, span di 8 tra manager)
+- storico contrattuale: eventuale stage, rinnovi a tempo determinato,
+  poi indeterminato; gli assunti recenti hanno ancora un contratto a
+  termine in corso, gli ex dipendenti l'ultimo contratto chiuso all'uscita
+- template di onboarding e relativi step per gli assunti degli ultimi due
+  anni: completati per chi è in azienda da più di 90 giorni, parziali per
+  i nuovi arrivati
+
+Il caricamento passa da COPY invece che dall'ORM: niente post_save
+(quindi niente email, audit, outbox o invalidazioni di cache per riga) e
+trigger utente disattivati durante il load. Le tabelle derivate (chiusura
+della gerarchia, contatori di onboarding) vengono poi ricostruite con una
+sola INSERT ... SELECT ciascuna, come il backfill delle migration 0006 e
+0009. Tutto in una transazione: se qualcosa fallisce non resta nulla,
+trigger compresi.
+
+Lo stesso --seed produce sempre lo stesso dataset (nomi, date, contratti,
+organigramma): i benchmark sono confrontabili tra esecuzioni. Le date non
+dipendono dal giorno in cui si lancia il comando: assunzioni, scadenze dei
+contratti e onboarding in corso sono calcolati rispetto a --as-of (default
+DEFAULT_AS_OF, una data fissa).
+
+SQL analogy: BULK INSERT con FIRE_TRIGGERS disattivato, seguito dal
+rebuild delle tabelle di riepilogo, invece di milioni di INSERT singole.
+"""
+
+import io
+import random
+import time
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from employees.models import (
+    Contract,
+    Employee,
+    EmployeeHierarchy,
+    OnboardingProgress,
+    OnboardingStep,
+    OnboardingTemplate,
+)
+from employees.org_chart import invalidate_subtree_sizes
+from employees.services import invalidate_active_templates
+from employees.signals import invalidate_dashboard_cache
+
+DEFAULT_SEED = 42
+# "Oggi" del dataset: fisso, così lo stesso seed dà lo stesso dataset in ogni giorno
+DEFAULT_AS_OF = date(2026, 10, 19)
+# Righe di dipendenti generate e caricate per ogni giro di COPY (memoria costante)
+COPY_CHUNK_SIZE = 50_000
+MANAGER_EVERY = 10
+MANAGER_SPAN = 8
+# Solo gli assunti da quando esiste l'onboarding hanno una checklist
+ONBOARDING_HISTORY_DAYS = 730
+ONBOARDING_DAYS = 90
+MAX_TENURE_DAYS = 15 * 365
+
+FIRST_NAMES = (
+    "Alessandro", "Andrea", "Anna", "Chiara", "Davide", "Elena", "Federica", "Francesco", "Giorgia", "Giulia",
+    "Giuseppe", "Laura", "Lorenzo", "Luca", "Marco", "Maria", "Martina", "Matteo", "Paola", "Paolo",
+    "Roberto", "Sara", "Simone", "Stefano", "Valentina",
+)  # fmt: skip
+LAST_NAMES = (
+    "Barbieri", "Bianchi", "Bruno", "Colombo", "Conti", "Costa", "De Luca", "Esposito", "Ferrari", "Fontana",
+    "Gallo", "Giordano", "Greco", "Lombardi", "Mancini", "Marino", "Moretti", "Ricci", "Rinaldi", "Romano",
+    "Rossi", "Russo", "Santoro", "Rizzo", "Villa",
+)  # fmt: skip
+DEPARTMENTS = ("Amministrazione", "Commerciale", "HR", "IT", "Logistica", "Marketing", "Produzione", "Qualità")
+TEMPLATE_NAMES = (
+    "Firma del contratto",
+    "Consegna badge e chiavi",
+    "Creazione account email",
+    "Formazione sicurezza sul lavoro",
+    "Consegna dotazione IT",
+    "Presentazione al team",
+    "Formazione privacy (GDPR)",
+    "Colloquio di fine periodo di prova",
+)
+
+# Colonne caricate con COPY (id dei dipendenti esplicito: servono per manager_id)
+EMPLOYEE_COLUMNS = (
+    "id", "first_name", "last_name", "email", "role", "department",
+    "hire_date", "manager_id", "is_active", "created_at", "updated_at",
+)  # fmt: skip
+CONTRACT_COLUMNS = ("employee_id", "contract_type", "ccnl", "ral", "start_date", "end_date", "created_at", "updated_at")
+STEP_COLUMNS = ("employee_id", "template_id", "is_completed", "completed_at", "notes", "created_at", "updated_at")
+
+# Chiusura transitiva della gerarchia: stesso risultato dei trigger della 0009
+HIERARCHY_REBUILD_SQL = """
+INSERT INTO employees_employeehierarchy (ancestor_id, descendant_id, depth)
+WITH RECURSIVE chain (ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM employees_employee
+    UNION ALL
+    SELECT e.manager_id, c.descendant_id, c.depth + 1
+    FROM chain c
+    JOIN employees_employee e ON e.id = c.ancestor_id
+    WHERE e.manager_id IS NOT NULL
+)
+SELECT ancestor_id, descendant_id, depth FROM chain
+"""
+
+# Contatori di onboarding: stesso backfill della 0006
+PROGRESS_REBUILD_SQL = """
+INSERT INTO employees_onboardingprogress (employee_id, steps_total, steps_completed)
+SELECT employee_id, COUNT(*), COUNT(*) FILTER (WHERE is_completed)
+FROM employees_onboardingstep
+GROUP BY employee_id
+"""
+
+NULL = r"\N"
+
+# Tabelle scritte dal load (direttamente o con il rebuild)
+LOADED_MODELS = (Employee, Contract, OnboardingStep, EmployeeHierarchy, OnboardingProgress)
+
+
+def timestamp(day, rng=None):
+    """Timestamp UTC in formato COPY: le 9 del giorno, più qualche ora se c'è un rng."""
+    moment = datetime(day.year, day.month, day.day, 9, tzinfo=dt_timezone.utc)
+    if rng is not None:
+        moment += timedelta(minutes=rng.randrange(0, 9 * 60))
+    return moment.isoformat(sep=" ")
+
+
+def contract_history(rng, hire_date, ral, horizon, leave_date=None):
+    """Contratti di un dipendente, dal più vecchio al corrente.
+
+    Percorso tipico: stage (15%), da zero a tre rinnovi a termine di un
+    anno, poi indeterminato. Il contratto che scavalca `horizon` (oggi)
+    è quello in corso: se è a termine mantiene la sua end_date futura.
+    Per un ex dipendente l'ultimo contratto si chiude a `leave_date`.
+
+    Returns:
+        list[tuple]: (contract_type, ral, start_date, end_date or None).
+    """
+    plan = []
+    if rng.random() < 0.15:
+        plan.append((Contract.ContractType.STAGISTA, 180))
+    renewals = rng.choices((0, 1, 2, 3), weights=(40, 30, 20, 10))[0]
+    plan.extend([(Contract.ContractType.DETERMINATO, 365)] * renewals)
+    plan.append((Contract.ContractType.INDETERMINATO, None))
+
+    end_of_history = leave_date or horizon
+    contracts = []
+    start = hire_date
+    for contract_type, days in plan:
+        end = start + timedelta(days=days - 1) if days else None
+        if end is None or end >= end_of_history:
+            contracts.append((contract_type, ral, start, leave_date or end))
+            break
+        contracts.append((contract_type, ral, start, end))
+        start = end + timedelta(days=1)
+        # Aumento a ogni rinnovo
+        ral += rng.randrange(0, 3000, 500)
+    return contracts
+
+
+class Command(BaseCommand):
+    help = "Load a reproducible synthetic dataset (employees, contracts, onboarding) with COPY."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--employees", type=int, required=True, help="Number of active employees to generate.")
+        parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed (same seed, same dataset).")
+        parser.add_argument("--leavers", type=float, default=0.05, help="Former employees, as a share of all rows.")
+        parser.add_argument(
+            "--as-of",
+            type=date.fromisoformat,
+            default=DEFAULT_AS_OF,
+            help=f"Reference date for hire and contract dates (YYYY-MM-DD, default {DEFAULT_AS_OF}).",
+        )
+
+    def handle(self, *args, **options):
+        if options["employees"] <= 0:
+            raise CommandError("--employees must be positive.")
+        if not 0 <= options["leavers"] < 1:
+            raise CommandError("--leavers must be between 0 and 1.")
+        if Employee.all_objects.exists() or OnboardingTemplate.all_objects.exists():
+            raise CommandError("seed_data needs empty employee tables: run it on a freshly migrated or flushed database.")
+
+        self.rng = random.Random(options["seed"])
+        self.as_of = options["as_of"]
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                self.set_triggers(cursor, enabled=False)
+                foreign_keys = self.drop_foreign_keys(cursor)
+                template_ids = self.create_templates()
+                totals = self.load(cursor, options["employees"], options["leavers"], template_ids)
+                self.stdout.write("Rebuilding employee hierarchy and onboarding progress...")
+                self.rebuild_derived_tables(cursor)
+                self.stdout.write("Validating foreign keys...")
+                self.restore_foreign_keys(cursor, foreign_keys)
+                self.set_triggers(cursor, enabled=True)
+            # Il load non passa dai signal: le cache si invalidano una volta sola
+            transaction.on_commit(self.invalidate_caches)
+
+        with connection.cursor() as cursor:
+            for model in LOADED_MODELS:
+                cursor.execute(f"ANALYZE {model._meta.db_table}")  # nosec B608: nomi di tabella dai model
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {totals['employees']} employees ({totals['leavers']} former), "
+                f"{totals['contracts']} contracts, {totals['steps']} onboarding steps "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        )
+
+    # --- Load --------------------------------------------------------------
+
+    def create_templates(self):
+        """Pochi template: bulk_create basta (e non scatena signal)."""
+        templates = OnboardingTemplate.objects.bulk_create(
+            OnboardingTemplate(name=name, order=order) for order, name in enumerate(TEMPLATE_NAMES, start=1)
+        )
+        return [template.pk for template in templates]
+
+    def load(self, cursor, active_target, leaver_share, template_ids):
+        """Genera e carica i dipendenti a blocchi di COPY_CHUNK_SIZE, con contratti e step."""
+        totals = {"employees": 0, "leavers": 0, "contracts": 0, "steps": 0}
+        managers = []
+        active = 0
+        employee_id = 0
+        while active < active_target:
+            employees, contracts, steps = io.StringIO(), io.StringIO(), io.StringIO()
+            for _ in range(COPY_CHUNK_SIZE):
+                if active >= active_target:
+                    break
+                employee_id += 1
+                is_leaver = self.rng.random() < leaver_share
+                if not is_leaver:
+                    active += 1
+                is_manager = not is_leaver and active % MANAGER_EVERY == 1
+                if is_manager:
+                    # Albero dei manager a span fisso: profondità ~log8(manager)
+                    manager_id = managers[(len(managers) - 1) // MANAGER_SPAN] if managers else None
+                    managers.append(employee_id)
+                else:
+                    manager_id = self.rng.choice(managers) if managers else None
+
+                totals["employees"] += 1
+                totals["leavers"] += is_leaver
+                hire_date, leave_date = self.employment_dates(is_leaver)
+                self.write_employee(employees, employee_id, is_manager, manager_id, hire_date, not is_leaver)
+                totals["contracts"] += self.write_contracts(contracts, employee_id, is_manager, hire_date, leave_date)
+                if not is_leaver and (self.as_of - hire_date).days <= ONBOARDING_HISTORY_DAYS:
+                    totals["steps"] += self.write_steps(steps, employee_id, hire_date, template_ids)
+
+            self.copy(cursor, Employee, EMPLOYEE_COLUMNS, employees)
+            self.copy(cursor, Contract, CONTRACT_COLUMNS, contracts)
+            self.copy(cursor, OnboardingStep, STEP_COLUMNS, steps)
+            self.stdout.write(f"Loaded {active}/{active_target} active employees")
+
+        # id espliciti: la sequence deve ripartire dopo l'ultimo
+        cursor.execute("SELECT setval(pg_get_serial_sequence('employees_employee', 'id'), MAX(id)) FROM employees_employee")
+        return totals
+
+    def employment_dates(self, is_leaver):
+        hire_date = self.as_of - timedelta(days=self.rng.randint(0, MAX_TENURE_DAYS))
+        if not is_leaver:
+            return hire_date, None
+        # Ex dipendente: assunto più indietro, uscito dopo almeno un mese
+        hire_date -= timedelta(days=60)
+        return hire_date, hire_date + timedelta(days=self.rng.randint(30, (self.as_of - hire_date).days))
+
+    def write_employee(self, buffer, employee_id, is_manager, manager_id, hire_date, is_active):
+        first_name = self.rng.choice(FIRST_NAMES)
+        last_name = self.rng.choice(LAST_NAMES)
+        email = f"{first_name}.{last_name.replace(' ', '')}.{employee_id}@example.com".lower()
+        created = timestamp(hire_date, self.rng)
+        row = (
+            str(employee_id),
+            first_name,
+            last_name,
+            email,
+            Employee.Role.MANAGER if is_manager else Employee.Role.EMPLOYEE,
+            self.rng.choice(DEPARTMENTS),
+            hire_date.isoformat(),
+            NULL if manager_id is None else str(manager_id),
+            "t" if is_active else "f",
+            created,
+            created,
+        )
+        buffer.write("\t".join(row) + "\n")
+
+    def write_contracts(self, buffer, employee_id, is_manager, hire_date, leave_date):
+        ccnl = self.rng.choice(Contract.CCNL.values)
+        ral = self.rng.randrange(40000, 70000, 500) if is_manager else self.rng.randrange(22000, 40000, 500)
+        history = contract_history(self.rng, hire_date, ral, self.as_of, leave_date)
+        for contract_type, contract_ral, start, end in history:
+            created = timestamp(start)
+            row = (
+                str(employee_id),
+                contract_type,
+                ccnl,
+                f"{contract_ral}.00",
+                start.isoformat(),
+                NULL if end is None else end.isoformat(),
+                created,
+                created,
+            )
+            buffer.write("\t".join(row) + "\n")
+        return len(history)
+
+    def write_steps(self, buffer, employee_id, hire_date, template_ids):
+        """Checklist completa per chi ha finito l'onboarding, parziale per i nuovi arrivati."""
+        days_in = (self.as_of - hire_date).days
+        done_share = min(1.0, days_in / ONBOARDING_DAYS)
+        created = timestamp(hire_date)
+        for template_id in template_ids:
+            completed_at = None
+            if self.rng.random() < done_share:
+                completed_at = timestamp(hire_date + timedelta(days=self.rng.randint(0, min(days_in, ONBOARDING_DAYS))))
+            row = (
+                str(employee_id),
+                str(template_id),
+                "f" if completed_at is None else "t",
+                completed_at or NULL,
+                "",
+                created,
+                completed_at or created,
+            )
+            buffer.write("\t".join(row) + "\n")
+        return len(template_ids)
+
+    @staticmethod
+    def copy(cursor, model, columns, buffer):
+        # cursor.cursor: il cursor psycopg sotto il wrapper di Django (copy() non è esposto)
+        with cursor.cursor.copy(f"COPY {model._meta.db_table} ({', '.join(columns)}) FROM STDIN") as copy:
+            copy.write(buffer.getvalue())
+
+    # --- Tabelle derivate e trigger -----------------------------------------
+
+    @staticmethod
+    def set_triggers(cursor, enabled):
+        """Disattiva/riattiva i trigger utente (gerarchia e progress), non quelli delle FK.
+
+        ALTER TABLE prende un lock esclusivo fino al COMMIT: nessun'altra
+        sessione scrive nel frattempo, quindi nessuna riga sfugge ai trigger.
+        """
+        action = "ENABLE" if enabled else "DISABLE"
+        for model in (Employee, OnboardingStep):
+            cursor.execute(f"ALTER TABLE {model._meta.db_table} {action} TRIGGER USER")  # nosec B608
+
+    @staticmethod
+    def drop_foreign_keys(cursor):
+        """Toglie le FK delle tabelle caricate e ne ritorna le definizioni.
+
+        Con le FK attive ogni riga copiata accoda un controllo (una SELECT
+        sulla tabella referenziata, eseguita al COMMIT perché le FK di
+        Django sono DEFERRABLE): milioni di lookup singoli. Ricreate a fine
+        load, Postgres le valida con una sola scansione per vincolo.
+
+        Returns:
+            list[tuple]: (tabella, nome del vincolo, definizione).
+        """
+        cursor.execute(
+            """
+            SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE contype = 'f' AND conrelid = ANY(%s::regclass[])
+            ORDER BY conrelid::regclass::text, conname
+            """,
+            [[model._meta.db_table for model in LOADED_MODELS]],
+        )
+        foreign_keys = cursor.fetchall()
+        for table, name, _definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')  # nosec B608: nomi da pg_constraint
+        return foreign_keys
+
+    @staticmethod
+    def restore_foreign_keys(cursor, foreign_keys):
+        for table, name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')  # nosec B608
+
+    @staticmethod
+    def rebuild_derived_tables(cursor):
+        # Statistiche fresche: senza, il planner stima la tabella appena
+        # caricata come vuota e la CTE ricorsiva sceglie un piano pessimo
+        cursor.execute(f"ANALYZE {Employee._meta.db_table}")  # nosec B608
+        cursor.execute(HIERARCHY_REBUILD_SQL)
+        cursor.execute(PROGRESS_REBUILD_SQL)
+
+    @staticmethod
+    def invalidate_caches():
+        invalidate_dashboard_cache()
+        invalidate_subtree_sizes()
+        invalidate_active_templates()
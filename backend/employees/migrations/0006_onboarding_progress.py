@@ -0,0 +1,131 @@
+# Generated by Django 5.1.15 on 2026-10-19 06:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Trigger statement-level con transition tables (PostgreSQL 10+):
+# scatta UNA volta per statement (non per riga) e vede tutte le righe
+# toccate in new_steps/old_steps. Un INSERT ... SELECT di 1000 step
+# diventa un solo upsert aggregato per dipendente.
+#
+# DELETE fa solo UPDATE (mai INSERT): durante l'hard delete di un dipendente
+# la riga di progress può essere già stata cancellata dal collector di
+# Django, e ricrearla violerebbe la FK al commit.
+CREATE_TRIGGER_SQL = """
+CREATE FUNCTION employees_onboarding_progress_sync() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Ogni ramo referenzia solo le transition tables del proprio evento:
+    -- plpgsql pianifica uno statement solo quando lo esegue.
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO employees_onboardingprogress AS p (employee_id, steps_total, steps_completed)
+        SELECT employee_id, COUNT(*), COUNT(*) FILTER (WHERE is_completed)
+        FROM new_steps
+        GROUP BY employee_id
+        ON CONFLICT (employee_id) DO UPDATE
+        SET steps_total = p.steps_total + EXCLUDED.steps_total,
+            steps_completed = p.steps_completed + EXCLUDED.steps_completed;
+
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Delta netto: righe nuove (+1) meno righe vecchie (-1) per dipendente.
+        -- Solo UPDATE, niente upsert: uno step aggiornato esiste già, quindi
+        -- anche la riga di progress (e un delta negativo violerebbe il CHECK >= 0
+        -- sulla riga candidata dell'INSERT prima ancora dell'ON CONFLICT).
+        UPDATE employees_onboardingprogress p
+        SET steps_total = p.steps_total + d.total,
+            steps_completed = p.steps_completed + d.completed
+        FROM (
+            SELECT employee_id, SUM(total) AS total, SUM(completed) AS completed
+            FROM (
+                SELECT employee_id, 1 AS total, is_completed::int AS completed FROM new_steps
+                UNION ALL
+                SELECT employee_id, -1, -(is_completed::int) FROM old_steps
+            ) delta
+            GROUP BY employee_id
+            HAVING SUM(total) <> 0 OR SUM(completed) <> 0
+        ) d
+        WHERE p.employee_id = d.employee_id;
+
+    ELSE
+        UPDATE employees_onboardingprogress p
+        SET steps_total = p.steps_total - d.total,
+            steps_completed = p.steps_completed - d.completed
+        FROM (
+            SELECT employee_id, COUNT(*) AS total, COUNT(*) FILTER (WHERE is_completed) AS completed
+            FROM old_steps
+            GROUP BY employee_id
+        ) d
+        WHERE p.employee_id = d.employee_id;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER onboarding_progress_insert
+    AFTER INSERT ON employees_onboardingstep
+    REFERENCING NEW TABLE AS new_steps
+    FOR EACH STATEMENT EXECUTE FUNCTION employees_onboarding_progress_sync();
+
+CREATE TRIGGER onboarding_progress_update
+    AFTER UPDATE ON employees_onboardingstep
+    REFERENCING OLD TABLE AS old_steps NEW TABLE AS new_steps
+    FOR EACH STATEMENT EXECUTE FUNCTION employees_onboarding_progress_sync();
+
+CREATE TRIGGER onboarding_progress_delete
+    AFTER DELETE ON employees_onboardingstep
+    REFERENCING OLD TABLE AS old_steps
+    FOR EACH STATEMENT EXECUTE FUNCTION employees_onboarding_progress_sync();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER onboarding_progress_delete ON employees_onboardingstep;
+DROP TRIGGER onboarding_progress_update ON employees_onboardingstep;
+DROP TRIGGER onboarding_progress_insert ON employees_onboardingstep;
+DROP FUNCTION employees_onboarding_progress_sync();
+"""
+
+# Backfill: i contatori per gli step già esistenti
+BACKFILL_SQL = """
+INSERT INTO employees_onboardingprogress (employee_id, steps_total, steps_completed)
+SELECT employee_id, COUNT(*), COUNT(*) FILTER (WHERE is_completed)
+FROM employees_onboardingstep
+GROUP BY employee_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0005_onboarding_propagation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OnboardingProgress",
+            fields=[
+                (
+                    "employee",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="onboarding_progress",
+                        serialize=False,
+                        to="employees.employee",
+                    ),
+                ),
+                ("steps_total", models.PositiveIntegerField(default=0)),
+                ("steps_completed", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("steps_completed__lt", models.F("steps_total"))),
+                        fields=["employee"],
+                        name="onboarding_in_progress_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-19 07:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0007_pending_welcome_email"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                condition=models.Q(("is_active", True)), fields=["last_name", "first_name"], name="employee_active_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["role", "last_name", "first_name"],
+                name="employee_active_role_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                condition=models.Q(("is_active", True)), fields=["hire_date"], name="employee_active_hire_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="onboardingtemplate",
+            index=models.Index(
+                condition=models.Q(("is_active", True)), fields=["order", "name"], name="template_active_order_idx"
+            ),
+        ),
+    ]
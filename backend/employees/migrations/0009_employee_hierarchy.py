@@ -0,0 +1,119 @@
+# Generated by Django 5.1.15 on 2026-10-19 07:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Closure table mantenuta da trigger row-level su employees_employee.
+# Un cambio di manager è raro e tocca una riga: il trigger per riga è
+# il più semplice, e copre save(), queryset.update() e SQL raw.
+CREATE_TRIGGERS_SQL = """
+-- Backfill: dipendenti esistenti, tutti senza manager → solo la riga su sé stessi
+INSERT INTO employees_employeehierarchy (ancestor_id, descendant_id, depth)
+SELECT id, id, 0 FROM employees_employee;
+
+-- INSERT: riga su sé stessi + una riga per ogni antenato del manager
+CREATE FUNCTION employees_hierarchy_insert() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO employees_employeehierarchy (ancestor_id, descendant_id, depth)
+    SELECT ancestor_id, NEW.id, depth + 1
+    FROM employees_employeehierarchy
+    WHERE descendant_id = NEW.manager_id
+    UNION ALL
+    SELECT NEW.id, NEW.id, 0;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER employee_hierarchy_insert
+AFTER INSERT ON employees_employee
+FOR EACH ROW EXECUTE FUNCTION employees_hierarchy_insert();
+
+-- UPDATE di manager_id: sposta l'intero sottoalbero del dipendente.
+-- 1. stacca il sottoalbero da tutti gli antenati esterni al sottoalbero
+-- 2. lo riattacca sotto il nuovo manager (prodotto cartesiano antenati × sottoalbero)
+CREATE FUNCTION employees_hierarchy_move() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.manager_id IS NOT NULL AND EXISTS (
+        SELECT 1 FROM employees_employeehierarchy
+        WHERE ancestor_id = NEW.id AND descendant_id = NEW.manager_id
+    ) THEN
+        RAISE EXCEPTION 'Employee % cannot report to % (reporting cycle)', NEW.id, NEW.manager_id
+            USING ERRCODE = 'check_violation';
+    END IF;
+
+    DELETE FROM employees_employeehierarchy
+    WHERE descendant_id IN (SELECT descendant_id FROM employees_employeehierarchy WHERE ancestor_id = NEW.id)
+      AND ancestor_id NOT IN (SELECT descendant_id FROM employees_employeehierarchy WHERE ancestor_id = NEW.id);
+
+    INSERT INTO employees_employeehierarchy (ancestor_id, descendant_id, depth)
+    SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+    FROM employees_employeehierarchy above
+    CROSS JOIN employees_employeehierarchy below
+    WHERE above.descendant_id = NEW.manager_id
+      AND below.ancestor_id = NEW.id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER employee_hierarchy_move
+AFTER UPDATE OF manager_id ON employees_employee
+FOR EACH ROW
+WHEN (OLD.manager_id IS DISTINCT FROM NEW.manager_id)
+EXECUTE FUNCTION employees_hierarchy_move();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS employee_hierarchy_move ON employees_employee;
+DROP TRIGGER IF EXISTS employee_hierarchy_insert ON employees_employee;
+DROP FUNCTION IF EXISTS employees_hierarchy_move();
+DROP FUNCTION IF EXISTS employees_hierarchy_insert();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0008_active_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employee",
+            name="manager",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="direct_reports",
+                to="employees.employee",
+            ),
+        ),
+        migrations.CreateModel(
+            name="EmployeeHierarchy",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("depth", models.PositiveIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="employees.employee",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="ancestor_links", to="employees.employee"
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("ancestor", "descendant"), name="employee_hierarchy_unique")],
+            },
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, reverse_sql=DROP_TRIGGERS_SQL),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("employees", "0009_employee_hierarchy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employee",
+            name="welcome_email_sent_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,7 +1,30 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
+from audit.models import AuditedModelMixin
 
-class Employee(models.Model):
+
+class ActiveManager(models.Manager):
+    """Default manager of soft-deletable models: only rows with is_active=True.
+
+    Being the first manager declared, it is also `_default_manager`: every
+    `Model.objects` query, get_object_or_404() and the browsable API see
+    current rows only, without repeating `filter(is_active=True)` in each view.
+    Use `Model.all_objects` where inactive rows matter (dashboard counters,
+    history, restore, admin, uniqueness checks).
+
+    Related-object access (contract.employee) goes through the base manager
+    and still reaches inactive rows.
+
+    SQL analogy: a view `CREATE VIEW active_employees AS SELECT * FROM
+    employees WHERE is_active = 1` that every query reads from.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
+
+
+class Employee(AuditedModelMixin, models.Model):
     """Core employee model for Mini Jet HR.
 
     Supports soft delete (US-004): employees are marked inactive
@@ -19,18 +42,110 @@ class Employee(models.Model):
     role = models.CharField(max_length=20, choices=Role.choices, default=Role.EMPLOYEE)
     department = models.CharField(max_length=100, blank=True, default="")
     hire_date = models.DateField()
+    # Reporting line (US-012). The full hierarchy is materialized in
+    # EmployeeHierarchy by a database trigger on every change of this column.
+    manager = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="direct_reports",
+    )
     is_active = models.BooleanField(default=True)
+    # Set by the welcome email task/dispatcher once the email is delivered:
+    # a republished outbox message finds it and does not send it again.
+    welcome_email_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    audit_employee_field = "id"
+
     class Meta:
         ordering = ["last_name", "first_name"]
+        # Partial indexes: only current staff. Leavers accumulate over the
+        # years but never enter these indexes, so the hot queries (default
+        # list ordering, role filter, hire date ordering and dashboard
+        # new hires/headcount) keep scanning a structure sized on the
+        # active headcount.
+        indexes = [
+            models.Index(
+                fields=["last_name", "first_name"],
+                name="employee_active_name_idx",
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=["role", "last_name", "first_name"],
+                name="employee_active_role_idx",
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=["hire_date"],
+                name="employee_active_hire_date_idx",
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.last_name}, {self.first_name}"
 
+    def validate_unique(self, exclude=None):
+        """Check unique fields against every row, inactive ones included.
+
+        Django looks for duplicates through `_default_manager`, which only
+        sees active rows: full_clean() (the admin form) would accept an
+        ex-employee's email and the save would then fail on the UNIQUE
+        constraint with an IntegrityError. Those fields are checked here
+        against `all_objects` instead.
+        """
+        exclude = set(exclude or ())
+        unique_fields = [field for field in self._meta.fields if field.unique and not field.primary_key]
+        super().validate_unique(exclude=exclude | {field.name for field in unique_fields})
+
+        errors = {}
+        for field in unique_fields:
+            value = getattr(self, field.attname)
+            if field.name in exclude or value is None:
+                continue
+            if Employee.all_objects.filter(**{field.attname: value}).exclude(pk=self.pk).exists():
+                errors[field.name] = [self.unique_error_message(Employee, [field.name])]
+        if errors:
+            raise ValidationError(errors)
+
+
+class EmployeeHierarchy(models.Model):
+    """Closure table of the reporting lines: one row per (ancestor, descendant).
+
+    Every employee has a depth-0 row to itself, a depth-1 row from their
+    manager, a depth-2 row from their manager's manager, and so on.
+    "Everyone under X, at any depth" becomes a single indexed lookup
+    (ancestor_id = X) instead of a recursive walk on every request.
+
+    Maintained by PostgreSQL triggers on employees_employee (migration 0009):
+    INSERT adds the new employee's paths, a change of manager_id moves the
+    whole subtree. Never written by the application: treat it as read-only.
 
-class Contract(models.Model):
+    SQL analogy: the hierarchyid / closure table pattern — the expansion of
+    WITH RECURSIVE reports AS (...) stored once and kept in sync by trigger.
+    """
+
+    # Niente indice separato su ancestor: lo copre il vincolo UNIQUE (ancestor, descendant)
+    ancestor = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="descendant_links", db_index=False)
+    descendant = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["ancestor", "descendant"], name="employee_hierarchy_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} → {self.descendant_id} ({self.depth})"
+
+
+class Contract(AuditedModelMixin, models.Model):
     """Contract associated to an employee (US-005).
 
     A single employee can have multiple contracts over time.
@@ -81,14 +196,25 @@ class OnboardingTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ["order", "name"]
+        indexes = [
+            # The active checklist blueprint, in display order (template snapshot)
+            models.Index(
+                fields=["order", "name"],
+                name="template_active_order_idx",
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class OnboardingStep(models.Model):
+class OnboardingStep(AuditedModelMixin, models.Model):
     """Progress record for a specific employee's onboarding task (US-008).
 
     This is a fact/bridge table: one row per (employee, template) pair.
@@ -117,3 +243,114 @@ class OnboardingStep(models.Model):
     def __str__(self):
         status = "done" if self.is_completed else "pending"
         return f"{self.employee} - {self.template.name} ({status})"
+
+
+class OnboardingProgress(models.Model):
+    """Denormalized onboarding counters, one row per employee with steps.
+
+    Maintained by a PostgreSQL statement-level trigger on OnboardingStep
+    (migration 0006), in the same transaction as the step change: every
+    write path is covered — save(), bulk_create(), queryset.update() and
+    raw SQL — without aggregating onboarding_steps at read time.
+
+    SQL analogy: an indexed view / summary table kept in sync by an
+    AFTER INSERT/UPDATE/DELETE trigger, instead of running
+    SELECT COUNT(*) ... GROUP BY employee_id on every read.
+
+    Never written by the application: treat it as read-only.
+    """
+
+    employee = models.OneToOneField(
+        Employee,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="onboarding_progress",
+    )
+    steps_total = models.PositiveIntegerField(default=0)
+    steps_completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Partial index: only employees still in onboarding (a small
+            # fraction of the table). Used by the dashboard and the board.
+            models.Index(
+                fields=["employee"],
+                name="onboarding_in_progress_idx",
+                condition=models.Q(steps_completed__lt=models.F("steps_total")),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.employee}: {self.steps_completed}/{self.steps_total}"
+
+    @property
+    def is_in_progress(self):
+        return self.steps_completed < self.steps_total
+
+
+class OnboardingPropagation(models.Model):
+    """Background job that adds a template's step to every in-flight employee.
+
+    When HR creates or re-activates a template, employees already in
+    onboarding would only get the new step via one POST per person.
+    A propagation runs as a Celery task and inserts the missing steps
+    in chunks; this row tracks its progress so the API can report it.
+
+    SQL analogy: a row in a job history table (like msdb.dbo.sysjobhistory),
+    updated by the job step after each batch.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    template = models.ForeignKey(OnboardingTemplate, on_delete=models.CASCADE, related_name="propagations")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    total_employees = models.PositiveIntegerField(default=0)
+    processed_employees = models.PositiveIntegerField(default=0)
+    created_steps = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.template.name} propagation ({self.status})"
+
+    @property
+    def progress(self):
+        """Completion percentage (0-100) based on processed employees."""
+        if self.status == self.Status.COMPLETED:
+            return 100
+        if not self.total_employees:
+            return 0
+        return min(100, round(self.processed_employees * 100 / self.total_employees))
+
+
+class PendingWelcomeEmail(models.Model):
+    """Queue of welcome emails waiting for the batched dispatcher (US-007).
+
+    With WELCOME_EMAIL_BATCHING on, employee creation only inserts a row
+    here; a Celery task later drains the queue and sends the emails in
+    batches over one SMTP connection. A row is deleted once its email
+    is sent; on failure it stays, with the error, for the next attempt.
+
+    SQL analogy: msdb.dbo.sysmail_unsentitems — Database Mail queues the
+    message and a single external process delivers the backlog.
+    """
+
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, related_name="pending_welcome_email")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"Welcome email for {self.employee} ({self.attempts} attempts)"
@@ -0,0 +1,152 @@
+"""Organigramma: albero dei riporti con il numero di persone sotto ogni nodo.
+
+Due ingredienti, con costi molto diversi:
+
+1. La struttura dell'albero (chi riporta a chi, fino a N livelli sotto un
+   nodo) viene da UNA query ricorsiva (WITH RECURSIVE) su employees.manager_id:
+   costa quanto i nodi restituiti, non quanto l'azienda.
+
+2. Le dimensioni dei sottoalberi (riporti diretti e totali) sono un GROUP BY
+   sull'intera closure table: costoso con 50.000 dipendenti, quindi viene
+   calcolato una volta, cachato in two_tier_cache e invalidato dai signal
+   quando cambiano le linee di riporto (nuovo dipendente, cambio manager,
+   soft delete/restore). Espandere un nodo costa così una sola query
+   ricorsiva di profondità 1 più una lettura in L1.
+
+SQL analogy: il punto 2 è una materialized view
+    CREATE MATERIALIZED VIEW subtree_sizes AS
+    SELECT ancestor_id, COUNT(*) FILTER (WHERE depth = 1), COUNT(*) ...
+con REFRESH guidato dai trigger invece che da un job schedulato.
+"""
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Count, Exists, OuterRef, Q
+
+from minijet.cache import two_tier_cache
+from minijet.replicas import mark_data_changed
+
+from .models import Employee, EmployeeHierarchy
+
+# Chiave cache per le dimensioni dei sottoalberi (vedi get_subtree_sizes)
+SUBTREE_SIZES_CACHE_KEY = "org_chart_subtree_sizes"
+
+NODE_FIELDS = ["id", "first_name", "last_name", "role", "department", "manager_id"]
+
+
+def get_subtree_sizes():
+    """Ritorna {employee_id: (riporti_diretti, riporti_totali)} per chi ha riporti.
+
+    Solo i manager compaiono nel dizionario: chi non c'è ha (0, 0).
+    Stessa regola dell'albero di build_org_chart: un riporto conta solo se
+    è attivo e lo è tutta la catena fino al nodo. Chi sta sotto un manager
+    disattivato nell'albero diventa un vertice, quindi non conta nemmeno
+    nei totali dei livelli sopra.
+
+    SQL equivalente (solo su cache MISS):
+        SELECT h.ancestor_id,
+               COUNT(*) FILTER (WHERE h.depth = 1) AS direct,
+               COUNT(*) AS total
+        FROM employees_employeehierarchy h
+        JOIN employees_employee d ON d.id = h.descendant_id
+        WHERE h.depth > 0 AND d.is_active
+          AND NOT EXISTS (            -- un manager inattivo in mezzo alla catena
+              SELECT 1 FROM employees_employeehierarchy up
+              JOIN employees_employee m ON m.id = up.ancestor_id
+              WHERE up.descendant_id = h.descendant_id
+                AND up.depth > 0 AND up.depth < h.depth AND NOT m.is_active)
+        GROUP BY h.ancestor_id;
+    """
+    return two_tier_cache.get_or_set(
+        SUBTREE_SIZES_CACHE_KEY,
+        _load_subtree_sizes,
+        settings.CACHE_ORG_CHART_TTL,
+    )
+
+
+def _load_subtree_sizes():
+    # Gli antenati del riporto più vicini di `ancestor`: i manager intermedi della catena
+    inactive_in_between = EmployeeHierarchy.objects.filter(
+        descendant_id=OuterRef("descendant_id"),
+        depth__gt=0,
+        depth__lt=OuterRef("depth"),
+        ancestor__is_active=False,
+    )
+    rows = (
+        EmployeeHierarchy.objects.filter(depth__gt=0, descendant__is_active=True)
+        .filter(~Exists(inactive_in_between))
+        .values("ancestor_id")
+        .annotate(direct=Count("pk", filter=Q(depth=1)), total=Count("pk"))
+        .values_list("ancestor_id", "direct", "total")
+        .order_by()
+    )
+    return {ancestor_id: (direct, total) for ancestor_id, direct, total in rows}
+
+
+def invalidate_subtree_sizes():
+    """Invalida le dimensioni dei sottoalberi in tutti i processi."""
+    two_tier_cache.invalidate(SUBTREE_SIZES_CACHE_KEY)
+    mark_data_changed()
+
+
+def build_org_chart(root_id=None, depth=2):
+    """Costruisce l'organigramma a partire da un nodo, fino a `depth` livelli sotto.
+
+    Senza `root_id` parte dai vertici: i dipendenti attivi senza un manager
+    attivo (un manager disattivato non nasconde i suoi riporti).
+
+    I nodi all'ultimo livello hanno `children: None` se hanno riporti non
+    ancora caricati (il frontend li espande con ?root=<id>), `[]` se sono foglie.
+
+    Args:
+        root_id: PK del nodo di partenza, o None per i vertici.
+        depth: livelli sotto la radice da includere (0 = solo la radice).
+
+    Returns:
+        list[dict]: i nodi radice, ciascuno con i propri `children` annidati.
+        Lista vuota se root_id non esiste o non è attivo.
+    """
+    employees_table = Employee._meta.db_table
+    columns = ", ".join(f"e.{field}" for field in NODE_FIELDS)
+    if root_id is None:
+        anchor = f"NOT EXISTS (SELECT 1 FROM {employees_table} m WHERE m.id = e.manager_id AND m.is_active)"
+    else:
+        anchor = "e.id = %(root)s"
+    sql = f"""
+        WITH RECURSIVE chart AS (
+            SELECT {columns}, 0 AS level
+            FROM {employees_table} e
+            WHERE e.is_active AND {anchor}
+            UNION ALL
+            SELECT {columns}, c.level + 1
+            FROM chart c
+            JOIN {employees_table} e ON e.manager_id = c.id
+            WHERE e.is_active AND c.level < %(depth)s
+        )
+        SELECT * FROM chart
+        ORDER BY level, last_name, first_name, id
+    """  # nosec B608: solo nomi di tabella e colonne dal model, i valori sono parametri
+    # SQL raw: il router non la vede, l'alias (replica o primario) si chiede a lui
+    with connections[router.db_for_read(Employee)].cursor() as cursor:
+        cursor.execute(sql, {"root": root_id, "depth": depth})
+        rows = cursor.fetchall()
+
+    sizes = get_subtree_sizes()
+    nodes = {}
+    roots = []
+    # ORDER BY level: il manager di ogni nodo è già in `nodes` quando lo incontriamo
+    for *values, level in rows:
+        node = dict(zip(NODE_FIELDS, values))
+        node["manager"] = node.pop("manager_id")
+        node["direct_reports"], node["total_reports"] = sizes.get(node["id"], (0, 0))
+        if level < depth or node["direct_reports"] == 0:
+            node["children"] = []
+        else:
+            node["children"] = None
+        nodes[node["id"]] = node
+
+        if level == 0:
+            roots.append(node)
+        else:
+            nodes[node["manager"]]["children"].append(node)
+    return roots
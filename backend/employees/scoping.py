@@ -0,0 +1,55 @@
+"""Scope dei dati per ruolo (US-012): ogni utente vede solo ciò che gli compete.
+
+- HR Admin (is_staff / superuser): tutto
+- Manager: sé stesso e tutto il proprio sottoalbero, a ogni livello
+- Dipendente: sé stesso (un sottoalbero di una sola persona)
+- Utente senza dipendente collegato e senza is_staff: niente
+
+Il sottoalbero viene dalla closure table EmployeeHierarchy: un solo
+semi-join indicizzato, qualunque sia la profondità della gerarchia.
+Elencare i 5.000 riporti di un VP costa come elencare un team di cinque.
+
+SQL equivalente:
+    SELECT ... FROM contracts
+    WHERE employee_id IN (
+        SELECT descendant_id FROM employees_employeehierarchy
+        WHERE ancestor_id = @user_employee_id   -- indice UNIQUE (ancestor, descendant)
+    );
+"""
+
+from .models import Employee, EmployeeHierarchy
+
+
+def sees_everything(user):
+    return user.is_staff or user.is_superuser
+
+
+def scope_queryset(queryset, user, employee_field="employee"):
+    """Filtra un queryset sulle righe visibili all'utente.
+
+    Args:
+        queryset: queryset da filtrare (Employee, Contract, OnboardingStep, ...).
+        user: request.user. employee_id è una colonna della riga utente,
+              già caricata dall'autenticazione: nessuna query in più.
+        employee_field: percorso verso il dipendente ("pk" per Employee stesso).
+    """
+    if sees_everything(user):
+        return queryset
+    if user.employee_id is None:
+        return queryset.none()
+    subtree = EmployeeHierarchy.objects.filter(ancestor_id=user.employee_id).values("descendant_id")
+    return queryset.filter(**{f"{employee_field}__in": subtree})
+
+
+def scoped_employees(user, manager=Employee.objects):
+    """Dipendenti visibili all'utente (attivi, o tutti con manager=Employee.all_objects)."""
+    return scope_queryset(manager.all(), user, employee_field="pk")
+
+
+def in_scope(user, employee_id):
+    """True se il dipendente è visibile all'utente (un EXISTS sulla closure table)."""
+    if sees_everything(user):
+        return True
+    if user.employee_id is None:
+        return False
+    return EmployeeHierarchy.objects.filter(ancestor_id=user.employee_id, descendant_id=employee_id).exists()
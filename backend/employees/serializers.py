@@ -1,8 +1,18 @@
 from datetime import date
 
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
-from .models import Contract, Employee, OnboardingStep, OnboardingTemplate
+from .models import (
+    Contract,
+    Employee,
+    EmployeeHierarchy,
+    OnboardingProgress,
+    OnboardingPropagation,
+    OnboardingStep,
+    OnboardingTemplate,
+)
+from .scoping import scoped_employees, sees_everything
 
 
 class EmployeeSerializer(serializers.ModelSerializer):
@@ -16,11 +26,28 @@ class EmployeeSerializer(serializers.ModelSerializer):
             "role",
             "department",
             "hire_date",
+            "manager",
             "is_active",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
+        extra_kwargs = {
+            # Il vincolo UNIQUE del DB copre anche gli inattivi: il controllo
+            # deve usare all_objects, non il manager di default (solo attivi).
+            "email": {"validators": [UniqueValidator(queryset=Employee.all_objects.all())]},
+        }
+
+    def get_fields(self):
+        fields = super().get_fields()
+        user = getattr(self.context.get("request"), "user", None)
+        # Anonimo: generazione dello schema e warm-up, non una request vera
+        if user is not None and user.is_authenticated and not sees_everything(user):
+            # Fuori da HR il nuovo manager va scelto nel proprio sottoalbero: un id
+            # fuori scope è "inesistente" come uno che non c'è (nessun leak), e un
+            # dipendente non può agganciarsi a un altro ramo dell'organigramma.
+            fields["manager"].queryset = scoped_employees(user)
+        return fields
 
     def validate_email(self, value):
         if self.instance and value != self.instance.email:
@@ -32,6 +59,31 @@ class EmployeeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("La data di assunzione non può essere futura.")
         return value
 
+    def validate_manager(self, value):
+        # Togliere il manager porta il dipendente fuori dal sottoalbero di chi
+        # lo gestisce, cioè fuori dal suo scope: solo HR può farlo.
+        user = getattr(self.context.get("request"), "user", None)
+        if value is None and self.instance is not None and self.instance.manager_id is not None:
+            if user is not None and not sees_everything(user):
+                raise serializers.ValidationError("Solo HR può rimuovere il manager di un dipendente.")
+        # Niente cicli: il nuovo manager non può stare nel sottoalbero del dipendente.
+        # Il trigger sul DB rifiuta comunque il ciclo; qui diamo un 400 leggibile.
+        # SQL: SELECT 1 FROM hierarchy WHERE ancestor_id = @id AND descendant_id = @manager
+        if value is not None and self.instance is not None:
+            if EmployeeHierarchy.objects.filter(ancestor_id=self.instance.pk, descendant_id=value.pk).exists():
+                raise serializers.ValidationError("Il manager non può essere il dipendente stesso o un suo riporto.")
+        return value
+
+    def validate(self, attrs):
+        # In creazione il manager può mancare del tutto (validate_manager non
+        # scatta): senza manager il nuovo dipendente è un vertice, fuori dallo
+        # scope di chi lo crea. Fuori da HR va agganciato al proprio sottoalbero.
+        user = getattr(self.context.get("request"), "user", None)
+        if self.instance is None and attrs.get("manager") is None:
+            if user is not None and user.is_authenticated and not sees_everything(user):
+                raise serializers.ValidationError({"manager": "Solo HR può creare un dipendente senza manager."})
+        return attrs
+
 
 class ContractSerializer(serializers.ModelSerializer):
     # SerializerMethodField: campo calcolato (read-only), come una computed column.
@@ -113,8 +165,14 @@ class OnboardingTemplateSerializer(serializers.ModelSerializer):
 
     Simple CRUD — no computed fields, no cross-field validation.
     HR uses this to define what tasks every new employee must complete.
+
+    `propagate` is a write-only flag, not a model field: when true on create
+    (or on an update that leaves the template active), the view starts a
+    background job that adds the new step to every employee still in onboarding.
     """
 
+    propagate = serializers.BooleanField(write_only=True, required=False, default=False)
+
     class Meta:
         model = OnboardingTemplate
         fields = [
@@ -123,12 +181,36 @@ class OnboardingTemplateSerializer(serializers.ModelSerializer):
             "description",
             "order",
             "is_active",
+            "propagate",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
+class OnboardingPropagationSerializer(serializers.ModelSerializer):
+    """Read-only progress of a template propagation job."""
+
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = OnboardingPropagation
+        fields = [
+            "id",
+            "template",
+            "status",
+            "total_employees",
+            "processed_employees",
+            "created_steps",
+            "progress",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+
 class OnboardingStepSerializer(serializers.ModelSerializer):
     """Serializer for an employee's onboarding progress.
 
@@ -164,3 +246,67 @@ class OnboardingStepSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+
+
+class OnboardingStepBatchItemSerializer(serializers.Serializer):
+    """One item of a batch checklist update: {id, is_completed?, notes?}.
+
+    Not a ModelSerializer: items are applied with a single set-based UPDATE
+    (services.update_onboarding_steps), never loaded as model instances.
+    """
+
+    id = serializers.IntegerField()
+    is_completed = serializers.BooleanField(required=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class OnboardingStepBatchSerializer(serializers.ListSerializer):
+    """List of batch items. Rejects empty batches and duplicate step ids."""
+
+    child = OnboardingStepBatchItemSerializer()
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Specificare almeno uno step.")
+        ids = [item["id"] for item in attrs]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Ogni step può comparire una sola volta.")
+        return attrs
+
+
+class OnboardingBoardSerializer(serializers.ModelSerializer):
+    """One row of the onboarding board: employee data + denormalized progress.
+
+    Employee fields come from select_related("employee") (one JOIN),
+    `progress` is the percentage annotated by the view (used for ordering too).
+    """
+
+    employee = serializers.IntegerField(source="employee_id", read_only=True)
+    first_name = serializers.CharField(source="employee.first_name", read_only=True)
+    last_name = serializers.CharField(source="employee.last_name", read_only=True)
+    email = serializers.EmailField(source="employee.email", read_only=True)
+    department = serializers.CharField(source="employee.department", read_only=True)
+    hire_date = serializers.DateField(source="employee.hire_date", read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = OnboardingProgress
+        fields = [
+            "employee",
+            "first_name",
+            "last_name",
+            "email",
+            "department",
+            "hire_date",
+            "steps_completed",
+            "steps_total",
+            "progress",
+        ]
+        read_only_fields = fields
+
+
+class OrgChartQuerySerializer(serializers.Serializer):
+    """Query parameters of GET /api/org-chart/ (validated like a request body)."""
+
+    root = serializers.IntegerField(required=False, min_value=1)
+    depth = serializers.IntegerField(required=False, default=2, min_value=0, max_value=10)
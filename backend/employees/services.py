@@ -5,12 +5,93 @@ e dai signal (eventi). Equivale a una stored procedure richiamabile
 da contesti diversi (trigger, API, management command, ecc.).
 """
 
-from datetime import date
+import logging
+import smtplib
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import date, datetime
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import connection, transaction
+from django.db.models import Case, F, TextField, Value, When
+from django.utils import timezone
 
-from .models import OnboardingStep, OnboardingTemplate
+from audit.services import record_bulk_create, record_bulk_update
+from minijet.cache import two_tier_cache
+from minijet.replicas import mark_data_changed
+from outbox.models import OutboxMessage
+from outbox.services import enqueue
+
+from .models import (
+    Employee,
+    OnboardingProgress,
+    OnboardingPropagation,
+    OnboardingStep,
+    OnboardingTemplate,
+    PendingWelcomeEmail,
+)
+
+logger = logging.getLogger(__name__)
+
+# Chiave cache per lo snapshot dei template attivi (vedi get_active_templates).
+ACTIVE_TEMPLATES_CACHE_KEY = "onboarding_active_templates"
+
+
+@dataclass(frozen=True)
+class TemplateSnapshot:
+    """Copia immutabile di una riga di OnboardingTemplate.
+
+    Lo snapshot è condiviso tra tutte le request del processo (cache L1):
+    frozen=True impedisce che una view lo modifichi per errore.
+    Espone gli stessi attributi del model, quindi OnboardingTemplateSerializer
+    lo serializza senza modifiche.
+    """
+
+    id: int
+    name: str
+    description: str
+    order: int
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+def get_active_templates():
+    """Ritorna i template attivi come tupla immutabile di TemplateSnapshot.
+
+    La tabella è piccola e cambia di rado, ma viene letta a ogni nuovo
+    dipendente e a ogni apertura della pagina template. Lo snapshot è
+    cachato in two_tier_cache e invalidato dai signal su OnboardingTemplate
+    (create, update, soft delete): nel caso comune costa 0 query.
+
+    SQL equivalente (solo su cache MISS):
+        SELECT * FROM onboarding_templates
+        WHERE is_active = 1
+        ORDER BY "order", name;
+    """
+    return two_tier_cache.get_or_set(
+        ACTIVE_TEMPLATES_CACHE_KEY,
+        _load_active_templates,
+        settings.CACHE_ONBOARDING_TEMPLATES_TTL,
+    )
+
+
+def _load_active_templates():
+    fields = [f.name for f in TemplateSnapshot.__dataclass_fields__.values()]
+    rows = OnboardingTemplate.objects.values(*fields)
+    return tuple(TemplateSnapshot(**row) for row in rows)
+
+
+def invalidate_active_templates():
+    """Invalida lo snapshot dei template attivi in tutti i processi.
+
+    Con le repliche, il prossimo ricalcolo va sul primario (mark_data_changed):
+    una replica ancora indietro salverebbe in cache lo snapshot vecchio per
+    tutto CACHE_ONBOARDING_TEMPLATES_TTL.
+    """
+    two_tier_cache.invalidate(ACTIVE_TEMPLATES_CACHE_KEY)
+    mark_data_changed()
 
 
 def create_onboarding_steps_for_employee(employee):
@@ -34,40 +115,236 @@ def create_onboarding_steps_for_employee(employee):
     Returns:
         list[OnboardingStep]: gli step appena creati (può essere vuota).
     """
-    templates = OnboardingTemplate.objects.filter(is_active=True)
+    # Snapshot cachato: nessuna query su onboarding_templates nel caso comune
+    templates = get_active_templates()
 
-    # Trova template per cui lo step esiste già (evita duplicati)
-    existing_template_ids = set(OnboardingStep.objects.filter(employee=employee).values_list("template_id", flat=True))
+    # Trova template per cui lo step esiste già (evita duplicati).
+    # order_by(): senza, il Meta.ordering su template__order aggiunge una JOIN inutile.
+    existing_template_ids = set(
+        OnboardingStep.objects.filter(employee=employee).order_by().values_list("template_id", flat=True)
+    )
 
     # Crea step solo per i template mancanti
-    new_steps = [OnboardingStep(employee=employee, template=t) for t in templates if t.id not in existing_template_ids]
+    new_steps = [OnboardingStep(employee=employee, template_id=t.id) for t in templates if t.id not in existing_template_ids]
 
     if new_steps:
         OnboardingStep.objects.bulk_create(new_steps)
+        # bulk_create non emette post_save: l'audit trail riceve le righe da qui
+        record_bulk_create(new_steps)
 
     return new_steps
 
 
-def send_welcome_email(employee):
-    """Invia l'email di benvenuto a un nuovo dipendente.
+def update_onboarding_steps(employee, changes):
+    """Applica in blocco modifiche a più step di onboarding di un dipendente.
+
+    Stesse regole di OnboardingStepViewSet.perform_update per completed_at:
+    - is_completed False → True  → completed_at = now()
+    - is_completed True → False  → completed_at = NULL
+    - is_completed invariato     → completed_at non viene toccato
+
+    Un solo UPDATE set-based con CASE, dentro una transazione, invece di
+    N save(): nessun signal per riga, e la cache dashboard viene invalidata
+    una volta sola dal chiamante.
 
     SQL equivalente:
-        EXEC msdb.dbo.sp_send_dbmail
-            @profile_name = 'HR_Profile',
-            @recipients = @employee_email,
-            @subject = 'Benvenuto!',
-            @body = '...';
+        UPDATE onboarding_steps SET
+            completed_at = CASE
+                WHEN id IN (@to_complete) AND NOT is_completed THEN NOW()
+                WHEN id IN (@to_reopen) THEN NULL
+                ELSE completed_at END,
+            is_completed = CASE
+                WHEN id IN (@to_complete) THEN TRUE
+                WHEN id IN (@to_reopen) THEN FALSE
+                ELSE is_completed END,
+            notes = CASE id WHEN @id1 THEN @notes1 ... ELSE notes END,
+            updated_at = NOW()
+        WHERE employee_id = @employee_id AND id IN (@ids);
 
-    Sincrona: blocca finché il backend non ha processato l'email.
-    Con console backend è istantaneo (stampa su stdout).
-    In produzione si userebbe Celery per renderla asincrona.
+    Args:
+        employee: istanza Employee proprietaria degli step.
+        changes: lista di dict {id, is_completed?, notes?} già validati.
+
+    Returns:
+        int: numero di righe aggiornate.
+    """
+    ids = [change["id"] for change in changes]
+    to_complete = [c["id"] for c in changes if c.get("is_completed") is True]
+    to_reopen = [c["id"] for c in changes if c.get("is_completed") is False]
+    notes = [When(pk=c["id"], then=Value(c["notes"])) for c in changes if "notes" in c]
+
+    now = timezone.now()
+    completed_at, is_completed = [], []
+    if to_complete:
+        completed_at.append(When(pk__in=to_complete, is_completed=False, then=Value(now)))
+        is_completed.append(When(pk__in=to_complete, then=Value(True)))
+    if to_reopen:
+        completed_at.append(When(pk__in=to_reopen, then=Value(None)))
+        is_completed.append(When(pk__in=to_reopen, then=Value(False)))
+
+    # Nel SET ogni CASE vede i valori PRIMA dell'UPDATE: completed_at
+    # confronta il vecchio is_completed, come fa perform_update.
+    updates = {"updated_at": now}
+    if is_completed:
+        updates["completed_at"] = Case(*completed_at, default=F("completed_at"))
+        updates["is_completed"] = Case(*is_completed, default=F("is_completed"))
+    if notes:
+        updates["notes"] = Case(*notes, default=F("notes"), output_field=TextField())
+
+    audited_fields = ["is_completed", "completed_at", "notes"]
+    steps = OnboardingStep.objects.filter(employee=employee, pk__in=ids)
+    with transaction.atomic():
+        # queryset.update() non emette signal: l'audit trail riceve il diff
+        # da qui, leggendo le righe prima e dopo (FOR UPDATE: nessuno le
+        # modifica nel frattempo).
+        before = {row["id"]: row for row in steps.select_for_update().order_by().values("id", *audited_fields)}
+        updated = steps.update(**updates)
+        after = steps.order_by().values("id", *audited_fields)
+        record_bulk_update(
+            OnboardingStep,
+            [
+                (
+                    row["id"],
+                    employee.pk,
+                    {f: (before[row["id"]][f], row[f]) for f in audited_fields if before[row["id"]][f] != row[f]},
+                )
+                for row in after
+            ],
+        )
+        return updated
+
+
+def in_progress_onboarding():
+    """Queryset dei contatori OnboardingProgress dei dipendenti ancora in onboarding.
+
+    Legge i contatori denormalizzati (mantenuti dal trigger su onboarding_steps)
+    invece di aggregare gli step. Usa l'indice parziale onboarding_in_progress_idx.
+
+    SQL equivalente:
+        SELECT * FROM onboarding_progress
+        WHERE steps_completed < steps_total;
+    """
+    return OnboardingProgress.objects.filter(steps_completed__lt=F("steps_total"))
+
+
+def count_in_flight_employees():
+    """Conta i dipendenti attivi con almeno uno step di onboarding non completato."""
+    return in_progress_onboarding().filter(employee__is_active=True).count()
+
+
+def propagate_template_chunk(template_id, after_employee_id, chunk_size):
+    """Aggiunge lo step del template a un blocco di dipendenti in onboarding.
+
+    Un solo statement per blocco: la CTE `chunk` seleziona i prossimi
+    `chunk_size` dipendenti in corso di onboarding (keyset su id, niente OFFSET),
+    l'INSERT ... SELECT crea gli step mancanti e ON CONFLICT DO NOTHING
+    (sul vincolo unique employee+template) salta quelli che esistono già.
 
     Args:
-        employee: istanza Employee a cui inviare l'email.
+        template_id: PK del template da propagare.
+        after_employee_id: ultimo id elaborato nel blocco precedente (0 al primo giro).
+        chunk_size: numero massimo di dipendenti per blocco.
+
+    L'INSERT raw non passa dai signal: gli step creati (id ed employee_id
+    dal RETURNING) vanno all'audit trail con record_bulk_create.
 
     Returns:
-        int: numero di email inviate con successo (0 o 1).
+        tuple(int, int | None, int): dipendenti elaborati, ultimo id del blocco
+        (None se non c'erano più dipendenti), step creati.
+    """
+    employees_table = Employee._meta.db_table
+    progress_table = OnboardingProgress._meta.db_table
+    steps_table = OnboardingStep._meta.db_table
+    sql = f"""
+        WITH chunk AS (
+            SELECT p.employee_id AS id
+            FROM {progress_table} p
+            JOIN {employees_table} e ON e.id = p.employee_id
+            WHERE p.steps_completed < p.steps_total
+              AND e.is_active
+              AND p.employee_id > %(after)s
+            ORDER BY p.employee_id
+            LIMIT %(limit)s
+        ),
+        inserted AS (
+            INSERT INTO {steps_table}
+                (employee_id, template_id, is_completed, completed_at, notes, created_at, updated_at)
+            SELECT id, %(template)s, FALSE, NULL, '', NOW(), NOW()
+            FROM chunk
+            ON CONFLICT (employee_id, template_id) DO NOTHING
+            RETURNING id, employee_id
+        )
+        SELECT
+            (SELECT COUNT(*) FROM chunk),
+            (SELECT MAX(id) FROM chunk),
+            (SELECT COALESCE(array_agg(ARRAY[id, employee_id] ORDER BY id), '{{}}') FROM inserted)
+    """  # nosec B608: solo nomi di tabella dal model, i valori sono parametri
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {"after": after_employee_id, "limit": chunk_size, "template": template_id})
+        processed, last_id, inserted = cursor.fetchone()
+    # Gli altri campi hanno i default del model, gli stessi scritti dall'INSERT
+    record_bulk_create(
+        OnboardingStep(id=step_id, employee_id=employee_id, template_id=template_id) for step_id, employee_id in inserted
+    )
+    return processed, last_id, len(inserted)
+
+
+def run_onboarding_propagation(propagation, chunk_size=None):
+    """Esegue una OnboardingPropagation, aggiornando il progresso dopo ogni blocco.
+
+    Ogni blocco è una transazione separata: un job lungo non tiene lock
+    per minuti, e se il worker muore a metà i blocchi già fatti restano
+    (e rilanciarlo è sicuro grazie a ON CONFLICT DO NOTHING).
+
+    Args:
+        propagation: istanza OnboardingPropagation in stato PENDING.
+        chunk_size: dipendenti per blocco (default: ONBOARDING_PROPAGATION_CHUNK_SIZE).
     """
+    chunk_size = chunk_size or settings.ONBOARDING_PROPAGATION_CHUNK_SIZE
+
+    propagation.status = OnboardingPropagation.Status.RUNNING
+    propagation.started_at = timezone.now()
+    propagation.total_employees = count_in_flight_employees()
+    propagation.save(update_fields=["status", "started_at", "total_employees"])
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            processed, last_id, created = propagate_template_chunk(propagation.template_id, last_id, chunk_size)
+            if not processed:
+                break
+            # F() = UPDATE ... SET x = x + n: nessuna lettura, nessuna race
+            OnboardingPropagation.objects.filter(pk=propagation.pk).update(
+                processed_employees=F("processed_employees") + processed,
+                created_steps=F("created_steps") + created,
+            )
+
+    propagation.refresh_from_db()
+    propagation.status = OnboardingPropagation.Status.COMPLETED
+    propagation.finished_at = timezone.now()
+    propagation.save(update_fields=["status", "finished_at"])
+
+
+def start_onboarding_propagation(template):
+    """Crea una OnboardingPropagation e accoda il task Celery che la esegue.
+
+    Il task passa dall'outbox, nella stessa transazione del job: se la
+    request fallisce e la transazione viene annullata, il worker non parte
+    con un job (o un template) che non esiste.
+
+    Returns:
+        OnboardingPropagation: il job appena creato, in stato PENDING.
+    """
+    # Import locale (anche sotto): tasks.py carica Celery, che serve solo quando si accoda
+    from .tasks import propagate_onboarding_template_task
+
+    propagation = OnboardingPropagation.objects.create(template=template)
+    enqueue(propagate_onboarding_template_task, args=[propagation.pk])
+    return propagation
+
+
+def _welcome_email_content(employee):
+    """Oggetto e testo dell'email di benvenuto (condivisi da invio singolo e a lotti)."""
     subject = f"Benvenuto in Mini Jet HR, {employee.first_name}!"
 
     # hire_date può essere str ("2024-01-15") o date, a seconda di come
@@ -94,7 +371,30 @@ def send_welcome_email(employee):
         f"A presto,\n"
         f"Il team HR"
     )
+    return subject, body
+
+
+def send_welcome_email(employee):
+    """Invia l'email di benvenuto a un nuovo dipendente.
+
+    SQL equivalente:
+        EXEC msdb.dbo.sp_send_dbmail
+            @profile_name = 'HR_Profile',
+            @recipients = @employee_email,
+            @subject = 'Benvenuto!',
+            @body = '...';
+
+    Sincrona: blocca finché il backend non ha processato l'email.
+    Con console backend è istantaneo (stampa su stdout).
+    In produzione si userebbe Celery per renderla asincrona.
+
+    Args:
+        employee: istanza Employee a cui inviare l'email.
 
+    Returns:
+        int: numero di email inviate con successo (0 o 1).
+    """
+    subject, body = _welcome_email_content(employee)
     return send_mail(
         subject=subject,
         message=body,
@@ -102,3 +402,127 @@ def send_welcome_email(employee):
         recipient_list=[employee.email],
         fail_silently=False,
     )
+
+
+def build_welcome_email(employee, connection=None):
+    """Costruisce (senza inviarla) l'email di benvenuto come EmailMessage."""
+    subject, body = _welcome_email_content(employee)
+    return EmailMessage(
+        subject=subject,
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[employee.email],
+        connection=connection,
+    )
+
+
+def queue_welcome_email(employee):
+    """Accoda l'email di benvenuto per il dispatcher a lotti.
+
+    Inserisce una riga in PendingWelcomeEmail e, se non c'è già un
+    dispatch in attesa nell'outbox, ne accoda uno tra
+    WELCOME_EMAIL_BATCH_DELAY secondi. Durante un'ondata di assunzioni
+    solo la prima riga accoda il task, le altre vengono raccolte dallo
+    stesso invio (debounce). Due transazioni concorrenti possono accodare
+    due dispatch: innocuo, grazie a SKIP LOCKED si dividono la coda.
+    """
+    from .tasks import dispatch_welcome_emails_task
+
+    PendingWelcomeEmail.objects.create(employee=employee)
+
+    if not OutboxMessage.objects.filter(task=dispatch_welcome_emails_task.name).exists():
+        enqueue(dispatch_welcome_emails_task, countdown=settings.WELCOME_EMAIL_BATCH_DELAY)
+
+
+def dispatch_pending_welcome_emails(batch_size=None):
+    """Invia le email in coda a lotti, riusando una sola connessione SMTP.
+
+    Ogni lotto è una transazione:
+        SELECT ... FROM employees_pendingwelcomeemail
+        WHERE id > @last_id AND attempts < @max_attempts
+        ORDER BY id LIMIT @batch_size
+        FOR UPDATE SKIP LOCKED
+
+    SKIP LOCKED permette a più worker di svuotare la coda in parallelo
+    senza inviare due volte la stessa email. La connessione viene aperta
+    una volta sola (un handshake TCP/TLS per tutto il dispatch); i messaggi
+    però partono uno alla volta, così un destinatario rifiutato non fa
+    fallire il resto del lotto. Le righe inviate vengono cancellate (e il
+    dipendente marcato con welcome_email_sent_at), quelle fallite restano
+    con attempts + 1 e l'errore, pronte per il prossimo giro: si ritentano
+    solo i destinatari falliti. Arrivate a WELCOME_EMAIL_MAX_ATTEMPTS
+    tentativi non vengono più ritentate.
+
+    Args:
+        batch_size: email per lotto (default WELCOME_EMAIL_BATCH_SIZE).
+
+    Returns:
+        tuple: (inviate, fallite).
+    """
+    batch_size = batch_size or settings.WELCOME_EMAIL_BATCH_SIZE
+    max_attempts = settings.WELCOME_EMAIL_MAX_ATTEMPTS
+    smtp_connection = get_connection(fail_silently=False)
+    sent_total = failed_total = 0
+    last_id = 0
+
+    try:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    PendingWelcomeEmail.objects.select_for_update(skip_locked=True, of=("self",))
+                    .select_related("employee")
+                    .filter(id__gt=last_id, attempts__lt=max_attempts)
+                    .order_by("id")[:batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                sent_ids, failed = [], []
+                for pending in batch:
+                    try:
+                        # open() è un no-op se la connessione è già aperta
+                        smtp_connection.open()
+                        smtp_connection.send_messages([build_welcome_email(pending.employee, smtp_connection)])
+                    except smtplib.SMTPRecipientsRefused as exc:
+                        # Il server ha rifiutato solo questo destinatario:
+                        # la connessione è ancora valida per i successivi.
+                        pending.last_error = str(exc)
+                        failed.append(pending)
+                    except Exception as exc:
+                        pending.last_error = str(exc)
+                        failed.append(pending)
+                        # Connessione in stato incerto: la prossima email ne apre una nuova
+                        with suppress(Exception):
+                            smtp_connection.close()
+                    else:
+                        sent_ids.append(pending.id)
+
+                Employee.all_objects.filter(pending_welcome_email__in=sent_ids).update(welcome_email_sent_at=timezone.now())
+                PendingWelcomeEmail.objects.filter(id__in=sent_ids).delete()
+                for pending in failed:
+                    pending.attempts += 1
+                    if pending.attempts >= max_attempts:
+                        # Fallimento definitivo: la riga resta in coda (con l'errore) per HR
+                        logger.error(
+                            "Welcome email to employee %s failed %s times, giving up: %s",
+                            pending.employee_id,
+                            pending.attempts,
+                            pending.last_error,
+                        )
+                        continue
+                    logger.warning(
+                        "Welcome email to employee %s failed (attempt %s): %s",
+                        pending.employee_id,
+                        pending.attempts,
+                        pending.last_error,
+                    )
+                PendingWelcomeEmail.objects.bulk_update(failed, ["attempts", "last_error"])
+
+            sent_total += len(sent_ids)
+            failed_total += len(failed)
+    finally:
+        with suppress(Exception):
+            smtp_connection.close()
+
+    return sent_total, failed_total
@@ -5,13 +5,18 @@ A differenza dei DB trigger (che scattano su qualsiasi INSERT/UPDATE),
 i Django signals scattano solo quando si passa dall'ORM (.save(), .create()).
 """
 
-from django.core.cache import cache
-from django.db.models.signals import post_delete, post_save
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import Contract, Employee, OnboardingStep
-from .services import create_onboarding_steps_for_employee
-from .tasks import send_welcome_email_task
+from minijet.cache import two_tier_cache
+from minijet.replicas import mark_data_changed
+from outbox.services import enqueue
+
+from .models import Contract, Employee, OnboardingStep, OnboardingTemplate
+from .org_chart import invalidate_subtree_sizes
+from .services import create_onboarding_steps_for_employee, invalidate_active_templates, queue_welcome_email
 
 # Stessa chiave usata in views.py — definita qui per evitare
 # cross-import tra signals e views (fragilità ordine di import).
@@ -24,7 +29,9 @@ def auto_create_onboarding_steps(sender, instance, created, **kwargs):
 
     Equivale a un AFTER INSERT trigger sulla tabella employees:
     - Onboarding steps: sincrono (INSERT veloce, deve completarsi prima dell'email)
-    - Email: asincrono via Celery (.delay() = fire-and-forget in coda Redis)
+    - Email: asincrono via Celery, passando dall'outbox (stessa transazione
+      dell'INSERT, nessuna chiamata a Redis durante la request), oppure
+      accodata per l'invio a lotti se WELCOME_EMAIL_BATCHING è attivo
 
     Args:
         sender: la classe del model (Employee). Fornito da Django.
@@ -39,10 +46,16 @@ def auto_create_onboarding_steps(sender, instance, created, **kwargs):
     """
     if created:
         create_onboarding_steps_for_employee(instance)
-        # .delay(pk) accoda il task su Redis e torna subito.
-        # Il worker Celery lo eseguirà in un processo separato.
+        if settings.WELCOME_EMAIL_BATCHING:
+            queue_welcome_email(instance)
+            return
+        # enqueue() scrive il task nell'outbox (un INSERT, niente Redis):
+        # il dispatcher lo pubblicherà dopo il COMMIT, il worker Celery lo eseguirà.
         # Passiamo il PK (int), non l'oggetto (non JSON-serializzabile).
-        send_welcome_email_task.delay(instance.pk)
+        # Import locale: tasks.py carica Celery, che serve solo quando si accoda.
+        from .tasks import send_welcome_email_task
+
+        enqueue(send_welcome_email_task, args=[instance.pk])
 
 
 # ---------------------------------------------------------------------------
@@ -59,8 +72,13 @@ def invalidate_dashboard_cache(**kwargs):
 
     Chiamata da post_save/post_delete sui model che alimentano la dashboard.
     Equivale a: DELETE FROM staging_dashboard WHERE key = 'dashboard_stats'
+
+    Con la cache a due livelli non si cancella la chiave: si incrementa la
+    versione, e tutti i processi scartano la propria copia in-process.
+    Con le repliche, il prossimo ricalcolo va sul primario (mark_data_changed).
     """
-    cache.delete(DASHBOARD_CACHE_KEY)
+    two_tier_cache.invalidate(DASHBOARD_CACHE_KEY)
+    mark_data_changed()
 
 
 # Employee: post_save copre INSERT e UPDATE (incluso soft delete via .save())
@@ -72,3 +90,48 @@ post_delete.connect(invalidate_dashboard_cache, sender=Contract)
 
 # OnboardingStep: post_save copre toggle is_completed (PATCH)
 post_save.connect(invalidate_dashboard_cache, sender=OnboardingStep)
+
+
+def invalidate_template_snapshot(**kwargs):
+    """Invalida lo snapshot dei template attivi (vedi services.get_active_templates).
+
+    post_save copre create, update e soft delete (is_active=False + .save()),
+    post_delete l'eventuale hard delete dall'admin.
+    """
+    invalidate_active_templates()
+
+
+post_save.connect(invalidate_template_snapshot, sender=OnboardingTemplate)
+post_delete.connect(invalidate_template_snapshot, sender=OnboardingTemplate)
+
+
+def detect_reporting_line_change(sender, instance, **kwargs):
+    """Segna l'istanza se il save cambia le dimensioni dei sottoalberi.
+
+    Solo INSERT, cambio di manager e soft delete/restore contano: modificare
+    nome o ruolo non sposta nessuno nell'organigramma. Il confronto usa i
+    valori letti dal DB (AuditedModelMixin), quindi va fatto in pre_save,
+    prima che il post_save dell'audit li aggiorni.
+    """
+    loaded = getattr(instance, "_audit_loaded", None)
+    instance._reporting_line_changed = (
+        instance._state.adding
+        or loaded is None
+        or loaded.get("manager_id") != instance.manager_id
+        or loaded.get("is_active") != instance.is_active
+    )
+
+
+def invalidate_org_chart(sender, instance, **kwargs):
+    """Invalida le dimensioni dei sottoalberi dopo il COMMIT.
+
+    on_commit: invalidando prima, un'altra request potrebbe ricalcolare le
+    dimensioni senza vedere ancora la modifica e cacharle sotto la nuova versione.
+    """
+    if getattr(instance, "_reporting_line_changed", True):
+        transaction.on_commit(invalidate_subtree_sizes)
+
+
+pre_save.connect(detect_reporting_line_change, sender=Employee)
+post_save.connect(invalidate_org_chart, sender=Employee)
+post_delete.connect(invalidate_org_chart, sender=Employee)
@@ -15,12 +15,12 @@ Pattern chiave:
 
 import logging
 
-from celery import shared_task
+from minijet.celery import app
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+@app.task(bind=True, max_retries=3, default_retry_delay=60)
 def send_welcome_email_task(self, employee_id):
     """Invia l'email di benvenuto in modo asincrono.
 
@@ -35,21 +35,36 @@ def send_welcome_email_task(self, employee_id):
               Come una SP che può richiamare sé stessa con EXEC sp_retry.
         employee_id: PK del dipendente (int, JSON-serializzabile).
 
+    Idempotente: l'outbox pubblica at-least-once, quindi lo stesso task può
+    arrivare due volte. La riga del dipendente resta bloccata (FOR UPDATE)
+    durante l'invio e welcome_email_sent_at viene scritto nella stessa
+    transazione: una seconda esecuzione, anche concorrente, trova il
+    marcatore e non reinvia. Se l'invio fallisce il ROLLBACK lascia il
+    marcatore vuoto per il retry.
+
     Raises:
         Employee.DoesNotExist: se il dipendente non esiste più nel DB.
             Non fa retry perché è un errore permanente (non transiente).
     """
+    from django.db import transaction
+    from django.utils import timezone
+
     from .models import Employee
     from .services import send_welcome_email
 
     try:
-        employee = Employee.objects.get(pk=employee_id)
-    except Employee.DoesNotExist:
-        logger.error("Employee %s not found, skipping welcome email.", employee_id)
-        return
+        with transaction.atomic():
+            try:
+                employee = Employee.objects.select_for_update().get(pk=employee_id)
+            except Employee.DoesNotExist:
+                logger.error("Employee %s not found, skipping welcome email.", employee_id)
+                return
+            if employee.welcome_email_sent_at is not None:
+                logger.info("Welcome email to %s already sent, skipping.", employee.email)
+                return
 
-    try:
-        send_welcome_email(employee)
+            send_welcome_email(employee)
+            Employee.all_objects.filter(pk=employee.pk).update(welcome_email_sent_at=timezone.now())
         logger.info("Welcome email sent to %s", employee.email)
     except Exception as exc:
         logger.warning(
@@ -58,3 +73,79 @@ def send_welcome_email_task(self, employee_id):
             exc,
         )
         raise self.retry(exc=exc)
+
+
+@app.task(bind=True, default_retry_delay=300)
+def dispatch_welcome_emails_task(self):
+    """Invia tutte le email di benvenuto in coda, a lotti, su una connessione SMTP.
+
+    Equivale a un job SQL Agent che svuota la coda di Database Mail:
+    un solo login al server SMTP per tutta l'ondata di assunzioni,
+    invece di un job (e un handshake TCP/TLS) per ogni dipendente.
+
+    Se qualche destinatario fallisce il task si rischedula: al giro
+    successivo in coda ci sono solo le email fallite, quindi il retry
+    non reinvia quelle già consegnate. Ogni giro è un tentativo per le
+    righe fallite, quindi i retry sono WELCOME_EMAIL_MAX_ATTEMPTS - 1:
+    all'ultimo giro le righe ancora fallite arrivano al massimo dei
+    tentativi e il dispatcher le abbandona (log di errore), invece di
+    restare a metà in coda senza nessun task che le riprenda.
+    """
+    from django.conf import settings
+
+    from .models import PendingWelcomeEmail
+    from .services import dispatch_pending_welcome_emails
+
+    sent, failed = dispatch_pending_welcome_emails()
+    logger.info("Welcome email dispatch: %s sent, %s failed.", sent, failed)
+
+    retryable = PendingWelcomeEmail.objects.filter(attempts__lt=settings.WELCOME_EMAIL_MAX_ATTEMPTS)
+    if failed and retryable.exists():
+        # Esecuzione iniziale + retry = un tentativo per giro
+        raise self.retry(max_retries=settings.WELCOME_EMAIL_MAX_ATTEMPTS - 1)
+
+
+@app.task
+def propagate_onboarding_template_task(propagation_id):
+    """Aggiunge lo step di un template a tutti i dipendenti in onboarding.
+
+    Equivale a un job SQL Agent lanciato on-demand che esegue
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING a blocchi e scrive
+    il progresso nella tabella di history dopo ogni blocco.
+
+    Nessun retry automatico: in caso di errore il job viene marcato FAILED
+    e HR può rilanciarlo dall'endpoint (l'operazione è idempotente).
+
+    Args:
+        propagation_id: PK della OnboardingPropagation da eseguire.
+    """
+    from django.utils import timezone
+
+    from .models import OnboardingPropagation
+    from .services import run_onboarding_propagation
+    from .signals import invalidate_dashboard_cache
+
+    try:
+        propagation = OnboardingPropagation.objects.get(pk=propagation_id)
+    except OnboardingPropagation.DoesNotExist:
+        logger.error("Onboarding propagation %s not found, skipping.", propagation_id)
+        return
+
+    try:
+        run_onboarding_propagation(propagation)
+        logger.info(
+            "Onboarding propagation %s completed: %s steps created.",
+            propagation_id,
+            propagation.created_steps,
+        )
+    except Exception as exc:
+        logger.exception("Onboarding propagation %s failed.", propagation_id)
+        OnboardingPropagation.objects.filter(pk=propagation_id).update(
+            status=OnboardingPropagation.Status.FAILED,
+            error=str(exc),
+            finished_at=timezone.now(),
+        )
+        raise
+    finally:
+        # L'INSERT raw non passa dall'ORM: i signal di invalidazione non scattano
+        invalidate_dashboard_cache()
@@ -1,19 +1,62 @@
+import os
 import shutil
+import socketserver
+import subprocess
+import sys
 import tempfile
+import threading
+from dataclasses import FrozenInstanceError, dataclass
 from datetime import date, timedelta
+from io import StringIO
+from unittest import skipUnless
 from unittest.mock import patch
 
+from asgiref.sync import async_to_sync, sync_to_async
+from celery.exceptions import Retry
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core import mail
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from .models import Contract, Employee, OnboardingStep, OnboardingTemplate
-from .tasks import send_welcome_email_task
+from accounts.serializers import ClaimsTokenObtainPairSerializer
+from minijet.cache import two_tier_cache
+from minijet.replicas import ReadReplicaRouter
+from outbox.models import OutboxMessage
+from outbox.services import publish
+
+from . import urls as employee_urls
+from .async_views import with_async_reads
+from .management.commands.benchmark import find_regressions, size_label, summarize
+from .management.commands.importtime import SETUP, package_times, parse_importtime
+from .management.commands.loadtest import Recorder
+from .management.commands.seed_data import DEFAULT_AS_OF
+from .models import (
+    Contract,
+    Employee,
+    EmployeeHierarchy,
+    OnboardingProgress,
+    OnboardingPropagation,
+    OnboardingStep,
+    OnboardingTemplate,
+    PendingWelcomeEmail,
+)
+from .services import (
+    create_onboarding_steps_for_employee,
+    dispatch_pending_welcome_emails,
+    get_active_templates,
+    run_onboarding_propagation,
+)
+from .tasks import dispatch_welcome_emails_task, propagate_onboarding_template_task, send_welcome_email_task
 from .views import DASHBOARD_CACHE_KEY
 
 User = get_user_model()
@@ -23,15 +66,18 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp()
 
 
 def authenticate_client(client):
-    """Crea un utente di test e autentica l'APIClient.
+    """Crea un utente HR di test e autentica l'APIClient.
 
     force_authenticate bypassa il parsing JWT — imposta direttamente
     request.user. Più veloce e semplice per i test unitari.
     Il flusso JWT reale è testato separatamente in accounts/tests.py.
+    is_staff: l'HR Admin vede tutti i dipendenti (lo scope per ruolo è
+    testato in RoleScopingTest).
     """
     user = User.objects.create_user(
         email="testuser@minijethr.local",
         password="testpass123",
+        is_staff=True,
     )
     client.force_authenticate(user=user)
     return user
@@ -208,7 +254,9 @@ class EmployeeDeleteAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.employee.refresh_from_db()
         self.assertFalse(self.employee.is_active)
-        self.assertEqual(Employee.objects.count(), 1)
+        # La riga è ancora nel DB, ma il manager di default (solo attivi) non la vede più
+        self.assertEqual(Employee.all_objects.count(), 1)
+        self.assertEqual(Employee.objects.count(), 0)
 
     def test_deleted_employee_excluded_from_list(self):
         """A soft-deleted employee should not appear in GET /api/employees/."""
@@ -217,6 +265,410 @@ class EmployeeDeleteAPITest(TestCase):
         emails = [e["email"] for e in response.data["results"]]
         self.assertNotIn("mario.rossi@example.com", emails)
 
+    def test_restore_reactivates_employee(self):
+        self.client.delete(f"/api/employees/{self.employee.id}/")
+
+        response = self.client.post(f"/api/employees/{self.employee.id}/restore/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["is_active"])
+        self.assertEqual(self.client.get(f"/api/employees/{self.employee.id}/").status_code, status.HTTP_200_OK)
+
+    def test_restore_active_employee_is_noop(self):
+        response = self.client.post(f"/api/employees/{self.employee.id}/restore/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["is_active"])
+
+    def test_restore_nonexistent_employee_returns_404(self):
+        response = self.client.post("/api/employees/99999/restore/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_email_of_deleted_employee_cannot_be_reused(self):
+        """Il vincolo UNIQUE vale anche per gli inattivi: 400, non IntegrityError."""
+        self.client.delete(f"/api/employees/{self.employee.id}/")
+
+        response = self.client.post(
+            "/api/employees/",
+            {
+                "first_name": "Mario",
+                "last_name": "Rossi",
+                "email": "mario.rossi@example.com",
+                "hire_date": "2024-01-15",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("email", response.data)
+
+    def test_admin_form_rejects_email_of_deleted_employee(self):
+        """full_clean() controlla anche gli inattivi: errore del form, non IntegrityError (500)."""
+        self.client.delete(f"/api/employees/{self.employee.id}/")
+        admin = User.objects.create_superuser(email="admin@minijethr.local", password="x")
+        self.client.force_login(admin)
+
+        response = self.client.post(
+            "/admin/employees/employee/add/",
+            {
+                "first_name": "Mario",
+                "last_name": "Rossi",
+                "email": "mario.rossi@example.com",
+                "role": "employee",
+                "department": "",
+                "hire_date": "2024-01-15",
+                "is_active": "on",
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("email", response.context["adminform"].form.errors)
+        self.assertEqual(Employee.all_objects.count(), 1)
+
+    def test_deleted_employee_contracts_are_hidden(self):
+        Contract.objects.create(
+            employee=self.employee,
+            contract_type="indeterminato",
+            ccnl="commercio",
+            ral="30000.00",
+            start_date="2024-01-15",
+        )
+        self.client.delete(f"/api/employees/{self.employee.id}/")
+        url = f"/api/employees/{self.employee.id}/contracts/"
+
+        self.assertEqual(self.client.get(url).data["count"], 0)
+        response = self.client.post(
+            url,
+            {"contract_type": "stagista", "ccnl": "commercio", "ral": "15000.00", "start_date": "2024-02-01"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SoftDeleteIndexTest(TestCase):
+    """The partial indexes only cover active rows and serve the default manager's queries."""
+
+    def explain(self, queryset):
+        # Su una tabella di poche righe il planner sceglierebbe il seq scan:
+        # lo disattiviamo per vedere quale indice è utilizzabile.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_default_list_uses_active_name_index(self):
+        plan = self.explain(Employee.objects.order_by("last_name", "first_name")[:20])
+        self.assertIn("employee_active_name_idx", plan)
+
+    def test_all_objects_cannot_use_partial_index(self):
+        plan = self.explain(Employee.all_objects.order_by("last_name", "first_name")[:20])
+        self.assertNotIn("employee_active_name_idx", plan)
+
+    def test_role_filter_uses_active_role_index(self):
+        plan = self.explain(Employee.objects.filter(role="manager").order_by("last_name", "first_name"))
+        self.assertIn("employee_active_role_idx", plan)
+
+
+def make_employee(first_name, manager=None, role="employee"):
+    """Dipendente minimo per i test di gerarchia (email derivata dal nome)."""
+    return Employee.objects.create(
+        first_name=first_name,
+        last_name="Test",
+        email=f"{first_name.lower()}@example.com",
+        role=role,
+        hire_date="2024-01-15",
+        manager=manager,
+    )
+
+
+class EmployeeHierarchyTest(TestCase):
+    """The closure table is kept in sync by DB triggers on employees.manager_id.
+
+    SQL analogy: come la tabella onboarding_progress, è una tabella derivata
+    mantenuta da trigger — qui contiene una riga per ogni coppia
+    (antenato, discendente), profondità inclusa.
+    """
+
+    def setUp(self):
+        self.ceo = make_employee("Ceo", role="manager")
+        self.vp = make_employee("Vp", manager=self.ceo, role="manager")
+        self.dev = make_employee("Dev", manager=self.vp)
+
+    def paths(self):
+        return set(EmployeeHierarchy.objects.values_list("ancestor__first_name", "descendant__first_name", "depth"))
+
+    def test_insert_adds_self_and_ancestor_paths(self):
+        self.assertEqual(
+            self.paths(),
+            {
+                ("Ceo", "Ceo", 0),
+                ("Vp", "Vp", 0),
+                ("Dev", "Dev", 0),
+                ("Ceo", "Vp", 1),
+                ("Vp", "Dev", 1),
+                ("Ceo", "Dev", 2),
+            },
+        )
+
+    def test_moving_a_manager_moves_the_whole_subtree(self):
+        cto = make_employee("Cto", role="manager")
+        self.vp.manager = cto
+        self.vp.save()
+
+        paths = self.paths()
+        self.assertIn(("Cto", "Dev", 2), paths)
+        self.assertNotIn(("Ceo", "Dev", 2), paths)
+        self.assertNotIn(("Ceo", "Vp", 1), paths)
+        # Le relazioni interne al sottoalbero restano invariate
+        self.assertIn(("Vp", "Dev", 1), paths)
+
+    def test_clearing_manager_detaches_subtree(self):
+        self.vp.manager = None
+        self.vp.save()
+
+        self.assertEqual(
+            set(EmployeeHierarchy.objects.filter(descendant=self.dev).values_list("ancestor__first_name", flat=True)),
+            {"Vp", "Dev"},
+        )
+
+    def test_cycle_rejected_by_database(self):
+        self.ceo.manager = self.dev
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.ceo.save()
+
+    def test_cycle_rejected_by_api(self):
+        client = APIClient()
+        authenticate_client(client)
+        response = client.patch(f"/api/employees/{self.ceo.pk}/", {"manager": self.dev.pk}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("manager", response.data)
+
+
+class RoleScopingTest(TestCase):
+    """HR sees everyone, a manager sees their subtree, an employee sees only themself (US-012)."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.ceo = make_employee("Ceo", role="manager")
+        self.vp = make_employee("Vp", manager=self.ceo, role="manager")
+        self.dev = make_employee("Dev", manager=self.vp)
+        self.other = make_employee("Other", manager=self.ceo)
+
+    def login_as(self, employee):
+        user = User.objects.create_user(email=f"user.{employee.pk}@minijethr.local", password="x", employee=employee)
+        self.client.force_authenticate(user=user)
+        return user
+
+    def listed_names(self):
+        response = self.client.get("/api/employees/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row["first_name"] for row in response.data["results"]}
+
+    def test_manager_sees_whole_subtree(self):
+        self.login_as(self.vp)
+        self.assertEqual(self.listed_names(), {"Vp", "Dev"})
+
+        self.login_as(self.ceo)
+        self.assertEqual(self.listed_names(), {"Ceo", "Vp", "Dev", "Other"})
+
+    def test_employee_sees_only_themself(self):
+        self.login_as(self.dev)
+        self.assertEqual(self.listed_names(), {"Dev"})
+
+    def test_user_without_employee_sees_nothing(self):
+        self.client.force_authenticate(user=User.objects.create_user(email="nobody@minijethr.local", password="x"))
+        self.assertEqual(self.listed_names(), set())
+
+    def test_out_of_scope_nested_resources_are_404(self):
+        self.login_as(self.vp)
+
+        for url in (
+            f"/api/employees/{self.other.pk}/",
+            f"/api/employees/{self.other.pk}/history/",
+            f"/api/employees/{self.other.pk}/contracts/",
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                if response.status_code == status.HTTP_200_OK:
+                    # Le liste annidate non danno 404: devono essere vuote
+                    self.assertEqual(response.data["count"], 0)
+                else:
+                    self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(
+            f"/api/employees/{self.other.pk}/contracts/",
+            {"contract_type": "indeterminato", "ccnl": "commercio", "ral": "30000.00", "start_date": "2024-02-01"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_employee_cannot_reparent_themself(self):
+        self.login_as(self.dev)
+
+        for manager in (self.other.pk, self.ceo.pk, None):
+            with self.subTest(manager=manager):
+                response = self.client.patch(f"/api/employees/{self.dev.pk}/", {"manager": manager}, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("manager", response.data)
+        self.dev.refresh_from_db()
+        self.assertEqual(self.dev.manager, self.vp)
+
+    def test_manager_reassigns_reports_only_within_subtree(self):
+        lead = make_employee("Lead", manager=self.vp, role="manager")
+        self.login_as(self.vp)
+        url = f"/api/employees/{self.dev.pk}/"
+
+        # Un id fuori scope risponde come un id inesistente: non rivela che esiste
+        outside = self.client.patch(url, {"manager": self.other.pk}, format="json")
+        missing = self.client.patch(url, {"manager": 99999}, format="json")
+        self.assertEqual(outside.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(outside.data["manager"], [f'Invalid pk "{self.other.pk}" - object does not exist.'])
+        self.assertEqual(missing.data["manager"], ['Invalid pk "99999" - object does not exist.'])
+
+        response = self.client.patch(url, {"manager": None}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch(url, {"manager": lead.pk}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.dev.refresh_from_db()
+        self.assertEqual(self.dev.manager, lead)
+
+    def test_non_hr_cannot_create_employee_outside_own_subtree(self):
+        self.login_as(self.vp)
+        data = {"first_name": "New", "last_name": "Test", "email": "new@example.com", "hire_date": "2024-01-15"}
+
+        for manager in ({}, {"manager": None}, {"manager": self.other.pk}):
+            with self.subTest(manager=manager):
+                response = self.client.post("/api/employees/", {**data, **manager}, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("manager", response.data)
+        self.assertFalse(Employee.all_objects.filter(email="new@example.com").exists())
+
+        response = self.client.post("/api/employees/", {**data, "manager": self.vp.pk}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("New", self.listed_names())
+
+    def test_hr_can_move_anyone_anywhere(self):
+        authenticate_client(self.client)
+
+        response = self.client.patch(f"/api/employees/{self.dev.pk}/", {"manager": self.other.pk}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(f"/api/employees/{self.dev.pk}/", {"manager": None}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_scope_is_one_subquery_regardless_of_depth(self):
+        """Un solo semi-join sulla closure table, niente query ricorsive per livello."""
+        self.login_as(self.ceo)
+        with CaptureQueriesContext(connection) as ctx:
+            self.listed_names()
+
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertEqual(sql.count("employees_employeehierarchy"), 2)  # COUNT(*) della paginazione + SELECT
+        self.assertNotIn("RECURSIVE", sql.upper())
+
+
+class OrgChartTest(TestCase):
+    """Tests for /api/org-chart/: recursive CTE tree + cached subtree sizes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        authenticate_client(self.client)
+        self.ceo = make_employee("Ceo", role="manager")
+        self.vp = make_employee("Vp", manager=self.ceo, role="manager")
+        self.dev = make_employee("Dev", manager=self.vp)
+        self.ops = make_employee("Ops", manager=self.ceo)
+
+    def get_chart(self, **params):
+        response = self.client.get("/api/org-chart/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_full_tree_with_subtree_sizes(self):
+        (ceo,) = self.get_chart()
+
+        self.assertEqual((ceo["first_name"], ceo["direct_reports"], ceo["total_reports"]), ("Ceo", 2, 3))
+        ops, vp = ceo["children"]  # ordinati per cognome, poi nome
+        self.assertEqual((vp["first_name"], vp["direct_reports"], vp["total_reports"]), ("Vp", 1, 1))
+        self.assertEqual(ops["children"], [])
+        self.assertEqual(vp["children"][0]["first_name"], "Dev")
+
+    def test_last_level_is_lazily_expandable(self):
+        (ceo,) = self.get_chart(depth=1)
+        vp = next(node for node in ceo["children"] if node["id"] == self.vp.pk)
+        ops = next(node for node in ceo["children"] if node["id"] == self.ops.pk)
+
+        self.assertIsNone(vp["children"])  # ha riporti non ancora caricati
+        self.assertEqual(ops["children"], [])  # foglia
+
+        (expanded,) = self.get_chart(root=self.vp.pk, depth=1)
+        self.assertEqual([node["id"] for node in expanded["children"]], [self.dev.pk])
+
+    def test_tree_is_one_query_on_cache_hit(self):
+        self.get_chart()  # riempie la cache delle dimensioni
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_chart(root=self.vp.pk)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn("WITH RECURSIVE", ctx.captured_queries[0]["sql"])
+
+    def test_reporting_line_change_invalidates_sizes(self):
+        self.get_chart()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dev.manager = self.ops
+            self.dev.save()
+
+        (ceo,) = self.get_chart()
+        sizes = {node["first_name"]: node["direct_reports"] for node in ceo["children"]}
+        self.assertEqual(sizes, {"Vp": 0, "Ops": 1})
+
+    def test_non_structural_update_keeps_cache(self):
+        self.get_chart()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.dev.department = "Engineering"
+            self.dev.save()
+        self.assertEqual(callbacks, [])
+
+    def test_deactivated_manager_does_not_hide_reports(self):
+        self.vp.is_active = False
+        self.vp.save()
+
+        roots = {node["first_name"] for node in self.get_chart()}
+        self.assertEqual(roots, {"Ceo", "Dev"})
+
+    def test_sizes_follow_the_tree_below_a_deactivated_manager(self):
+        """Chi sta sotto un manager inattivo è un vertice: non conta nei totali sopra."""
+        self.vp.is_active = False
+        self.vp.save()
+
+        chart = {node["first_name"]: node for node in self.get_chart()}
+        ceo = chart["Ceo"]
+        self.assertEqual((ceo["direct_reports"], ceo["total_reports"]), (1, 1))
+        self.assertEqual([node["first_name"] for node in ceo["children"]], ["Ops"])
+        # Lo stesso conteggio dei nodi espandibili sotto ogni nodo
+        for node in chart.values():
+            with self.subTest(node=node["first_name"]):
+                self.assertEqual(node["total_reports"], self.count_nodes(node["children"]))
+
+    def count_nodes(self, children):
+        return sum(1 + self.count_nodes(child["children"]) for child in children)
+
+    def test_unknown_root_is_404(self):
+        response = self.client.get("/api/org-chart/", {"root": 999999})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_depth_is_400(self):
+        response = self.client.get("/api/org-chart/", {"depth": 50})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_manager_chart_starts_from_own_node(self):
+        user = User.objects.create_user(email="vp@minijethr.local", password="x", employee=self.vp)
+        self.client.force_authenticate(user=user)
+
+        (root,) = self.get_chart()
+        self.assertEqual(root["id"], self.vp.pk)
+        response = self.client.get("/api/org-chart/", {"root": self.ops.pk})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class ContractAPITest(TestCase):
     """Tests for /api/employees/{id}/contracts/ endpoint (US-005)."""
@@ -520,7 +972,8 @@ class OnboardingTemplateAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         template.refresh_from_db()
         self.assertFalse(template.is_active)
-        self.assertEqual(OnboardingTemplate.objects.count(), 1)
+        self.assertEqual(OnboardingTemplate.all_objects.count(), 1)
+        self.assertEqual(OnboardingTemplate.objects.count(), 0)
 
     def test_update_template(self):
         """PATCH should update specified fields."""
@@ -673,6 +1126,325 @@ class OnboardingStepAPITest(TestCase):
         self.assertEqual(a_step_ids & other_step_ids, set())
 
 
+class OnboardingStepBatchUpdateTest(TestCase):
+    """Tests for PATCH /api/employees/{id}/onboarding/ (batch checklist update).
+
+    SQL analogy: un solo UPDATE ... SET x = CASE ... WHERE id IN (...)
+    invece di N UPDATE riga per riga.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = authenticate_client(self.client)
+        OnboardingTemplate.objects.create(name="Firma contratto", order=1)
+        OnboardingTemplate.objects.create(name="Setup email", order=2)
+        OnboardingTemplate.objects.create(name="Training sicurezza", order=3)
+        self.employee = Employee.objects.create(
+            first_name="Mario",
+            last_name="Rossi",
+            email="mario.rossi@example.com",
+            hire_date="2024-01-15",
+        )
+        self.url = f"/api/employees/{self.employee.id}/onboarding/"
+        self.s1, self.s2, self.s3 = OnboardingStep.objects.filter(employee=self.employee)
+
+    def test_mark_all_done(self):
+        payload = [{"id": s.id, "is_completed": True} for s in (self.s1, self.s2, self.s3)]
+        response = self.client.patch(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(step["is_completed"] for step in response.data))
+        self.assertTrue(all(step["completed_at"] for step in response.data))
+
+    def test_reopen_resets_completed_at(self):
+        self.client.patch(self.url, [{"id": self.s1.id, "is_completed": True}], format="json")
+        self.client.patch(self.url, [{"id": self.s1.id, "is_completed": False}], format="json")
+
+        self.s1.refresh_from_db()
+        self.assertFalse(self.s1.is_completed)
+        self.assertIsNone(self.s1.completed_at)
+
+    def test_already_completed_keeps_original_completed_at(self):
+        """is_completed unchanged → completed_at untouched (same rule as perform_update)."""
+        self.client.patch(self.url, [{"id": self.s1.id, "is_completed": True}], format="json")
+        self.s1.refresh_from_db()
+        first_completed_at = self.s1.completed_at
+
+        self.client.patch(self.url, [{"id": self.s1.id, "is_completed": True}], format="json")
+        self.s1.refresh_from_db()
+        self.assertEqual(self.s1.completed_at, first_completed_at)
+
+    def test_notes_only_update(self):
+        payload = [{"id": self.s1.id, "notes": "Firmato in sede"}, {"id": self.s2.id, "notes": "In attesa IT"}]
+        self.client.patch(self.url, payload, format="json")
+
+        self.s1.refresh_from_db()
+        self.s2.refresh_from_db()
+        self.assertEqual(self.s1.notes, "Firmato in sede")
+        self.assertEqual(self.s2.notes, "In attesa IT")
+        self.assertFalse(self.s1.is_completed)
+
+    def test_batch_is_a_single_update(self):
+        payload = [
+            {"id": self.s1.id, "is_completed": True, "notes": "ok"},
+            {"id": self.s2.id, "is_completed": True},
+            {"id": self.s3.id, "notes": "domani"},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.patch(self.url, payload, format="json")
+
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+
+    def test_step_of_other_employee_returns_400(self):
+        other = Employee.objects.create(
+            first_name="Anna",
+            last_name="Bianchi",
+            email="anna.bianchi@example.com",
+            hire_date="2024-06-01",
+        )
+        other_step = OnboardingStep.objects.filter(employee=other).first()
+
+        response = self.client.patch(self.url, [{"id": other_step.id, "is_completed": True}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        other_step.refresh_from_db()
+        self.assertFalse(other_step.is_completed)
+
+    def test_duplicate_ids_return_400(self):
+        payload = [{"id": self.s1.id, "is_completed": True}, {"id": self.s1.id, "is_completed": False}]
+        response = self.client.patch(self.url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_or_non_list_body_returns_400(self):
+        self.assertEqual(self.client.patch(self.url, [], format="json").status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(self.url, {"id": self.s1.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_invalidates_dashboard_cache(self):
+        self.client.get("/api/dashboard/stats/")
+        self.assertIsNotNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
+
+        self.client.patch(self.url, [{"id": self.s1.id, "is_completed": True}], format="json")
+        self.assertIsNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
+
+
+class OnboardingPropagationTest(TestCase):
+    """Tests for propagating a new template to employees already in onboarding.
+
+    SQL analogy: INSERT INTO onboarding_steps SELECT ... FROM employees
+    WHERE <onboarding in corso> ON CONFLICT DO NOTHING, eseguito a blocchi
+    da un job in background che scrive il progresso in una history table.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = authenticate_client(self.client)
+        self.url = "/api/onboarding-templates/"
+
+        # D: assunto prima che esistano template → nessuno step, non in onboarding
+        self.no_steps = self._create_employee("dario@example.com")
+        self.t1 = OnboardingTemplate.objects.create(name="Firma contratto", order=1)
+        # A, A2: step t1 ancora da completare → in onboarding
+        self.in_flight = self._create_employee("anna@example.com")
+        self.in_flight_2 = self._create_employee("alberto@example.com")
+        # B: onboarding completato
+        self.done = self._create_employee("bruno@example.com")
+        OnboardingStep.objects.filter(employee=self.done).update(is_completed=True, completed_at=timezone.now())
+        # C: ha step pendenti ma è stato disattivato
+        self.inactive = self._create_employee("carla@example.com")
+        self.inactive.is_active = False
+        self.inactive.save()
+
+    def _create_employee(self, email):
+        return Employee.objects.create(first_name="Test", last_name=email, email=email, hire_date="2024-01-15")
+
+    def _employees_with_template(self, template):
+        return set(OnboardingStep.objects.filter(template=template).values_list("employee__email", flat=True))
+
+    def test_create_with_propagate_adds_step_to_in_flight_employees(self):
+        payload = {"name": "Badge aziendale", "order": 2, "propagate": True}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        template = OnboardingTemplate.objects.get(name="Badge aziendale")
+        self.assertEqual(self._employees_with_template(template), {"anna@example.com", "alberto@example.com"})
+
+        propagation = OnboardingPropagation.objects.get(template=template)
+        self.assertEqual(propagation.status, OnboardingPropagation.Status.COMPLETED)
+        self.assertEqual(propagation.total_employees, 2)
+        self.assertEqual(propagation.processed_employees, 2)
+        self.assertEqual(propagation.created_steps, 2)
+        self.assertIsNotNone(propagation.finished_at)
+
+    def test_create_without_propagate_starts_no_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {"name": "Badge aziendale"}, format="json")
+
+        self.assertFalse(OnboardingPropagation.objects.exists())
+
+    def test_propagate_is_not_a_response_field(self):
+        response = self.client.post(self.url, {"name": "Badge aziendale", "propagate": False}, format="json")
+        self.assertNotIn("propagate", response.data)
+
+    def test_propagation_is_idempotent(self):
+        """Re-running a propagation skips existing steps (ON CONFLICT DO NOTHING)."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"{self.url}{self.t1.id}/propagation/")
+
+        propagation = OnboardingPropagation.objects.get()
+        self.assertEqual(propagation.processed_employees, 2)
+        self.assertEqual(propagation.created_steps, 0)
+        self.assertEqual(OnboardingStep.objects.filter(template=self.t1).count(), 4)
+
+    def test_propagation_in_small_chunks(self):
+        template = OnboardingTemplate.objects.create(name="Badge aziendale", order=2)
+        propagation = OnboardingPropagation.objects.create(template=template)
+
+        run_onboarding_propagation(propagation, chunk_size=1)
+
+        propagation.refresh_from_db()
+        self.assertEqual(propagation.processed_employees, 2)
+        self.assertEqual(propagation.created_steps, 2)
+        self.assertEqual(propagation.progress, 100)
+
+    def test_post_propagation_returns_202_with_job(self):
+        response = self.client.post(f"{self.url}{self.t1.id}/propagation/")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(response.data["template"], self.t1.id)
+
+    def test_get_propagation_reports_latest_job_progress(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"{self.url}{self.t1.id}/propagation/")
+
+        response = self.client.get(f"{self.url}{self.t1.id}/propagation/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "completed")
+        self.assertEqual(response.data["progress"], 100)
+
+    def test_get_propagation_without_job_returns_404(self):
+        response = self.client.get(f"{self.url}{self.t1.id}/propagation/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_failed_propagation_is_marked_failed(self):
+        propagation = OnboardingPropagation.objects.create(template=self.t1)
+
+        with patch("employees.services.propagate_template_chunk", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                propagate_onboarding_template_task(propagation.pk)
+
+        propagation.refresh_from_db()
+        self.assertEqual(propagation.status, OnboardingPropagation.Status.FAILED)
+        self.assertEqual(propagation.error, "boom")
+
+
+class OnboardingProgressTest(TestCase):
+    """Tests for the denormalized onboarding counters and GET /api/onboarding/board/.
+
+    I contatori sono mantenuti da un trigger PostgreSQL su onboarding_steps:
+    verifichiamo che ogni percorso di scrittura li aggiorni, e che board e
+    dashboard non aggreghino mai la tabella degli step in lettura.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = authenticate_client(self.client)
+        self.url = "/api/onboarding/board/"
+        for order, name in enumerate(["Firma contratto", "Setup email", "Training sicurezza", "Badge"], start=1):
+            OnboardingTemplate.objects.create(name=name, order=order)
+
+    def _create_employee(self, email, completed=0, **extra):
+        employee = Employee.objects.create(
+            first_name="Test", last_name=email, email=email, hire_date=extra.pop("hire_date", "2024-01-15"), **extra
+        )
+        step_ids = OnboardingStep.objects.filter(employee=employee).values_list("id", flat=True)[:completed]
+        OnboardingStep.objects.filter(id__in=list(step_ids)).update(is_completed=True)
+        return employee
+
+    def _progress(self, employee):
+        progress = OnboardingProgress.objects.get(employee=employee)
+        return progress.steps_completed, progress.steps_total
+
+    def test_counters_created_with_steps(self):
+        employee = self._create_employee("mario@example.com")
+        self.assertEqual(self._progress(employee), (0, 4))
+
+    def test_counters_follow_single_patch(self):
+        employee = self._create_employee("mario@example.com")
+        step = OnboardingStep.objects.filter(employee=employee).first()
+        url = f"/api/employees/{employee.id}/onboarding/{step.id}/"
+
+        self.client.patch(url, {"is_completed": True}, format="json")
+        self.assertEqual(self._progress(employee), (1, 4))
+        self.client.patch(url, {"is_completed": False}, format="json")
+        self.assertEqual(self._progress(employee), (0, 4))
+
+    def test_counters_follow_batch_update(self):
+        employee = self._create_employee("mario@example.com")
+        payload = [{"id": s.id, "is_completed": True} for s in OnboardingStep.objects.filter(employee=employee)]
+
+        self.client.patch(f"/api/employees/{employee.id}/onboarding/", payload, format="json")
+        self.assertEqual(self._progress(employee), (4, 4))
+
+    def test_counters_follow_propagation(self):
+        employee = self._create_employee("mario@example.com", completed=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/onboarding-templates/", {"name": "Kit", "propagate": True}, format="json")
+
+        self.assertEqual(self._progress(employee), (1, 5))
+
+    def test_counters_follow_step_deletion(self):
+        employee = self._create_employee("mario@example.com", completed=2)
+        OnboardingStep.objects.filter(employee=employee, is_completed=True).delete()
+        self.assertEqual(self._progress(employee), (0, 2))
+
+    def test_board_lists_only_active_employees_in_progress(self):
+        self._create_employee("in.progress@example.com", completed=1)
+        self._create_employee("done@example.com", completed=4)
+        self._create_employee("inactive@example.com", is_active=False)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["email"] for row in response.data["results"]], ["in.progress@example.com"])
+        row = response.data["results"][0]
+        self.assertEqual((row["steps_completed"], row["steps_total"], row["progress"]), (1, 4, 25))
+
+    def test_board_ordering(self):
+        self._create_employee("half@example.com", completed=2, hire_date="2024-03-01")
+        self._create_employee("none@example.com", completed=0, hire_date="2024-05-01")
+        self._create_employee("most@example.com", completed=3, hire_date="2024-01-01")
+
+        default = [r["email"] for r in self.client.get(self.url).data["results"]]
+        self.assertEqual(default, ["none@example.com", "half@example.com", "most@example.com"])
+
+        by_progress_desc = [r["email"] for r in self.client.get(f"{self.url}?ordering=-progress").data["results"]]
+        self.assertEqual(by_progress_desc, ["most@example.com", "half@example.com", "none@example.com"])
+
+        by_hire_date = [r["email"] for r in self.client.get(f"{self.url}?ordering=hire_date").data["results"]]
+        self.assertEqual(by_hire_date, ["most@example.com", "half@example.com", "none@example.com"])
+
+    def test_board_is_paginated(self):
+        for i in range(25):
+            self._create_employee(f"emp{i}@example.com")
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_board_and_dashboard_do_not_read_steps_table(self):
+        self._create_employee("mario@example.com", completed=1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+            self.client.get("/api/dashboard/stats/")
+
+        step_queries = [q for q in ctx.captured_queries if "employees_onboardingstep" in q["sql"]]
+        self.assertEqual(step_queries, [])
+
+
 class OnboardingSignalTest(TestCase):
     """Tests for the post_save signal that auto-creates onboarding steps.
 
@@ -814,6 +1586,74 @@ class OnboardingSignalTest(TestCase):
         self.assertEqual(steps.count(), 2)
 
 
+class ActiveTemplateSnapshotTest(TestCase):
+    """Tests for the cached active-template snapshot (services.get_active_templates).
+
+    SQL analogy: lo snapshot è una materialized view di
+    SELECT * FROM onboarding_templates WHERE is_active = 1,
+    rinfrescata solo quando la tabella template cambia.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = authenticate_client(self.client)
+        self.t1 = OnboardingTemplate.objects.create(name="Firma contratto", order=1)
+        self.t2 = OnboardingTemplate.objects.create(name="Setup email", order=2)
+
+    def _template_queries(self, queries):
+        return [q for q in queries if "employees_onboardingtemplate" in q["sql"]]
+
+    def test_snapshot_contains_active_templates_in_order(self):
+        OnboardingTemplate.objects.create(name="Old", order=0, is_active=False)
+        names = [t.name for t in get_active_templates()]
+        self.assertEqual(names, ["Firma contratto", "Setup email"])
+
+    def test_snapshot_is_immutable(self):
+        snapshot = get_active_templates()
+        self.assertIsInstance(snapshot, tuple)
+        with self.assertRaises(FrozenInstanceError):
+            snapshot[0].name = "Changed"
+
+    def test_provisioning_with_warm_cache_skips_template_queries(self):
+        """Creating an employee should not read onboarding_templates when the snapshot is cached."""
+        get_active_templates()  # warm-up
+
+        with CaptureQueriesContext(connection) as ctx:
+            employee = Employee.objects.create(
+                first_name="Mario",
+                last_name="Rossi",
+                email="mario.rossi@example.com",
+                hire_date="2024-01-15",
+            )
+
+        self.assertEqual(self._template_queries(ctx.captured_queries), [])
+        self.assertEqual(OnboardingStep.objects.filter(employee=employee).count(), 2)
+
+    def test_template_list_with_warm_cache_costs_zero_queries(self):
+        self.client.get("/api/onboarding-templates/")
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/onboarding-templates/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+
+    def test_snapshot_invalidated_on_create(self):
+        get_active_templates()
+        OnboardingTemplate.objects.create(name="Badge aziendale", order=3)
+        self.assertEqual(len(get_active_templates()), 3)
+
+    def test_snapshot_invalidated_on_update(self):
+        get_active_templates()
+        self.client.patch(f"/api/onboarding-templates/{self.t1.id}/", {"name": "Firma"}, format="json")
+        self.assertEqual(get_active_templates()[0].name, "Firma")
+
+    def test_snapshot_invalidated_on_soft_delete(self):
+        get_active_templates()
+        self.client.delete(f"/api/onboarding-templates/{self.t2.id}/")
+        self.assertEqual([t.id for t in get_active_templates()], [self.t1.id])
+
+
 class WelcomeEmailTest(TestCase):
     """Tests for the welcome email sent on employee creation (US-007).
 
@@ -1250,8 +2090,10 @@ class CeleryTaskTest(TestCase):
     invece di schedulare un job SQL Agent.
     """
 
+    @override_settings(OUTBOX_ALWAYS_EAGER=False)
     def test_send_welcome_email_task_sends_email(self):
         """Task should send exactly one email when called with valid employee PK."""
+        # Senza outbox eager il signal accoda soltanto: l'email la manda il task
         employee = Employee.objects.create(
             first_name="Mario",
             last_name="Rossi",
@@ -1259,12 +2101,31 @@ class CeleryTaskTest(TestCase):
             role="employee",
             hire_date="2024-01-15",
         )
-        mail.outbox.clear()  # Reset: signal already sent one email
 
         send_welcome_email_task(employee.pk)
 
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].to, ["mario.rossi@example.com"])
+        employee.refresh_from_db()
+        self.assertIsNotNone(employee.welcome_email_sent_at)
+
+    @override_settings(OUTBOX_ALWAYS_EAGER=False)
+    def test_republished_outbox_message_sends_one_email(self):
+        """At-least-once: la stessa riga dell'outbox pubblicata due volte = una sola email."""
+        Employee.objects.create(
+            first_name="Mario",
+            last_name="Rossi",
+            email="mario.rossi@example.com",
+            role="employee",
+            hire_date="2024-01-15",
+        )
+        message = OutboxMessage.objects.get()
+
+        # Il dispatcher è caduto dopo la prima pubblicazione, prima del COMMIT
+        publish(message)
+        publish(message)
+
+        self.assertEqual(len(mail.outbox), 1)
 
     def test_send_welcome_email_task_nonexistent_employee(self):
         """Task should silently skip if employee PK doesn't exist in DB."""
@@ -1272,6 +2133,7 @@ class CeleryTaskTest(TestCase):
 
         self.assertEqual(len(mail.outbox), 0)
 
+    @override_settings(OUTBOX_ALWAYS_EAGER=False)
     def test_send_welcome_email_task_retries_on_smtp_failure(self):
         """Task should call self.retry() when send_mail raises an exception."""
         employee = Employee.objects.create(
@@ -1281,7 +2143,6 @@ class CeleryTaskTest(TestCase):
             role="employee",
             hire_date="2024-01-15",
         )
-        mail.outbox.clear()
 
         with patch("employees.services.send_mail", side_effect=ConnectionError("SMTP down")):
             with patch.object(send_welcome_email_task, "retry", side_effect=ConnectionError) as mock_retry:
@@ -1289,19 +2150,28 @@ class CeleryTaskTest(TestCase):
                     send_welcome_email_task(employee.pk)
 
                 mock_retry.assert_called_once()
-
-    def test_signal_queues_task_on_employee_creation(self):
-        """Signal should call send_welcome_email_task.delay() on new employee."""
-        with patch("employees.signals.send_welcome_email_task") as mock_task:
-            Employee.objects.create(
+        # ROLLBACK: nessun marcatore, il retry invierà l'email
+        employee.refresh_from_db()
+        self.assertIsNone(employee.welcome_email_sent_at)
+
+    @override_settings(OUTBOX_ALWAYS_EAGER=False)
+    def test_signal_queues_task_in_outbox_on_employee_creation(self):
+        """Signal should write send_welcome_email_task to the outbox, not call Redis."""
+        with patch.object(send_welcome_email_task, "apply_async") as mock_apply:
+            employee = Employee.objects.create(
                 first_name="Mario",
                 last_name="Rossi",
                 email="mario.rossi@example.com",
                 role="employee",
                 hire_date="2024-01-15",
             )
-            mock_task.delay.assert_called_once()
+            mock_apply.assert_not_called()
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, send_welcome_email_task.name)
+        self.assertEqual(message.args, [employee.pk])
 
+    @override_settings(OUTBOX_ALWAYS_EAGER=False)
     def test_signal_does_not_queue_task_on_update(self):
         """Updating an employee should NOT queue the email task."""
         employee = Employee.objects.create(
@@ -1311,12 +2181,189 @@ class CeleryTaskTest(TestCase):
             role="employee",
             hire_date="2024-01-15",
         )
+        OutboxMessage.objects.all().delete()
 
-        with patch("employees.signals.send_welcome_email_task") as mock_task:
-            employee.department = "Engineering"
-            employee.save()
+        employee.department = "Engineering"
+        employee.save()
+
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class _SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Server SMTP minimale: registra connessioni e messaggi, rifiuta gli indirizzi in `rejected`."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost SMTP stand-in")
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode().strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip(" <>")
+                if address in self.server.rejected:
+                    self.reply("550 Mailbox unavailable")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                self.server.delivered.extend(recipients)
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:  # RSET, NOOP, HELO
+                self.reply("250 OK")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPStandInHandler)
+        self.connections = 0
+        self.delivered = []
+        self.rejected = set()
+
+
+class WelcomeEmailBatchTest(TestCase):
+    """Tests for the batched welcome-email dispatcher (US-007).
+
+    Le email vengono inviate a un server SMTP locale vero (SMTPStandIn),
+    con il backend smtp di Django: così possiamo contare le connessioni
+    aperte e simulare un destinatario rifiutato dal server.
+
+    SQL analogy: la coda di Database Mail (sysmail_unsentitems) svuotata
+    da un solo processo esterno, invece di un sp_send_dbmail per riga.
+    """
 
-            mock_task.delay.assert_not_called()
+    def setUp(self):
+        self.smtp = SMTPStandIn()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+
+        smtp_settings = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False,
+            WELCOME_EMAIL_BATCHING=True,
+            OUTBOX_ALWAYS_EAGER=False,
+        )
+        smtp_settings.enable()
+        self.addCleanup(smtp_settings.disable)
+
+    def create_employees(self, count):
+        # Senza dispatcher dell'outbox il task non parte: le righe restano in coda
+        return [
+            Employee.objects.create(
+                first_name=f"Nome{i}",
+                last_name=f"Cognome{i}",
+                email=f"new{i}@example.com",
+                role="employee",
+                hire_date="2024-01-15",
+            )
+            for i in range(count)
+        ]
+
+    def test_creation_queues_email_instead_of_sending(self):
+        self.create_employees(2)
+
+        self.assertEqual(PendingWelcomeEmail.objects.count(), 2)
+        self.assertEqual(self.smtp.connections, 0)
+
+    @override_settings(WELCOME_EMAIL_BATCH_SIZE=2)
+    def test_dispatch_reuses_one_connection_across_batches(self):
+        self.create_employees(5)
+
+        sent, failed = dispatch_pending_welcome_emails()
+
+        self.assertEqual((sent, failed), (5, 0))
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertEqual(sorted(self.smtp.delivered), [f"new{i}@example.com" for i in range(5)])
+        self.assertFalse(PendingWelcomeEmail.objects.exists())
+        self.assertFalse(Employee.objects.filter(welcome_email_sent_at__isnull=True).exists())
+
+    def test_only_failed_recipients_are_retried(self):
+        self.create_employees(3)
+        self.smtp.rejected.add("new1@example.com")
+
+        self.assertEqual(dispatch_pending_welcome_emails(), (2, 1))
+        pending = PendingWelcomeEmail.objects.get()
+        self.assertEqual(pending.employee.email, "new1@example.com")
+        self.assertEqual(pending.attempts, 1)
+        self.assertIn("Mailbox unavailable", pending.last_error)
+        # Il rifiuto di un destinatario non chiude la connessione
+        self.assertEqual(self.smtp.connections, 1)
+
+        self.smtp.rejected.clear()
+        self.assertEqual(dispatch_pending_welcome_emails(), (1, 0))
+        self.assertEqual(self.smtp.delivered.count("new0@example.com"), 1)
+        self.assertEqual(self.smtp.delivered.count("new1@example.com"), 1)
+
+    @override_settings(WELCOME_EMAIL_MAX_ATTEMPTS=2)
+    def test_exhausted_emails_are_skipped(self):
+        self.create_employees(1)
+        PendingWelcomeEmail.objects.update(attempts=2)
+
+        self.assertEqual(dispatch_pending_welcome_emails(), (0, 0))
+        self.assertEqual(self.smtp.connections, 0)
+
+    def test_task_retries_when_recipients_fail(self):
+        self.create_employees(2)
+        self.smtp.rejected.add("new0@example.com")
+
+        with patch.object(dispatch_welcome_emails_task, "retry", side_effect=RuntimeError) as mock_retry:
+            with self.assertRaises(RuntimeError):
+                dispatch_welcome_emails_task()
+
+        mock_retry.assert_called_once()
+        self.assertEqual(self.smtp.delivered, ["new1@example.com"])
+
+    @override_settings(WELCOME_EMAIL_MAX_ATTEMPTS=5)
+    def test_task_retries_until_max_attempts_then_gives_up(self):
+        """Un destinatario sempre rifiutato: 5 giri (1 + 4 retry), poi la riga è abbandonata."""
+        self.create_employees(1)
+        self.smtp.rejected.add("new0@example.com")
+
+        # I retry che farebbe Celery, uno alla volta (in eager Retry viene propagato)
+        runs = 0
+        with self.assertLogs("employees.services", "ERROR") as logs:
+            for retries in range(10):
+                runs += 1
+                try:
+                    dispatch_welcome_emails_task.apply(retries=retries)
+                except Retry:
+                    continue
+                break
+
+        # Nessun MaxRetriesExceededError a metà: l'ultimo giro finisce da solo
+        self.assertEqual(runs, 5)
+        self.assertEqual(PendingWelcomeEmail.objects.get().attempts, 5)
+        self.assertEqual(self.smtp.connections, 5)
+        self.assertIn("giving up", logs.output[0])
+
+    def test_wave_of_hires_schedules_a_single_dispatch(self):
+        """Con il debounce, N assunzioni nella stessa finestra = un solo task nell'outbox."""
+        self.create_employees(3)
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, dispatch_welcome_emails_task.name)
+        self.assertGreater(message.available_at, timezone.now())
 
 
 class DashboardCacheTest(TestCase):
@@ -1345,13 +2392,13 @@ class DashboardCacheTest(TestCase):
         si eseguono le query e si fa INSERT INTO staging_table.
         """
         # Cache vuota all'inizio
-        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertIsNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
 
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # Dopo la request, i dati devono essere in cache
-        cached = cache.get(DASHBOARD_CACHE_KEY)
+        cached = two_tier_cache.get(DASHBOARD_CACHE_KEY)
         self.assertIsNotNone(cached)
         self.assertIn("employees", cached)
         self.assertIn("contracts", cached)
@@ -1413,7 +2460,7 @@ class DashboardCacheTest(TestCase):
         """
         # Popola cache
         self.client.get(self.url)
-        self.assertIsNotNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertIsNotNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
 
         # Crea un employee → signal invalida la cache
         Employee.objects.create(
@@ -1425,7 +2472,7 @@ class DashboardCacheTest(TestCase):
         )
 
         # Cache deve essere stata cancellata
-        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertIsNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
 
     def test_cache_invalidated_on_contract_save(self):
         """Creare un Contract deve invalidare la cache.
@@ -1443,7 +2490,7 @@ class DashboardCacheTest(TestCase):
 
         # Popola cache (dopo la creazione employee, che l'ha invalidata)
         self.client.get(self.url)
-        self.assertIsNotNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertIsNotNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
 
         # Crea contratto → signal invalida la cache
         today = timezone.now().date()
@@ -1454,7 +2501,7 @@ class DashboardCacheTest(TestCase):
             start_date=today,
         )
 
-        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertIsNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
 
     def test_cache_invalidated_on_onboarding_step_update(self):
         """Aggiornare un OnboardingStep deve invalidare la cache.
@@ -1473,11 +2520,505 @@ class DashboardCacheTest(TestCase):
         # L'employee creation signal crea step automaticamente.
         # Popola cache (dopo i signal di creazione).
         self.client.get(self.url)
-        self.assertIsNotNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertIsNotNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
 
         # Aggiorna uno step → signal invalida la cache
         step = OnboardingStep.objects.filter(employee=employee).first()
         if step:
             step.is_completed = True
             step.save()
-            self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+            self.assertIsNone(two_tier_cache.get(DASHBOARD_CACHE_KEY))
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """Declarative query budget for one endpoint.
+
+    `url` is formatted with the seeded objects ({employee}, {manager}); `data`
+    is the request body, built from the same objects when it is callable.
+    """
+
+    name: str
+    method: str
+    url: str
+    budget: int
+    data: object = None
+    as_manager: bool = False
+
+
+# Budget di query per endpoint. Il numero NON deve crescere con le righe:
+# se un serializer inizia a fare una query per riga (N+1), il test fallisce.
+# Alzare un budget è una scelta consapevole, da motivare nella PR.
+QUERY_BUDGETS = [
+    QueryBudget("employee-list", "get", "/api/employees/", 2),
+    QueryBudget("employee-list-scoped", "get", "/api/employees/", 2, as_manager=True),
+    QueryBudget("employee-detail", "get", "/api/employees/{employee}/", 1),
+    QueryBudget("employee-history", "get", "/api/employees/{employee}/history/", 3),
+    QueryBudget("contract-list", "get", "/api/employees/{employee}/contracts/", 2),
+    QueryBudget("onboarding-steps", "get", "/api/employees/{employee}/onboarding/", 2),
+    QueryBudget(
+        "onboarding-steps-batch",
+        "patch",
+        "/api/employees/{employee}/onboarding/",
+        9,
+        data=lambda employee: [{"id": step.pk, "is_completed": True} for step in employee.onboarding_steps.all()],
+    ),
+    QueryBudget("onboarding-templates", "get", "/api/onboarding-templates/", 1),
+    QueryBudget("onboarding-board", "get", "/api/onboarding/board/", 2),
+    QueryBudget("org-chart", "get", "/api/org-chart/", 2),
+    QueryBudget("org-chart-scoped", "get", "/api/org-chart/", 2, as_manager=True),
+    QueryBudget("dashboard", "get", "/api/dashboard/stats/", 5),
+]
+
+
+class QueryBudgetTest(TestCase):
+    """Every endpoint issues a fixed number of queries, whatever the number of rows.
+
+    Ogni endpoint viene misurato due volte: con pochi dati e dopo aver
+    moltiplicato dipendenti, contratti, template e step. Le cache vengono
+    svuotate prima di ogni misura (si misura sempre il percorso "freddo").
+
+    SQL analogy: come verificare che il piano di esecuzione non contenga
+    un Nested Loop che esegue una subquery per ogni riga esterna.
+    """
+
+    def setUp(self):
+        self.hr_client = APIClient()
+        authenticate_client(self.hr_client)
+        self.manager = make_employee("Manager", role="manager")
+        manager_user = User.objects.create_user(email="manager@minijethr.local", password="x", employee=self.manager)
+        self.manager_client = APIClient()
+        self.manager_client.force_authenticate(user=manager_user)
+        self.employee = None
+        self.seeded = 0
+
+    def seed(self, size):
+        """Porta i dati a `size` template, `size` riporti e `size` contratti per riporto."""
+        for order in range(OnboardingTemplate.objects.count(), size):
+            OnboardingTemplate.objects.create(name=f"Task {order}", order=order)
+        for index in range(self.seeded, size):
+            employee = make_employee(f"Report{index}", manager=self.manager)
+            # Step anche per i template creati dopo i primi dipendenti
+            create_onboarding_steps_for_employee(employee)
+            employee.department = "Engineering"
+            employee.save()
+        self.seeded = size
+        for employee in Employee.objects.filter(manager=self.manager):
+            create_onboarding_steps_for_employee(employee)
+            for _ in range(employee.contracts.count(), size):
+                Contract.objects.create(
+                    employee=employee,
+                    contract_type="indeterminato",
+                    ccnl="commercio",
+                    ral="30000.00",
+                    start_date="2024-01-15",
+                )
+        self.employee = Employee.objects.filter(manager=self.manager).order_by("pk").first()
+
+    def count_queries(self, endpoint):
+        cache.clear()
+        two_tier_cache.clear_local()
+        client = self.manager_client if endpoint.as_manager else self.hr_client
+        url = endpoint.url.format(employee=self.employee.pk, manager=self.manager.pk)
+        data = endpoint.data(self.employee) if callable(endpoint.data) else endpoint.data
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(client, endpoint.method)(url, data, format="json")
+        self.assertLess(response.status_code, 300, f"{endpoint.name}: {response.status_code} {response.data}")
+        return ctx
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.seed(2)
+        small = {endpoint.name: self.count_queries(endpoint) for endpoint in QUERY_BUDGETS}
+        self.seed(8)
+        large = {endpoint.name: self.count_queries(endpoint) for endpoint in QUERY_BUDGETS}
+
+        for endpoint in QUERY_BUDGETS:
+            with self.subTest(endpoint=endpoint.name):
+                queries = large[endpoint.name].captured_queries
+                self.assertEqual(
+                    len(queries),
+                    len(small[endpoint.name]),
+                    f"{endpoint.name}: query count grows with rows (N+1?)\n" + "\n".join(q["sql"] for q in queries),
+                )
+                self.assertLessEqual(
+                    len(queries),
+                    endpoint.budget,
+                    f"{endpoint.name}: {len(queries)} queries, budget {endpoint.budget}\n"
+                    + "\n".join(q["sql"] for q in queries),
+                )
+
+
+class BenchmarkHelpersTest(SimpleTestCase):
+    """Pure helpers of `manage.py benchmark` (labels, percentiles, regression check)."""
+
+    def test_size_label(self):
+        self.assertEqual(size_label(1000), "1k")
+        self.assertEqual(size_label(100_000), "100k")
+        self.assertEqual(size_label(1_000_000), "1m")
+        self.assertEqual(size_label(1500), "1500")
+
+    def test_summarize_percentiles_and_rps(self):
+        latencies = [ms / 1000 for ms in range(1, 101)]  # 1..100 ms
+
+        summary = summarize(latencies, elapsed=2.0)
+
+        self.assertAlmostEqual(summary["p50_ms"], 50.5, delta=0.5)
+        self.assertAlmostEqual(summary["p95_ms"], 95.05, delta=0.5)
+        self.assertEqual(summary["rps"], 50.0)
+
+    def test_regression_beyond_threshold_is_flagged(self):
+        baseline = {"employee_list": {"p95_ms": 10.0, "rps": 100.0}}
+
+        within = find_regressions({"employee_list": {"p95_ms": 11.5, "rps": 85.0}}, baseline, 0.2)
+        beyond = find_regressions({"employee_list": {"p95_ms": 13.0, "rps": 70.0}}, baseline, 0.2)
+
+        self.assertEqual(within, [])
+        self.assertEqual(len(beyond), 2)
+        # Scenari nuovi, senza baseline, non sono regressioni
+        self.assertEqual(find_regressions({"new": {"p95_ms": 1.0, "rps": 1.0}}, baseline, 0.2), [])
+
+
+class SeedDataCommandTest(TestCase):
+    """`manage.py seed_data`: COPY load with triggers off, derived tables rebuilt."""
+
+    def seed(self, employees=60, **options):
+        call_command("seed_data", employees=employees, stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return (
+            list(Employee.all_objects.order_by("pk").values_list("pk", "email", "manager_id", "hire_date", "is_active")),
+            list(
+                Contract.objects.order_by("employee_id", "start_date").values_list(
+                    "employee_id", "contract_type", "ral", "start_date", "end_date"
+                )
+            ),
+            list(OnboardingStep.objects.order_by("employee_id", "template_id").values_list("employee_id", "is_completed")),
+        )
+
+    def test_active_employees_have_one_current_contract(self):
+        self.seed(leavers=0.2)
+
+        self.assertEqual(Employee.objects.count(), 60)
+        self.assertGreater(Employee.all_objects.filter(is_active=False).count(), 0)
+        today = DEFAULT_AS_OF
+        for employee in Employee.all_objects.prefetch_related("contracts"):
+            contracts = list(employee.contracts.all())
+            self.assertEqual(min(c.start_date for c in contracts), employee.hire_date)
+            current = [c for c in contracts if c.end_date is None or c.end_date >= today]
+            # Attivi: esattamente un contratto in corso. Ex dipendenti: tutti chiusi.
+            self.assertEqual(len(current), 1 if employee.is_active else 0, employee.pk)
+        self.assertTrue(Contract.objects.filter(contract_type=Contract.ContractType.INDETERMINATO).exists())
+
+    def test_derived_tables_match_what_the_triggers_would_write(self):
+        self.seed()
+
+        managers = dict(Employee.all_objects.values_list("pk", "manager_id"))
+        expected = set()
+        for employee_id in managers:
+            ancestor, depth = employee_id, 0
+            while ancestor is not None:
+                expected.add((ancestor, employee_id, depth))
+                ancestor, depth = managers[ancestor], depth + 1
+        self.assertEqual(set(EmployeeHierarchy.objects.values_list("ancestor_id", "descendant_id", "depth")), expected)
+
+        self.assertTrue(OnboardingStep.objects.exists())
+        for progress in OnboardingProgress.objects.all():
+            steps = OnboardingStep.objects.filter(employee_id=progress.employee_id)
+            self.assertEqual(progress.steps_total, steps.count())
+            self.assertEqual(progress.steps_completed, steps.filter(is_completed=True).count())
+
+    def test_triggers_are_active_again_after_the_load(self):
+        self.seed()
+        manager = Employee.objects.filter(role=Employee.Role.MANAGER).first()
+
+        hire = Employee.objects.create(
+            first_name="Nuova", last_name="Assunta", email="nuova@example.com", hire_date=date.today(), manager=manager
+        )
+
+        self.assertTrue(EmployeeHierarchy.objects.filter(ancestor=manager, descendant=hire, depth=1).exists())
+        self.assertEqual(OnboardingProgress.objects.get(employee=hire).steps_total, OnboardingTemplate.objects.count())
+
+    def test_same_seed_same_dataset(self):
+        with transaction.atomic():
+            self.seed(seed=7)
+            first = self.snapshot()
+            transaction.set_rollback(True)
+
+        self.seed(seed=7)
+
+        self.assertEqual(self.snapshot(), first)
+
+    def test_dates_come_from_as_of_not_from_today(self):
+        """Lo stesso seed in un altro giorno: stesse date, perché contano solo rispetto a --as-of."""
+        as_of = date(2020, 3, 1)
+        self.seed(seed=7, as_of=as_of)
+
+        self.assertLessEqual(Employee.all_objects.latest("hire_date").hire_date, as_of)
+        self.assertEqual(
+            Contract.objects.filter(end_date__isnull=True).count() + Contract.objects.filter(end_date__gte=as_of).count(),
+            Employee.objects.count(),
+        )
+
+    def test_refuses_a_non_empty_database(self):
+        Employee.objects.create(first_name="Mario", last_name="Rossi", email="mario@example.com", hire_date=date.today())
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class LoadTestRecorderTest(SimpleTestCase):
+    """Per-endpoint report of `manage.py loadtest`."""
+
+    def test_error_rate_counts_http_errors_and_network_failures(self):
+        recorder = Recorder()
+        for ms in range(1, 9):
+            recorder.record("GET /api/employees/", ms / 1000, 200)
+        recorder.record("GET /api/employees/", 0.5, 500)
+        recorder.record("GET /api/employees/", 30.0, "TimeoutError")
+
+        row = recorder.report(elapsed=5.0)["GET /api/employees/"]
+
+        self.assertEqual(row["requests"], 10)
+        self.assertEqual(row["rps"], 2.0)
+        self.assertEqual(row["error_rate"], 0.2)
+        self.assertEqual(row["errors"], {"500": 1, "TimeoutError": 1})
+        # Senza risposta non c'è latenza: il timeout non sporca i percentili
+        self.assertLess(row["p99_ms"], 1000)
+
+    def test_total_row_aggregates_all_endpoints(self):
+        recorder = Recorder()
+        recorder.record("GET /api/employees/", 0.01, 200)
+        recorder.record("GET /api/dashboard/stats/", 0.02, 200)
+
+        report = recorder.report(elapsed=1.0)
+
+        self.assertEqual(report["TOTAL"]["requests"], 2)
+        self.assertEqual(report["GET /api/dashboard/stats/"]["p50_ms"], 20.0)
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    """`manage.py loadtest` against a live server: login, traffic mix, report."""
+
+    def setUp(self):
+        User.objects.create_user(email="load@minijethr.local", password="loadpass123", is_staff=True)
+        OnboardingTemplate.objects.create(name="Firma contratto", order=1)
+        for index in range(3):
+            employee = Employee.objects.create(
+                first_name=f"Nome{index}", last_name="Rossi", email=f"load{index}@example.com", hire_date=date.today()
+            )
+            Contract.objects.create(
+                employee=employee,
+                contract_type=Contract.ContractType.INDETERMINATO,
+                ccnl=Contract.CCNL.COMMERCIO,
+                ral=30000,
+                start_date=date.today(),
+            )
+
+    def run_loadtest(self, **options):
+        out = StringIO()
+        call_command(
+            "loadtest",
+            url=self.live_server_url,
+            email="load@minijethr.local",
+            users=2,
+            duration=2,
+            ramp_up=0,
+            think_time=0.01,
+            dashboard_interval=0.5,
+            random_seed=1,
+            stdout=out,
+            **options,
+        )
+        return out.getvalue()
+
+    def test_replays_the_mix_and_reports_each_endpoint(self):
+        output = self.run_loadtest(password="loadpass123")
+
+        for endpoint in (
+            "POST /api/auth/login/",
+            "GET /api/employees/ ",
+            "GET /api/employees/{id}/ ",
+            "GET /api/employees/{id}/contracts/",
+            "GET /api/dashboard/stats/",
+        ):
+            self.assertIn(endpoint, output)
+        total = next(line for line in output.splitlines() if line.startswith("TOTAL"))
+        self.assertTrue(total.endswith(" 0.0%"), total)
+
+    def test_wrong_credentials_stop_before_starting_the_users(self):
+        with self.assertRaises(CommandError):
+            self.run_loadtest(password="wrong")
+
+    @skipUnless(os.path.exists("/proc/self/smaps_rollup"), "needs Linux /proc")
+    def test_server_pid_reports_cpu_and_memory(self):
+        """Il live server gira in un thread di questo processo: è lui il server sotto test."""
+        output = self.run_loadtest(password="loadpass123", server_pid=os.getpid())
+
+        self.assertIn("Throughput per core:", output)
+        memory = next(line for line in output.splitlines() if line.split()[:2] == [str(os.getpid()), "root"])
+        self.assertGreater(float(memory.split()[2]), 0)  # RSS MB
+
+    def test_unknown_server_pid_is_rejected(self):
+        with self.assertRaises(CommandError):
+            self.run_loadtest(password="loadpass123", server_pid=999_999_999)
+
+
+class ImportTimeTest(SimpleTestCase):
+    """Cold start: `manage.py importtime` and the imports kept out of django.setup()."""
+
+    def test_parse_importtime_output(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     celery.utils\n"
+            "import time:        80 |        200 |   celery\n"
+            "import time:       300 |        300 | django.urls\n"
+        )
+
+        modules = parse_importtime(output)
+
+        self.assertEqual(modules[1], ("celery", 80, 200))
+        self.assertEqual(package_times(modules), [("django", 300), ("celery", 200)])
+
+    def test_django_setup_imports_neither_celery_nor_the_schema_generator(self):
+        """Celery e drf-spectacular si caricano solo nei processi che li usano."""
+        code = SETUP + "; import sys; print(' '.join(sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], cwd=settings.BASE_DIR, capture_output=True, text=True)
+
+        modules = set(result.stdout.split())
+        self.assertIn("employees.signals", modules, result.stderr)
+        for heavy in ("celery", "minijet.celery", "drf_spectacular.openapi", "rest_framework_simplejwt.authentication"):
+            self.assertNotIn(heavy, modules)
+
+    def test_celery_app_loaded_on_first_access(self):
+        from minijet import celery_app
+
+        self.assertEqual(celery_app.main, "minijet")
+        self.assertIs(send_welcome_email_task.app, celery_app)
+
+    def test_command_reports_wall_time_and_packages(self):
+        out = StringIO()
+        call_command("importtime", "setup", runs=1, top=3, stdout=out)
+
+        self.assertIn("setup:", out.getvalue())
+        self.assertIn("django", out.getvalue())
+
+
+# URLconf di AsyncReadViewsTest: come minijet.urls con ASYNC_READ_VIEWS=True
+urlpatterns = [path("api/", include(with_async_reads(employee_urls.urlpatterns)))]
+
+
+class AsyncReadViewsTest(TestCase):
+    """Async GET views (ASYNC_READ_VIEWS) return exactly what the DRF views return."""
+
+    def setUp(self):
+        OnboardingTemplate.objects.create(name="Firma contratto", order=1)
+        self.ceo = make_employee("Ceo", role="manager")
+        self.vp = make_employee("Vp", manager=self.ceo, role="manager")
+        self.dev = make_employee("Dev", manager=self.vp)
+        self.other = make_employee("Other", manager=self.ceo)
+        Employee.objects.bulk_create(
+            Employee(first_name=f"Extra{i}", last_name="Test", email=f"extra{i}@example.com", hire_date="2024-01-15")
+            for i in range(20)
+        )
+        Contract.objects.create(
+            employee=self.dev,
+            contract_type=Contract.ContractType.DETERMINATO,
+            ccnl=Contract.CCNL.COMMERCIO,
+            ral=28000,
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=20),
+        )
+        hr = User.objects.create_user(email="hr@minijethr.local", password="x", is_staff=True)
+        manager = User.objects.create_user(email="vp@minijethr.local", password="x", employee=self.vp)
+        self.hr_token = str(ClaimsTokenObtainPairSerializer.get_token(hr).access_token)
+        self.manager_token = str(ClaimsTokenObtainPairSerializer.get_token(manager).access_token)
+
+        self.async_urls = override_settings(ROOT_URLCONF=__name__)
+
+    async def get_both(self, url, token):
+        """La stessa GET sulla view DRF sync e sulla view async."""
+        headers = {"authorization": f"Bearer {token}"} if token else {}
+        sync_response = await sync_to_async(self.client.get)(url, headers=headers)
+        two_tier_cache.clear_local()
+        cache.clear()
+        with self.async_urls:
+            async_response = await self.async_client.get(url, headers=headers)
+        return sync_response, async_response
+
+    async def assert_same_response(self, url, token):
+        sync_response, async_response = await self.get_both(url, token)
+        self.assertEqual(async_response.status_code, sync_response.status_code, url)
+        self.assertEqual(async_response.json(), sync_response.json(), url)
+        return async_response
+
+    async def test_reads_match_the_sync_views(self):
+        for url in (
+            "/api/employees/",
+            "/api/employees/?page=2",
+            "/api/employees/?ordering=-first_name&role=manager",
+            f"/api/employees/{self.dev.pk}/",
+            f"/api/employees/{self.dev.pk}/contracts/",
+            f"/api/employees/{self.dev.pk}/onboarding/",
+            "/api/dashboard/stats/",
+        ):
+            response = await self.assert_same_response(url, self.hr_token)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertEqual(response["Content-Type"], "application/json")
+
+    async def test_scope_and_errors_match_the_sync_views(self):
+        for url, token in (
+            ("/api/employees/", self.manager_token),
+            (f"/api/employees/{self.other.pk}/", self.manager_token),
+            (f"/api/employees/{self.other.pk}/contracts/", self.manager_token),
+            ("/api/employees/?page=99", self.hr_token),
+            ("/api/employees/abc/", self.hr_token),
+            ("/api/employees/", None),
+            ("/api/dashboard/stats/", "not-a-token"),
+        ):
+            await self.assert_same_response(url, token)
+
+        _sync, anonymous = await self.get_both("/api/employees/", None)
+        self.assertEqual(anonymous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(anonymous["WWW-Authenticate"], 'Bearer realm="api"')
+
+    def test_dashboard_hit_runs_no_query(self):
+        get = async_to_sync(self.async_client.get)
+        headers = {"authorization": f"Bearer {self.hr_token}"}
+        with self.async_urls:
+            first = get("/api/dashboard/stats/", headers=headers)
+            with CaptureQueriesContext(connection) as queries:
+                second = get("/api/dashboard/stats/", headers=headers)
+
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(len(queries), 0)
+
+    def test_reads_use_the_replica_chosen_for_the_request(self):
+        get = async_to_sync(self.async_client.get)
+        headers = {"authorization": f"Bearer {self.hr_token}"}
+        decisions = []
+        original = ReadReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            decisions.append(original(router, model, **hints))
+            return decisions[-1]
+
+        # "default" fa da replica (mirror nei test): conta la decisione del router
+        with self.async_urls, override_settings(DATABASE_REPLICAS=["default"]):
+            with patch.object(ReadReplicaRouter, "db_for_read", spy):
+                response = get("/api/employees/", headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(decisions), {"default"})
+
+    async def test_writes_still_go_through_the_drf_views(self):
+        headers = {"authorization": f"Bearer {self.hr_token}"}
+        payload = {"first_name": "Nuova", "last_name": "Assunta", "email": "nuova@example.com", "hire_date": "2025-01-01"}
+
+        with self.async_urls:
+            response = await self.async_client.post(
+                "/api/employees/", payload, content_type="application/json", headers=headers
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await Employee.objects.filter(email="nuova@example.com").aexists())
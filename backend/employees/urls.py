@@ -1,12 +1,16 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import with_async_reads
 from .views import (
     ContractViewSet,
     DashboardView,
     EmployeeViewSet,
+    OnboardingBoardView,
     OnboardingStepViewSet,
     OnboardingTemplateViewSet,
+    OrgChartView,
 )
 
 router = DefaultRouter()
@@ -21,8 +25,9 @@ contract_detail = ContractViewSet.as_view({"get": "retrieve", "patch": "partial_
 
 # Nested routes for onboarding steps under employees
 # /api/employees/{employee_pk}/onboarding/       → list (GET) + start onboarding (POST)
+#                                                 + batch update (PATCH)
 # /api/employees/{employee_pk}/onboarding/{pk}/  → toggle step completion (PATCH)
-onboarding_list = OnboardingStepViewSet.as_view({"get": "list", "post": "create"})
+onboarding_list = OnboardingStepViewSet.as_view({"get": "list", "post": "create", "patch": "batch_update"})
 onboarding_detail = OnboardingStepViewSet.as_view({"patch": "partial_update"})
 
 urlpatterns = [
@@ -30,6 +35,10 @@ urlpatterns = [
     # Dashboard: read-only aggregated stats (APIView, not ViewSet)
     # SQL analogy: SELECT from a reporting view, no CRUD needed
     path("dashboard/stats/", DashboardView.as_view(), name="dashboard-stats"),
+    # Onboarding board: every employee still in onboarding, with % progress
+    path("onboarding/board/", OnboardingBoardView.as_view(), name="onboarding-board"),
+    # Org chart: reporting tree from a recursive CTE, with cached subtree sizes
+    path("org-chart/", OrgChartView.as_view(), name="org-chart"),
     path(
         "employees/<int:employee_pk>/contracts/",
         contract_list,
@@ -51,3 +60,7 @@ urlpatterns = [
         name="employee-onboarding-detail",
     ),
 ]
+
+# Sotto ASGI: le GET più frequenti passano dalle view async (employees/async_views.py)
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = with_async_reads(urlpatterns)
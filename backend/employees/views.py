@@ -1,31 +1,88 @@
 from datetime import timedelta
 
 from django.conf import settings as django_settings
-from django.core.cache import cache
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count, F, Q
 from django.db.models.functions import TruncMonth
 from django.utils import timezone
-from rest_framework import status, viewsets
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.filters import OrderingFilter
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from audit.models import AuditEntry
+from audit.serializers import AuditEntrySerializer
+from minijet.cache import two_tier_cache
+from minijet.replicas import SAFE_METHODS, choose_replica, read_database
+
 # Chiave cache per la dashboard — come il nome di una staging table.
 # Una sola chiave perché è un singolo endpoint aggregato.
 DASHBOARD_CACHE_KEY = "dashboard_stats"
 
 from .models import Contract, Employee, OnboardingStep, OnboardingTemplate
+from .org_chart import build_org_chart
+from .scoping import in_scope, scope_queryset, scoped_employees, sees_everything
 from .serializers import (
     ContractSerializer,
     EmployeeSerializer,
+    OnboardingBoardSerializer,
+    OnboardingPropagationSerializer,
+    OnboardingStepBatchSerializer,
     OnboardingStepSerializer,
     OnboardingTemplateSerializer,
+    OrgChartQuerySerializer,
+)
+from .services import (
+    create_onboarding_steps_for_employee,
+    get_active_templates,
+    in_progress_onboarding,
+    start_onboarding_propagation,
+    update_onboarding_steps,
 )
-from .services import create_onboarding_steps_for_employee
+from .signals import invalidate_dashboard_cache
+
 
+class ReplicaReadMixin:
+    """Serves the read-only actions of a view from a read replica (minijet/replicas.py).
+
+    `replica_actions` lists the ViewSet actions that may read slightly stale
+    data; plain APIViews use the HTTP method ("get"). A user who has just
+    written something stays on the primary (read-your-writes). Without
+    DB_REPLICA_HOSTS every read stays on the primary.
+    """
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+    replica_actions = ("list", "retrieve", "get")
+    # True per i risultati condivisi in cache: primario anche dopo le scritture degli altri
+    replica_after_any_write = False
+
+    def replica_database(self, request):
+        """Alias della replica per questa request, None per il primario."""
+        if request.method not in SAFE_METHODS:
+            return None
+        if (getattr(self, "action", None) or request.method.lower()) not in self.replica_actions:
+            return None
+        return choose_replica(request.user, after_any_write=self.replica_after_any_write)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Chi chiama ha già scelto il database (es. un batch con scritture, minijet/batch.py)
+        if read_database.get() is not None:
+            return
+        # Dopo autenticazione e permessi: serve l'utente per il read-your-writes
+        self._read_database_token = read_database.set(self.replica_database(request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_database_token", None)
+        if token is not None:
+            read_database.reset(token)
+            self._read_database_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class EmployeeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for Employee CRUD operations.
 
@@ -34,7 +91,12 @@ class EmployeeViewSet(viewsets.ModelViewSet):
     - Ordering: ?ordering=hire_date, ?ordering=-hire_date
     - Pagination: ?page=2 (configured globally in settings.py)
 
-    Only active employees are returned by default (soft delete support).
+    Only active employees are returned (soft delete support: Employee.objects
+    is active-only). Deactivated employees can be brought back with
+    POST /api/employees/{id}/restore/.
+
+    Role scoping (US-012): HR admins (is_staff) see everyone, managers see
+    their whole reporting subtree, employees see only themselves.
     """
 
     serializer_class = EmployeeSerializer
@@ -43,7 +105,7 @@ class EmployeeViewSet(viewsets.ModelViewSet):
     ordering = ["last_name", "first_name"]
 
     def get_queryset(self):
-        qs = Employee.objects.filter(is_active=True)
+        qs = scoped_employees(self.request.user)
 
         role = self.request.query_params.get("role")
         if role:
@@ -51,12 +113,54 @@ class EmployeeViewSet(viewsets.ModelViewSet):
 
         return qs
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        # INSERT del dipendente, checklist di onboarding e riga dell'outbox
+        # per l'email nella stessa transazione: o tutto o niente.
+        serializer.save()
+
     def perform_destroy(self, instance):
         instance.is_active = False
         instance.save()
 
+    @action(detail=True, methods=["post"])
+    def restore(self, request, pk=None):
+        """Reactivate a soft-deleted employee (US-004).
+
+        URL: POST /api/employees/{id}/restore/
+        Idempotent: restoring an active employee is a no-op.
+        Contracts, onboarding steps and history were never deleted,
+        so they are visible again as they were.
 
-class ContractViewSet(viewsets.ModelViewSet):
+        SQL: UPDATE employees SET is_active = 1 WHERE id = @id
+        """
+        # all_objects: get_object() userebbe get_queryset(), che vede solo gli attivi
+        employee = get_object_or_404(scoped_employees(request.user, Employee.all_objects), pk=pk)
+        self.check_object_permissions(request, employee)
+        if not employee.is_active:
+            employee.is_active = True
+            employee.save()
+        return Response(self.get_serializer(employee).data)
+
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        """Field-level change history of an employee, newest first (US-003).
+
+        URL: /api/employees/{id}/history/
+        Includes changes to the employee's contracts and onboarding steps,
+        and works for deactivated employees too.
+        """
+        employee = get_object_or_404(scoped_employees(request.user, Employee.all_objects), pk=pk)
+        # Usa audit_employee_history_idx su ogni partizione mensile
+        entries = AuditEntry.objects.filter(employee_id=employee.pk)
+
+        page = self.paginate_queryset(entries)
+        if page is not None:
+            return self.get_paginated_response(AuditEntrySerializer(page, many=True).data)
+        return Response(AuditEntrySerializer(entries, many=True).data)
+
+
+class ContractViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint for Contract CRUD, nested under an Employee.
 
@@ -71,18 +175,22 @@ class ContractViewSet(viewsets.ModelViewSet):
     serializer_class = ContractSerializer
 
     def get_queryset(self):
-        # Filtra contratti solo per l'employee nella URL
+        # Filtra contratti solo per l'employee nella URL, se è attivo e visibile
         # Come: SELECT * FROM contracts WHERE employee_id = @employee_pk
-        return Contract.objects.filter(employee_id=self.kwargs["employee_pk"])
+        #       AND employee_id IN (SELECT id FROM employees WHERE is_active)
+        #       AND employee_id IN (SELECT descendant_id FROM hierarchy WHERE ancestor_id = @me)
+        qs = Contract.objects.filter(employee_id=self.kwargs["employee_pk"], employee__in=Employee.objects.all())
+        return scope_queryset(qs, self.request.user)
 
     def perform_create(self, serializer):
-        # Prende l'employee dalla URL e lo inietta nel contratto
+        # Prende l'employee dalla URL e lo inietta nel contratto.
+        # Employee.objects è il manager "solo attivi": niente contratti per chi è uscito.
         # Come: INSERT INTO contracts (employee_id, ...) VALUES (@employee_pk, ...)
-        employee = get_object_or_404(Employee, pk=self.kwargs["employee_pk"])
+        employee = get_object_or_404(scoped_employees(self.request.user), pk=self.kwargs["employee_pk"])
         serializer.save(employee=employee)
 
 
-class OnboardingTemplateViewSet(viewsets.ModelViewSet):
+class OnboardingTemplateViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     CRUD for onboarding task templates (the lookup table).
 
@@ -93,24 +201,79 @@ class OnboardingTemplateViewSet(viewsets.ModelViewSet):
     """
 
     serializer_class = OnboardingTemplateSerializer
+    # La lista ricostruisce uno snapshot in cache per tutti: subito dopo ogni scrittura va sul primario
+    replica_after_any_write = True
 
     def get_queryset(self):
-        # Solo template attivi — come: SELECT * FROM templates WHERE is_active = 1
-        return OnboardingTemplate.objects.filter(is_active=True)
+        # Solo template attivi (manager di default) — come: SELECT * FROM templates WHERE is_active = 1
+        return OnboardingTemplate.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        """List from the cached active-template snapshot (0 queries on a cache hit).
+
+        Detail, update and delete still go through get_queryset(): they need
+        real model instances, and are rare compared to the list page.
+        """
+        templates = get_active_templates()
+
+        page = self.paginate_queryset(templates)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(templates, many=True)
+        return Response(serializer.data)
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        # `propagate` non è un campo del model: va tolto prima del save()
+        propagate = serializer.validated_data.pop("propagate", False)
+        template = serializer.save()
+        if propagate:
+            start_onboarding_propagation(template)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        propagate = serializer.validated_data.pop("propagate", False)
+        template = serializer.save()
+        if propagate and template.is_active:
+            start_onboarding_propagation(template)
 
     def perform_destroy(self, instance):
         # Soft delete — come Employee: UPDATE SET is_active = 0
         instance.is_active = False
         instance.save()
 
+    @action(detail=True, methods=["get", "post"])
+    def propagation(self, request, pk=None):
+        """Add this template's step to every employee still in onboarding.
+
+        URL: /api/onboarding-templates/{id}/propagation/
+        - POST: start a background propagation job → 202 + job progress
+        - GET:  progress of the latest job for this template (404 if none)
+        """
+        template = self.get_object()
+
+        if request.method == "POST":
+            with transaction.atomic():
+                propagation = start_onboarding_propagation(template)
+            serializer = OnboardingPropagationSerializer(propagation)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+        propagation = template.propagations.first()
+        if propagation is None:
+            return Response({"detail": "No propagation for this template."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(OnboardingPropagationSerializer(propagation).data)
 
-class OnboardingStepViewSet(viewsets.ModelViewSet):
+
+class OnboardingStepViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     Onboarding progress for a specific employee.
 
     URL: /api/employees/{employee_pk}/onboarding/
     - GET list:     all steps for this employee (ordered by template.order)
     - POST create:  "start onboarding" — bulk creates one step per active template
+    - PATCH list:   batch update of many steps (see batch_update)
     - PATCH detail: toggle step completion (is_completed + auto-set completed_at)
 
     The create() override is the most interesting part:
@@ -133,7 +296,8 @@ class OnboardingStepViewSet(viewsets.ModelViewSet):
         # select_related("template") → fa un JOIN invece di N query separate.
         # Senza: 1 query per lista + N query per leggere ogni template.name
         # Con: 1 sola query con JOIN. Ottimizzazione critica per liste.
-        return OnboardingStep.objects.filter(employee_id=self.kwargs["employee_pk"]).select_related("template")
+        qs = OnboardingStep.objects.filter(employee_id=self.kwargs["employee_pk"]).select_related("template")
+        return scope_queryset(qs, self.request.user)
 
     def create(self, request, *args, **kwargs):
         """Start/sync onboarding: crea step mancanti dai template attivi.
@@ -142,7 +306,7 @@ class OnboardingStepViewSet(viewsets.ModelViewSet):
         Utile anche per "sincronizzare" quando si aggiungono nuovi template
         dopo la creazione del dipendente.
         """
-        employee = get_object_or_404(Employee, pk=self.kwargs["employee_pk"])
+        employee = get_object_or_404(scoped_employees(request.user), pk=self.kwargs["employee_pk"])
         create_onboarding_steps_for_employee(employee)
 
         # Ritorna la lista completa (nuovi + esistenti)
@@ -150,6 +314,36 @@ class OnboardingStepViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(steps, many=True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def batch_update(self, request, *args, **kwargs):
+        """Update many steps of the checklist in one request.
+
+        Body: [{"id": 1, "is_completed": true}, {"id": 2, "notes": "..."}]
+
+        Same completed_at rules as perform_update(), applied with one
+        set-based UPDATE in a single transaction (see
+        services.update_onboarding_steps). Returns the full updated checklist.
+        """
+        employee = get_object_or_404(scoped_employees(request.user), pk=self.kwargs["employee_pk"])
+        serializer = OnboardingStepBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Gli id devono appartenere a questo dipendente: niente update "cross-employee"
+        ids = {item["id"] for item in serializer.validated_data}
+        known_ids = set(self.get_queryset().filter(pk__in=ids).values_list("pk", flat=True))
+        unknown_ids = sorted(ids - known_ids)
+        if unknown_ids:
+            return Response(
+                {"id": [f"Step non trovati per questo dipendente: {unknown_ids}"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        update_onboarding_steps(employee, serializer.validated_data)
+        # L'UPDATE set-based non passa da save(): niente signal, invalidiamo noi (una volta)
+        invalidate_dashboard_cache()
+
+        steps = self.get_queryset()
+        return Response(self.get_serializer(steps, many=True).data)
+
     def perform_update(self, serializer):
         """Auto-manage completed_at when is_completed changes.
 
@@ -170,7 +364,85 @@ class OnboardingStepViewSet(viewsets.ModelViewSet):
             serializer.save()
 
 
-class DashboardView(APIView):
+class OnboardingBoardView(ReplicaReadMixin, generics.ListAPIView):
+    """Organisation-wide onboarding board: every active employee still in onboarding.
+
+    URL: /api/onboarding/board/
+    - Ordering: ?ordering=progress (default), -progress, hire_date, last_name, department
+    - Pagination: ?page=2 (configured globally in settings.py)
+
+    Scoped like the employee list: a manager sees only their own subtree.
+    Reads the denormalized OnboardingProgress counters: no aggregation
+    over onboarding_steps at read time, whatever the size of the company.
+
+    SQL equivalent:
+        SELECT e.*, p.steps_completed, p.steps_total,
+               p.steps_completed * 100 / p.steps_total AS progress
+        FROM onboarding_progress p JOIN employees e ON e.id = p.employee_id
+        WHERE p.steps_completed < p.steps_total AND e.is_active
+        ORDER BY progress, e.last_name;
+    """
+
+    serializer_class = OnboardingBoardSerializer
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["progress", "hire_date", "last_name", "department"]
+    ordering = ["progress", "last_name"]
+
+    def get_queryset(self):
+        qs = (
+            in_progress_onboarding()
+            .filter(employee__is_active=True)
+            .select_related("employee")
+            .annotate(
+                progress=F("steps_completed") * 100 / F("steps_total"),
+                hire_date=F("employee__hire_date"),
+                last_name=F("employee__last_name"),
+                department=F("employee__department"),
+            )
+        )
+        # Un manager vede la board del proprio team, HR quella di tutta l'azienda
+        return scope_queryset(qs, self.request.user)
+
+
+class OrgChartView(ReplicaReadMixin, APIView):
+    """Org chart: the reporting tree with direct and total report counts per node.
+
+    URL: /api/org-chart/
+    - ?root=<id>: start from this employee (default: the top of the org,
+      or the caller's own node for non-HR users)
+    - ?depth=<n>: levels below the root to include (default 2, max 10)
+
+    Nodes on the last level have `children: null` when they have reports
+    that were not loaded: expand them with ?root=<id>&depth=1.
+    The tree is one recursive CTE query; subtree sizes come from a cache
+    invalidated when reporting lines change (see employees/org_chart.py).
+    """
+
+    # Risultati in cache per tutti: ricalcolati sul primario subito dopo ogni scrittura
+    replica_after_any_write = True
+
+    def get(self, request):
+        params = OrgChartQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        root = params.validated_data.get("root")
+        depth = params.validated_data["depth"]
+
+        if root is None:
+            # Un manager parte dal proprio nodo, HR dal vertice dell'azienda
+            if not sees_everything(request.user):
+                if request.user.employee_id is None:
+                    return Response([])
+                root = request.user.employee_id
+        elif not in_scope(request.user, root):
+            raise NotFound()
+
+        tree = build_org_chart(root, depth)
+        if root is not None and not tree:
+            raise NotFound()
+        return Response(tree)
+
+
+class DashboardView(ReplicaReadMixin, APIView):
     """Aggregated HR dashboard statistics.
 
     Unlike ViewSets (CRUD on a single model), this is a read-only endpoint
@@ -183,20 +455,54 @@ class DashboardView(APIView):
         CROSS JOIN (SELECT ... FROM onboarding_steps) o;
     """
 
+    # Risultati in cache per tutti: ricalcolati sul primario subito dopo ogni scrittura
+    replica_after_any_write = True
+
     def get(self, request):
-        # 1. Cache HIT → ritorna dati pre-calcolati (0 query DB).
+        # Cache HIT → ritorna dati pre-calcolati (0 query DB).
         # Come: SELECT * FROM staging_dashboard WHERE key = 'dashboard_stats'
-        cached_data = cache.get(DASHBOARD_CACHE_KEY)
-        if cached_data is not None:
-            return Response(cached_data)
+        # two_tier_cache: prima la copia in-process (0 round trip), poi Redis.
+        # Cache MISS → build_stats() esegue le query e il risultato viene
+        # salvato con TTL — come: INSERT INTO staging_dashboard ...
+        data = two_tier_cache.get_or_set(DASHBOARD_CACHE_KEY, self.build_stats, django_settings.CACHE_DASHBOARD_TTL)
+        return Response(data)
+
+    def build_stats(self):
+        """Esegue le 5+ query di aggregazione (solo su cache MISS)."""
+        queries = self.stats_queries()
+        return self.format_stats(
+            employee_stats=Employee.all_objects.aggregate(**queries["employees"]),
+            contract_stats=Contract.objects.aggregate(**queries["contracts"]),
+            onboarding_in_progress=queries["onboarding"].count(),
+            headcount_trend=list(queries["headcount_trend"]),
+            department_distribution=list(queries["department_distribution"]),
+        )
 
-        # 2. Cache MISS → esegui le 5+ query di aggregazione.
+    async def abuild_stats(self):
+        """build_stats() con l'ORM async, per la view async (employees/async_views.py)."""
+        queries = self.stats_queries()
+        return self.format_stats(
+            employee_stats=await Employee.all_objects.aaggregate(**queries["employees"]),
+            contract_stats=await Contract.objects.aaggregate(**queries["contracts"]),
+            onboarding_in_progress=await queries["onboarding"].acount(),
+            headcount_trend=[entry async for entry in queries["headcount_trend"]],
+            department_distribution=[entry async for entry in queries["department_distribution"]],
+        )
+
+    @staticmethod
+    def stats_queries():
+        """Le query della dashboard, non ancora eseguite.
+
+        Condivise da build_stats (sync) e abuild_stats (async), che cambiano
+        solo il modo di eseguirle: espressioni per aggregate() e queryset lazy.
+        """
         today = timezone.now().date()
         first_day_of_month = today.replace(day=1)
 
         # --- Employee stats ---
         # SQL: SELECT COUNT(*) FILTER (WHERE ...) FROM employees
-        employee_stats = Employee.objects.aggregate(
+        # all_objects: servono anche gli inattivi per il contatore "inactive"
+        employee_stats = dict(
             active=Count("id", filter=Q(is_active=True)),
             inactive=Count("id", filter=Q(is_active=False)),
             new_hires=Count(
@@ -208,7 +514,7 @@ class DashboardView(APIView):
         # --- Contract stats ---
         # SQL: SELECT COUNT(*) FROM contracts
         #      WHERE end_date BETWEEN CURRENT_DATE AND CURRENT_DATE + 30
-        contract_stats = Contract.objects.aggregate(
+        contract_stats = dict(
             expiring=Count(
                 "id",
                 filter=Q(
@@ -219,17 +525,17 @@ class DashboardView(APIView):
         )
 
         # --- Onboarding stats ---
-        # SQL: SELECT COUNT(DISTINCT employee_id)
-        #      FROM onboarding_steps WHERE is_completed = FALSE
-        onboarding_in_progress = OnboardingStep.objects.filter(is_completed=False).values("employee").distinct().count()
+        # Contatori denormalizzati (trigger su onboarding_steps), niente COUNT(DISTINCT):
+        # SQL: SELECT COUNT(*) FROM onboarding_progress
+        #      WHERE steps_completed < steps_total
+        onboarding_in_progress = in_progress_onboarding()
 
         # --- Headcount trend (GROUP BY month) ---
         # SQL: SELECT DATE_TRUNC('month', hire_date) AS month, COUNT(*)
         #      FROM employees WHERE is_active = TRUE
         #      GROUP BY month ORDER BY month
         headcount_trend = (
-            Employee.objects.filter(is_active=True)
-            .annotate(month=TruncMonth("hire_date"))
+            Employee.objects.annotate(month=TruncMonth("hire_date"))
             .values("month")
             .annotate(count=Count("id"))
             .order_by("month")
@@ -240,14 +546,20 @@ class DashboardView(APIView):
         #      FROM employees WHERE is_active = TRUE AND department != ''
         #      GROUP BY department ORDER BY count DESC
         department_distribution = (
-            Employee.objects.filter(is_active=True)
-            .exclude(department="")
-            .values("department")
-            .annotate(count=Count("id"))
-            .order_by("-count")
+            Employee.objects.exclude(department="").values("department").annotate(count=Count("id")).order_by("-count")
         )
 
-        data = {
+        return {
+            "employees": employee_stats,
+            "contracts": contract_stats,
+            "onboarding": onboarding_in_progress,
+            "headcount_trend": headcount_trend,
+            "department_distribution": department_distribution,
+        }
+
+    @staticmethod
+    def format_stats(employee_stats, contract_stats, onboarding_in_progress, headcount_trend, department_distribution):
+        return {
             "employees": employee_stats,
             "contracts": contract_stats,
             "onboarding": {"in_progress": onboarding_in_progress},
@@ -259,11 +571,6 @@ class DashboardView(APIView):
                     }
                     for entry in headcount_trend
                 ],
-                "department_distribution": list(department_distribution),
+                "department_distribution": department_distribution,
             },
         }
-
-        # 3. Salva in cache con TTL — come: INSERT INTO staging_dashboard ...
-        cache.set(DASHBOARD_CACHE_KEY, data, django_settings.CACHE_DASHBOARD_TTL)
-
-        return Response(data)
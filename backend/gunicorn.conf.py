@@ -0,0 +1,114 @@
+"""Configurazione gunicorn per la produzione (letta da `gunicorn` nella cartella backend/).
+
+Uso:
+    gunicorn                                  # WSGI, worker gthread
+    ASYNC_READ_VIEWS=True gunicorn            # ASGI, worker uvicorn
+
+Avvio:
+1. il master importa Django e l'URLconf una volta sola (preload_app);
+2. when_ready: warm_up() riempie le cache pigre di URLconf, model e
+   serializer (minijet/warmup.py), poi gc.freeze() sposta tutti gli
+   oggetti creati finora nella generazione permanente del GC;
+3. ogni worker nasce con fork(): eredita l'app già pronta, senza import
+   né warm-up, e accetta traffico in pochi millisecondi; post_fork avvia
+   il listener pub/sub della cache a due livelli (minijet/cache.py).
+
+Perché gc.freeze(): dopo il fork le pagine di memoria sono condivise
+finché nessuno le scrive (copy-on-write). Il GC però scrive nell'header di
+ogni oggetto che visita: una collezione nel worker copierebbe pagina per
+pagina tutta l'app importata. Gli oggetti congelati non vengono più
+visitati e restano condivisi. Come consigliato dalla documentazione di
+gc.freeze(), il GC resta spento nel master dall'avvio al fork (niente
+buchi nelle pagine) e viene riacceso in ogni worker (post_fork).
+
+Restart senza perdere request:
+- max_requests (+ jitter): ogni worker viene sostituito dopo N request,
+  non tutti insieme; limita la crescita della memoria nel tempo;
+- graceful_timeout: su SIGTERM/SIGHUP il worker finisce le request in
+  corso prima di uscire;
+- con preload_app SIGHUP ricrea i worker ma non ricarica il codice (è già
+  nel master): per un deploy si riavvia il container, o si usa SIGUSR2
+  (nuovo master con il nuovo codice) seguito da SIGTERM al vecchio master.
+
+Tutte le opzioni si possono sovrascrivere da variabili d'ambiente
+(GUNICORN_*) o da riga di comando.
+
+SQL analogy: come un'istanza che carica il buffer pool una volta e poi
+apre N sessioni che lo condividono, invece di N istanze con la propria
+copia dei dati.
+"""
+
+import gc
+import multiprocessing
+from pathlib import Path
+
+import environ
+
+# Stesse fonti dei settings Django: variabili d'ambiente, poi backend/.env
+env = environ.Env()
+env_file = Path(__file__).resolve().parent / ".env"
+if env_file.exists():
+    env.read_env(env_file)
+
+# GC spento dal caricamento della config fino al fork (riacceso in post_fork)
+gc.disable()
+
+bind = env("GUNICORN_BIND", default="0.0.0.0:8000")
+# 2 × core + 1: un worker lavora mentre un altro aspetta il database
+workers = env.int("GUNICORN_WORKERS", default=multiprocessing.cpu_count() * 2 + 1)
+
+# ASYNC_READ_VIEWS=True: ASGI con worker uvicorn (employees/async_views.py
+# sull'event loop). Altrimenti WSGI con thread: una request per thread.
+if env.bool("ASYNC_READ_VIEWS", default=False):
+    wsgi_app = "minijet.asgi:application"
+    worker_class = env("GUNICORN_WORKER_CLASS", default="uvicorn_worker.UvicornWorker")
+else:
+    wsgi_app = "minijet.wsgi:application"
+    worker_class = env("GUNICORN_WORKER_CLASS", default="gthread")
+    threads = env.int("GUNICORN_THREADS", default=4)
+
+preload_app = True
+max_requests = env.int("GUNICORN_MAX_REQUESTS", default=1000)
+max_requests_jitter = env.int("GUNICORN_MAX_REQUESTS_JITTER", default=100)
+timeout = env.int("GUNICORN_TIMEOUT", default=30)
+graceful_timeout = env.int("GUNICORN_GRACEFUL_TIMEOUT", default=30)
+keepalive = env.int("GUNICORN_KEEPALIVE", default=5)
+# Heartbeat dei worker in RAM: su overlayfs (Docker) un file su disco può bloccare il worker
+worker_tmp_dir = env("GUNICORN_WORKER_TMP_DIR", default="/dev/shm" if Path("/dev/shm").is_dir() else None)
+
+# GUNICORN_ACCESS_LOG= (vuota) disattiva il log di accesso, es. durante un load test
+accesslog = env("GUNICORN_ACCESS_LOG", default="-") or None
+errorlog = "-"
+
+
+def when_ready(server):
+    """Master, app già importata (preload_app), prima del fork dei worker."""
+    from django.db import connections
+
+    from minijet.warmup import warm_up
+
+    stats = warm_up()
+    # Un socket aperto nel master verrebbe condiviso da tutti i worker.
+    # close_all() restituisce le connessioni al pool psycopg, che però
+    # sopravvive al fork: va chiuso a parte, repliche comprese.
+    connections.close_all()
+    for alias in connections:
+        if connections[alias].settings_dict["OPTIONS"].get("pool"):
+            connections[alias].close_pool()
+    gc.freeze()
+    server.log.info(
+        "Warm-up: %s views, %s serializers in %s ms; %s objects frozen",
+        stats["views"],
+        stats["serializers"],
+        stats["ms"],
+        gc.get_freeze_count(),
+    )
+
+
+def post_fork(server, worker):
+    from minijet.cache import two_tier_cache
+
+    gc.enable()
+    # Listener pub/sub del worker avviato ora, non alla prima request
+    # (sulle view async bloccherebbe l'event loop durante il connect)
+    two_tier_cache.start_listener()
@@ -1,5 +1,16 @@
-# Import Celery app so it's loaded when Django starts.
-# This ensures shared_task decorators use the correct app instance.
-from .celery import app as celery_app
+# L'app Celery NON viene importata all'avvio di Django: manage.py, test e
+# processi web non pagano l'import di Celery finché non pubblicano un task.
+# La caricano i moduli che la usano: employees/tasks.py (@app.task) e
+# outbox/services.py (pubblicazione). `celery -A minijet` la trova in
+# minijet.celery; `minijet.celery_app` resta disponibile, caricata al primo accesso.
+
+
+def __getattr__(name):
+    if name == "celery_app":
+        from .celery import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ("celery_app",)
@@ -0,0 +1,176 @@
+"""POST /api/batch/: più chiamate API in un solo round trip HTTP.
+
+Le pagine del frontend che mostrano un dipendente insieme ai suoi contratti
+o ai suoi step di onboarding lanciano più request in parallelo: ognuna paga
+rete, middleware, verifica del JWT e connessione al database. Qui le
+sotto-request (GET e PATCH) viaggiano insieme:
+
+    POST /api/batch/
+    {"requests": [
+        {"method": "GET", "path": "/api/employees/7/"},
+        {"method": "PATCH", "path": "/api/employees/7/", "body": {"role": "manager"}}
+     ],
+     "atomic": true}
+
+    → {"responses": [{"status": 200, "body": {...}}, ...], "rolled_back": false}
+
+Ogni sotto-request passa dalla view DRF di sempre (stessi permessi, scope,
+validazione, stesse risposte), ma senza middleware né autenticazione: il
+JWT è verificato una volta sola per il batch, e l'utente arriva alle view
+già autenticato (ForcedAuthentication di DRF).
+
+Transazione: un batch con delle PATCH e `atomic` (il default) gira in una
+sola transazione. Alla prima sotto-request che fallisce (status >= 400)
+si annulla tutto: le successive non vengono eseguite (424) e la risposta
+ha `rolled_back: true`. Un batch con scritture legge tutto dal primario,
+così una GET dopo una PATCH vede il dato appena scritto. Un batch di sole
+GET non apre transazioni e usa le repliche come le singole request.
+
+SQL analogy: come mandare più statement in un solo batch (GO) invece di
+un round trip per statement, con BEGIN TRAN / ROLLBACK attorno se serve.
+"""
+
+import io
+import json
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from drf_spectacular.utils import extend_schema
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .replicas import use_database
+
+# Header della request esterna che non devono arrivare alle sotto-request:
+# corpo, autenticazione (già fatta) e richieste condizionali
+DROPPED_META = {
+    "CONTENT_LENGTH",
+    "CONTENT_TYPE",
+    "HTTP_AUTHORIZATION",
+    "HTTP_IF_MATCH",
+    "HTTP_IF_NONE_MATCH",
+    "HTTP_IF_MODIFIED_SINCE",
+    "HTTP_ACCEPT_ENCODING",
+}
+
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET", "PATCH"])
+    path = serializers.RegexField(r"^/api/", help_text="Absolute API path, query string included.")
+    body = serializers.JSONField(required=False)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = serializers.ListField(child=BatchSubRequestSerializer(), min_length=1)
+    atomic = serializers.BooleanField(default=True)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f"At most {settings.BATCH_MAX_REQUESTS} requests per batch.")
+        return value
+
+
+class BatchSubResponseSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    responses = BatchSubResponseSerializer(many=True)
+    rolled_back = serializers.BooleanField()
+
+
+class BatchView(APIView):
+    """Runs several GET/PATCH API calls in one HTTP round trip.
+
+    The caller is authenticated once for the whole batch. Each sub-request
+    gets the status and body its own call would have returned. A batch with
+    PATCH requests runs in one transaction unless `atomic` is false: the
+    first failure rolls everything back and the remaining requests get 424.
+    """
+
+    @extend_schema(request=BatchRequestSerializer, responses=BatchResponseSerializer)
+    def post(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sub_requests = serializer.validated_data["requests"]
+        writes = any(sub["method"] != "GET" for sub in sub_requests)
+
+        if not writes:
+            # Niente da inchiodare al primario (ReadYourWritesMiddleware): è una lettura
+            request._request.read_only = True
+            responses = [self.run(request, sub) for sub in sub_requests]
+            return Response({"responses": responses, "rolled_back": False})
+
+        with use_database("default"):
+            if not serializer.validated_data["atomic"]:
+                responses = [self.run(request, sub) for sub in sub_requests]
+                return Response({"responses": responses, "rolled_back": False})
+
+            responses, rolled_back = [], False
+            with transaction.atomic():
+                for sub in sub_requests:
+                    responses.append(self.run(request, sub))
+                    if responses[-1]["status"] >= 400:
+                        # BEGIN TRAN ... ROLLBACK: anche le PATCH già riuscite
+                        transaction.set_rollback(True)
+                        rolled_back = True
+                        break
+            skipped = {
+                "status": status.HTTP_424_FAILED_DEPENDENCY,
+                "body": {"detail": "Not executed: an earlier request in the batch failed."},
+            }
+            responses += [skipped] * (len(sub_requests) - len(responses))
+            return Response({"responses": responses, "rolled_back": rolled_back})
+
+    def run(self, request, sub):
+        """Esegue una sotto-request con la view dell'URLconf; ritorna {status, body}."""
+        url = urlsplit(sub["path"])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {"status": status.HTTP_404_NOT_FOUND, "body": {"detail": "Not found."}}
+        view = match.func
+        if getattr(view, "cls", None) is type(self):
+            return {"status": status.HTTP_400_BAD_REQUEST, "body": {"detail": "Batches cannot be nested."}}
+        if iscoroutinefunction(view):
+            # ASYNC_READ_VIEWS: la view DRF sync avvolta da employees/async_views.py
+            view = view.__wrapped__
+
+        response = view(self.sub_request(request, sub, url), *match.args, **match.kwargs)
+        if hasattr(response, "data"):
+            # I dati della Response DRF: il JSON lo produce una volta sola la risposta del batch
+            body = response.data
+        elif response.get("Content-Type", "").startswith("application/json") and response.content:
+            body = json.loads(response.content)
+        else:
+            body = response.content.decode(errors="replace") or None
+        return {"status": response.status_code, "body": body}
+
+    @staticmethod
+    def sub_request(request, sub, url):
+        """HttpRequest per la sotto-request, con l'utente del batch già autenticato."""
+        payload = json.dumps(sub["body"]).encode() if "body" in sub else b""
+        environ = {key: value for key, value in request.META.items() if key not in DROPPED_META}
+        environ.update(
+            {
+                "REQUEST_METHOD": sub["method"],
+                "PATH_INFO": url.path,
+                "QUERY_STRING": url.query,
+                "CONTENT_TYPE": "application/json",
+                "CONTENT_LENGTH": str(len(payload)),
+                "HTTP_ACCEPT": "application/json",
+                "wsgi.input": io.BytesIO(payload),
+                "wsgi.url_scheme": request.scheme,
+            }
+        )
+        sub_request = WSGIRequest(environ)
+        # Letti da rest_framework.request.Request: niente seconda verifica del JWT
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+        return sub_request
@@ -0,0 +1,348 @@
+"""Cache a due livelli: LRU in-process davanti alla cache Django (Redis).
+
+Il dashboard viene interrogato di continuo dal frontend, ma i dati cambiano
+raramente. Con la sola RedisCache ogni worker gunicorn fa comunque un
+round trip di rete per ogni GET. Questo modulo aggiunge un livello L1
+locale al processo:
+
+    L1: OrderedDict LRU nel processo (nessuna rete, ~microsecondi)
+    L2: cache Django di default (Redis in produzione, LocMem nei test)
+
+Chiavi versionate: ogni chiave logica ("dashboard_stats") ha un contatore
+di versione salvato in L2 ("dashboard_stats:version"). Il valore vive
+sotto "dashboard_stats:v<N>". Invalidare = incrementare la versione:
+i vecchi valori non vengono mai più letti e scadono da soli col TTL.
+
+Invalidazione cross-process: dopo l'incremento viene pubblicato un
+messaggio Redis pub/sub; ogni processo ha un thread listener che scarta
+la propria copia L1 in pochi millisecondi. Se il pub/sub non è disponibile
+(LocMem, Redis giù) resta il TTL locale come rete di sicurezza.
+
+SQL analogy:
+    L2 = staging table condivisa, L1 = temp table di sessione,
+    versione = rowversion della staging table, pub/sub = Service Broker
+    che avvisa tutte le sessioni di svuotare la temp table.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .middleware import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Attesa tra due tentativi di avviare il listener pub/sub (secondi, raddoppia)
+LISTENER_RETRY_MIN = 1
+LISTENER_RETRY_MAX = 60
+# Timeout di connessione a Redis (secondi): un host irraggiungibile non blocca il worker
+REDIS_CONNECT_TIMEOUT = 2
+
+# Sentinel per distinguere "chiave assente" da un valore cachato None
+_MISSING = object()
+
+
+class TwoTierCache:
+    """LRU per-processo limitato davanti alla cache Django, con chiavi versionate.
+
+    Le impostazioni (CACHE_LOCAL_MAX_ENTRIES, CACHE_LOCAL_TTL,
+    CACHE_INVALIDATION_CHANNEL) sono lette a ogni uso, così i test
+    possono sovrascriverle con il fixture `settings`.
+    """
+
+    def __init__(self):
+        self._local = OrderedDict()  # key -> (version, value, expires_at)
+        # Versione minima accettabile per chiave, aggiornata dal pub/sub.
+        # Evita che un processo rimetta in L1 un valore calcolato con una
+        # versione già invalidata da un altro processo (race get/invalidate).
+        self._min_version = {}
+        self._lock = threading.Lock()
+        self._listener_lock = threading.Lock()
+        self._listener_pid = None  # PID in cui il listener è attivo
+        self._listener_thread = None
+        self._process_pid = None
+        self._listener_retry_at = 0.0
+        self._listener_backoff = 0.0
+        self._client = None
+
+    # --- Configurazione ---------------------------------------------------
+
+    @property
+    def max_entries(self):
+        return settings.CACHE_LOCAL_MAX_ENTRIES
+
+    @property
+    def local_ttl(self):
+        return settings.CACHE_LOCAL_TTL
+
+    @property
+    def channel(self):
+        return settings.CACHE_INVALIDATION_CHANNEL
+
+    @staticmethod
+    def _version_key(key):
+        return f"{key}:version"
+
+    @staticmethod
+    def _value_key(key, version):
+        return f"{key}:v{version}"
+
+    # --- API pubblica -----------------------------------------------------
+
+    def get(self, key, default=None):
+        """Legge da L1, poi da L2. Ritorna `default` in caso di MISS."""
+        self._ensure_listener()
+
+        value = self._get_local(key)
+        if value is not _MISSING:
+            record_cache_lookup(key, "l1")
+            return value
+
+        version = self._current_version(key)
+        value = cache.get(self._value_key(key, version), _MISSING)
+        if value is _MISSING:
+            record_cache_lookup(key, "miss")
+            return default
+
+        record_cache_lookup(key, "l2")
+        self._set_local(key, version, value, self.local_ttl)
+        return value
+
+    def set(self, key, value, timeout):
+        """Salva in L2 sotto la versione corrente e in L1 con TTL locale."""
+        self._ensure_listener()
+        self._store(key, self._current_version(key), value, timeout)
+
+    def get_or_set(self, key, default, timeout):
+        """Ritorna il valore cachato o lo calcola con `default()` e lo salva.
+
+        Preferibile a get() + set(): il valore calcolato viene salvato sotto
+        la versione letta PRIMA del calcolo. Se nel frattempo un altro
+        processo invalida la chiave, il risultato finisce sotto la versione
+        vecchia e non verrà mai servito (nessun dato stale sotto la nuova).
+        """
+        self._ensure_listener()
+
+        value = self._get_local(key)
+        if value is not _MISSING:
+            record_cache_lookup(key, "l1")
+            return value
+
+        version = self._current_version(key)
+        value = cache.get(self._value_key(key, version), _MISSING)
+        if value is not _MISSING:
+            record_cache_lookup(key, "l2")
+            self._set_local(key, version, value, self.local_ttl)
+            return value
+
+        record_cache_lookup(key, "miss")
+        value = default()
+        self._store(key, version, value, timeout)
+        return value
+
+    async def aget_or_set(self, key, default, timeout):
+        """get_or_set() per le view async: `default` è una coroutine function.
+
+        L1 non fa I/O e risponde senza await; L2 passa dalle API async
+        della cache Django (aget/aset). Stessa regola sulla versione di
+        get_or_set: il valore calcolato va sotto la versione letta prima.
+        Il listener di norma è già attivo (start_listener() in post_fork);
+        altrimenti connect e subscribe girano in un thread, mai sull'event loop.
+        """
+        if self._listener_pid != os.getpid():
+            await sync_to_async(self._ensure_listener, thread_sensitive=False)()
+
+        value = self._get_local(key)
+        if value is not _MISSING:
+            record_cache_lookup(key, "l1")
+            return value
+
+        version = await cache.aget(self._version_key(key), 1)
+        value = await cache.aget(self._value_key(key, version), _MISSING)
+        if value is not _MISSING:
+            record_cache_lookup(key, "l2")
+            self._set_local(key, version, value, self.local_ttl)
+            return value
+
+        record_cache_lookup(key, "miss")
+        value = await default()
+        await cache.aset(self._value_key(key, version), value, timeout)
+        self._set_local(key, version, value, self._local_ttl_for(timeout))
+        return value
+
+    def invalidate(self, key):
+        """Incrementa la versione della chiave e avvisa gli altri processi.
+
+        Equivale a: UPDATE staging SET rowversion = rowversion + 1
+        seguito da un NOTIFY a tutte le sessioni aperte.
+        """
+        self._ensure_listener()
+
+        version_key = self._version_key(key)
+        # add() è atomico: crea la chiave solo se assente (come INSERT ... ON CONFLICT DO NOTHING).
+        # timeout=None: la versione non deve mai scadere, altrimenti tornerebbe a 1.
+        cache.add(version_key, 1, timeout=None)
+        new_version = cache.incr(version_key)
+
+        self._discard_local(key, new_version)
+        self._publish(key, new_version)
+
+    def start_listener(self):
+        """Avvia subito il listener del processo corrente (gunicorn post_fork).
+
+        Così la prima request non paga connect e subscribe a Redis.
+        """
+        self._ensure_listener()
+
+    def clear_local(self):
+        """Svuota solo L1 (usato nei test e dopo una perdita del pub/sub)."""
+        with self._lock:
+            self._local.clear()
+            self._min_version.clear()
+
+    def _store(self, key, version, value, timeout):
+        cache.set(self._value_key(key, version), value, timeout)
+        self._set_local(key, version, value, self._local_ttl_for(timeout))
+
+    def _local_ttl_for(self, timeout):
+        return self.local_ttl if timeout is None else min(timeout, self.local_ttl)
+
+    # --- L1 (LRU in-process) ----------------------------------------------
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            _version, value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._local[key]
+                return _MISSING
+            # LRU: la chiave letta diventa la più recente
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key, version, value, ttl):
+        with self._lock:
+            if version < self._min_version.get(key, 0):
+                return
+            self._local[key] = (version, value, time.monotonic() + ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _discard_local(self, key, version):
+        with self._lock:
+            self._min_version[key] = max(version, self._min_version.get(key, 0))
+            entry = self._local.get(key)
+            if entry is not None and entry[0] < version:
+                del self._local[key]
+
+    # --- L2 (cache Django) ------------------------------------------------
+
+    def _current_version(self, key):
+        return cache.get(self._version_key(key), 1)
+
+    # --- Pub/sub ----------------------------------------------------------
+
+    def _redis_client(self):
+        """Client Redis della cache di default, o None se il backend non è Redis."""
+        config = settings.CACHES["default"]
+        if not config["BACKEND"].endswith("RedisCache"):
+            return None
+
+        if self._client is None:
+            import redis
+
+            location = config["LOCATION"]
+            if isinstance(location, (list, tuple)):
+                location = location[0]
+            self._client = redis.Redis.from_url(location, socket_connect_timeout=REDIS_CONNECT_TIMEOUT)
+        return self._client
+
+    def _publish(self, key, version):
+        try:
+            client = self._redis_client()
+            if client is not None:
+                client.publish(self.channel, f"{key}|{version}")
+        except Exception as exc:
+            # L'invalidazione locale e la versione in L2 sono già applicate:
+            # gli altri processi vedranno il dato nuovo al più tardi dopo CACHE_LOCAL_TTL.
+            logger.warning("Cache invalidation publish failed for %s: %s", key, exc)
+
+    def _on_message(self, message):
+        key, _, version = message["data"].decode().rpartition("|")
+        self._discard_local(key, int(version))
+
+    def _on_listener_error(self, exc, pubsub, thread):
+        # Durante la disconnessione potremmo aver perso messaggi:
+        # svuotiamo L1 per non servire dati invalidati nel frattempo.
+        logger.warning("Cache invalidation listener error: %s", exc)
+        self.clear_local()
+        time.sleep(1)
+
+    def _ensure_listener(self):
+        """Avvia (una volta per processo) il thread che ascolta le invalidazioni.
+
+        Il controllo sul PID gestisce il fork dei worker gunicorn: i thread
+        non sopravvivono al fork, quindi ogni figlio avvia il proprio listener.
+        Se Redis non risponde il processo non resta senza listener per
+        sempre: si riprova alle chiamate successive, con un intervallo che
+        raddoppia fino a LISTENER_RETRY_MAX secondi.
+        """
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        # Un solo thread tenta l'avvio; gli altri proseguono senza aspettare Redis
+        if not self._listener_lock.acquire(blocking=False):
+            return
+        try:
+            if self._listener_pid == pid:
+                return
+            if self._process_pid != pid:
+                self._process_pid = pid
+                self._listener_retry_at = 0.0
+                self._listener_backoff = 0.0
+                # Dopo un fork L1 e il pool di connessioni sono copie di quelli
+                # del padre: ripartiamo da zero.
+                with self._lock:
+                    self._local.clear()
+                    self._min_version.clear()
+                self._client = None
+            if time.monotonic() < self._listener_retry_at:
+                return
+            self._start_listener(pid)
+        finally:
+            self._listener_lock.release()
+
+    def _start_listener(self, pid):
+        try:
+            client = self._redis_client()
+            if client is not None:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: self._on_message})
+                self._listener_thread = pubsub.run_in_thread(
+                    sleep_time=1.0,
+                    daemon=True,
+                    exception_handler=self._on_listener_error,
+                )
+        except Exception as exc:
+            self._listener_backoff = min(max(self._listener_backoff * 2, LISTENER_RETRY_MIN), LISTENER_RETRY_MAX)
+            self._listener_retry_at = time.monotonic() + self._listener_backoff
+            logger.warning("Cache invalidation listener not started, retrying in %ss: %s", self._listener_backoff, exc)
+            return
+
+        if self._listener_backoff:
+            # Le invalidazioni pubblicate mentre Redis era giù sono perse
+            self.clear_local()
+        self._listener_pid = pid
+
+
+# Istanza unica per processo, come `django.core.cache.cache`.
+two_tier_cache = TwoTierCache()
@@ -6,8 +6,9 @@ Tre componenti:
     2. Broker (Redis): coda messaggi (come Service Broker queue)
     3. Worker (celery worker): processo separato che esegue i task
 
-Questo modulo configura il componente Producer e viene importato
-all'avvio di Django tramite minijet/__init__.py.
+Questo modulo configura il componente Producer. Non viene importato
+all'avvio di Django: lo caricano employees/tasks.py (@app.task) e
+outbox/services.py quando pubblica, oppure `celery -A minijet`.
 """
 
 import os
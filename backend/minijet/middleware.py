@@ -0,0 +1,194 @@
+"""Strumentazione per request: dove va il tempo di ogni API call.
+
+ServerTimingMiddleware misura, per ogni request:
+- db: numero di query SQL e tempo totale passato nel database
+- cache: hit (L1/L2) e miss di two_tier_cache, per chiave (es. dashboard_stats)
+- view: tempo della view (query + serializer.data + logica)
+- render: serializzazione della Response in JSON (JSONRenderer)
+- total: tutto, middleware successivi inclusi
+
+e li espone in due modi:
+- header `Server-Timing`, visibile nel pannello Network dei DevTools
+- un record di log "minijet.performance" con gli stessi valori come campi
+
+Segnala anche i probabili N+1: la stessa query (stessa forma SQL, parametri
+esclusi) eseguita molte volte nella stessa request, tipicamente un
+attributo di una FK letto in un ciclo senza select_related.
+
+Disattivato (SERVER_TIMING_ENABLED=False, il default) il middleware si
+toglie dalla catena al boot con MiddlewareNotUsed: costo zero per request.
+Attivo, costa un execute_wrapper per query e un ContextVar.get() per
+lettura di cache.
+
+SQL analogy: come SET STATISTICS TIME, IO ON per ogni request, con il
+riepilogo restituito al client invece che nella tab Messages.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger("minijet.performance")
+
+# Metriche della request in corso (None fuori da una request strumentata)
+current_metrics = ContextVar("current_metrics", default=None)
+
+# IN (%s, %s, %s) → IN (%s...): liste di lunghezza diversa sono la stessa forma
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+# Caratteri ammessi nel nome di una metrica Server-Timing (token HTTP)
+_NOT_TOKEN = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def record_cache_lookup(key, outcome):
+    """Registra una lettura di cache: outcome è "l1", "l2" o "miss".
+
+    Chiamata da two_tier_cache: senza request strumentata è un solo ContextVar.get().
+    """
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.cache[(key, outcome)] += 1
+
+
+class RequestMetrics:
+    """Counters collected during one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.query_shapes = Counter()
+        self.cache = Counter()  # (key, outcome) -> letture
+        self.view_started = None
+        self.render_started = None
+        self.render_finished = None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """execute_wrapper di Django: cronometra ogni query e ne ricorda la forma."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_queries += 1
+            self.query_shapes[_IN_LIST.sub("(%s...)", sql)] += 1
+
+    def repeated_queries(self, threshold):
+        """Forme SQL eseguite almeno `threshold` volte: probabili N+1."""
+        return [(shape, count) for shape, count in self.query_shapes.most_common() if count >= threshold]
+
+    @property
+    def cache_hits(self):
+        return sum(count for (_key, outcome), count in self.cache.items() if outcome != "miss")
+
+    @property
+    def cache_misses(self):
+        return sum(count for (_key, outcome), count in self.cache.items() if outcome == "miss")
+
+    def durations(self, finished):
+        """Durate in millisecondi (None per le fasi che la request non ha attraversato)."""
+
+        def ms(start, end):
+            return None if start is None or end is None else (end - start) * 1000
+
+        view_end = self.render_started or finished
+        return {
+            "total": ms(self.started, finished),
+            "db": self.db_time * 1000,
+            "view": ms(self.view_started, view_end),
+            "render": ms(self.render_started, self.render_finished),
+        }
+
+
+class ServerTimingMiddleware:
+    """Adds a Server-Timing header and a performance log record to every response.
+
+    Place it first in MIDDLEWARE so that `total` covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.n_plus_one_threshold = settings.SERVER_TIMING_N_PLUS_ONE_THRESHOLD
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+
+        finished = time.perf_counter()
+        durations = metrics.durations(finished)
+        repeated = metrics.repeated_queries(self.n_plus_one_threshold)
+        response["Server-Timing"] = self.header(metrics, durations, repeated)
+        self.log(request, response, metrics, durations, repeated)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Le Response DRF sono renderizzate dopo la view, dentro la catena dei
+        # middleware: il callback post-render chiude il cronometro del render.
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self._render_finished(metrics))
+        return response
+
+    @staticmethod
+    def _render_finished(metrics):
+        metrics.render_finished = time.perf_counter()
+
+    @staticmethod
+    def header(metrics, durations, repeated):
+        entries = [
+            f'db;dur={durations["db"]:.1f};desc="{metrics.db_queries} queries"',
+            f'cache;desc="{metrics.cache_hits} hits {metrics.cache_misses} misses"',
+        ]
+        for (key, outcome), count in sorted(metrics.cache.items()):
+            entries.append(f'cache-{_NOT_TOKEN.sub("-", key)};desc="{outcome} x{count}"')
+        for name in ("view", "render"):
+            if durations[name] is not None:
+                entries.append(f"{name};dur={durations[name]:.1f}")
+        if repeated:
+            entries.append(f'n-plus-one;desc="{len(repeated)} repeated queries up to x{repeated[0][1]}"')
+        entries.append(f'total;dur={durations["total"]:.1f}')
+        return ", ".join(entries)
+
+    @staticmethod
+    def log(request, response, metrics, durations, repeated):
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(durations["total"], 1),
+            "db_queries": metrics.db_queries,
+            "db_ms": round(durations["db"], 1),
+            "view_ms": None if durations["view"] is None else round(durations["view"], 1),
+            "render_ms": None if durations["render"] is None else round(durations["render"], 1),
+            "cache_hits": metrics.cache_hits,
+            "cache_misses": metrics.cache_misses,
+            "cache": {f"{key}:{outcome}": count for (key, outcome), count in metrics.cache.items()},
+            "repeated_queries": [{"sql": shape, "count": count} for shape, count in repeated],
+        }
+        message = "%(method)s %(path)s status=%(status)s total_ms=%(total_ms)s db_queries=%(db_queries)s db_ms=%(db_ms)s"
+        if repeated:
+            # Il SQL completo è nel campo `repeated_queries`, nel messaggio basta il conteggio
+            logger.warning(message + " repeated_queries=%(count)s", {**fields, "count": len(repeated)}, extra=fields)
+        else:
+            logger.info(message, fields, extra=fields)
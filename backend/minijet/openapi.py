@@ -0,0 +1,126 @@
+"""Schema OpenAPI precalcolato, servito dalla memoria.
+
+SpectacularAPIView ricostruisce lo schema a ogni request: introspezione di
+tutte le view e di tutti i serializer, centinaia di millisecondi per una
+risposta che cambia solo quando cambia il codice. Qui lo schema si
+costruisce una volta per processo (load_schema), in entrambi i formati
+(YAML e JSON) e già compresso con gzip:
+
+- con OPENAPI_SCHEMA_FROM_FILE (default in produzione) si legge il file
+  committato backend/openapi.yaml, generato al build con
+  `python manage.py spectacular --file openapi.yaml`; un test fallisce
+  se il file non corrisponde più al codice;
+- altrimenti (sviluppo, DEBUG) si genera all'avvio: runserver riavvia il
+  processo a ogni modifica, quindi lo schema segue il codice.
+
+Sotto gunicorn warm_up() lo carica nel master prima del fork: i worker lo
+ereditano già pronto.
+
+Ogni rappresentazione ha un ETag forte (hash del contenuto, quindi della
+versione del codice): i client che ce l'hanno già ricevono 304 senza
+corpo. Le request con ?lang= o ?version= vanno alla view originale.
+
+SQL analogy: come una vista indicizzata invece di una vista normale: il
+risultato è materializzato una volta e letto così com'è, finché non
+cambia la definizione.
+"""
+
+import functools
+import gzip
+import hashlib
+import inspect
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+logger = logging.getLogger(__name__)
+
+
+def etag(content):
+    """ETag forte: hash del contenuto, uguale in tutti i processi."""
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+@dataclass(frozen=True)
+class SchemaRepresentation:
+    """One serialized form of the schema (YAML or JSON), plain and gzipped."""
+
+    content: bytes
+    gzipped: bytes
+    etag: str
+    gzipped_etag: str
+
+    @classmethod
+    def from_content(cls, content):
+        # mtime=0: stesso gzip (e stesso ETag) a ogni avvio e in ogni worker
+        gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+        return cls(content=content, gzipped=gzipped, etag=etag(content), gzipped_etag=etag(gzipped))
+
+
+def generate_schema():
+    """Lo schema in YAML, identico all'output di `manage.py spectacular`."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+@functools.cache
+def load_schema():
+    """Le rappresentazioni dello schema per formato ("yaml", "json"), una volta per processo."""
+    schema_file = Path(settings.OPENAPI_SCHEMA_FILE)
+    if settings.OPENAPI_SCHEMA_FROM_FILE and schema_file.exists():
+        source = schema_file.read_bytes()
+    else:
+        if settings.OPENAPI_SCHEMA_FROM_FILE:
+            logger.warning("%s not found: generating the OpenAPI schema at startup", schema_file)
+        source = generate_schema()
+    data = yaml.safe_load(source)
+    return {
+        OpenApiYamlRenderer.format: SchemaRepresentation.from_content(source),
+        OpenApiJsonRenderer.format: SchemaRepresentation.from_content(OpenApiJsonRenderer().render(data)),
+    }
+
+
+class PrecomputedSchemaView(SpectacularAPIView):
+    """SpectacularAPIView serving the schema built once per process, with ETag and gzip."""
+
+    # Nello schema resta la descrizione della view di drf-spectacular
+    @extend_schema(**SCHEMA_KWARGS, description=inspect.cleandoc(SpectacularAPIView.__doc__))
+    def get(self, request, *args, **kwargs):
+        # Traduzioni e versioni diverse dello schema: generazione al volo
+        if request.GET.get("lang") or request.GET.get("version"):
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        representation = load_schema()[renderer.format]
+        if re_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+            content, tag, encoding = representation.gzipped, representation.gzipped_etag, "gzip"
+        else:
+            content, tag, encoding = representation.content, representation.etag, None
+
+        if tag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            response = HttpResponseNotModified()
+        else:
+            content_type = request.accepted_media_type
+            if renderer.charset:
+                content_type = f"{content_type}; charset={renderer.charset}"
+            response = HttpResponse(content, content_type=content_type)
+            response["Content-Disposition"] = f'inline; filename="{self._get_filename(request, None)}"'
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["ETag"] = tag
+        # Sempre rivalidato: con l'ETag la risposta a un client aggiornato è un 304 vuoto
+        response["Cache-Control"] = "no-cache"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
@@ -0,0 +1,163 @@
+"""Letture pesanti sulle repliche PostgreSQL, scritture sempre sul primario.
+
+Dashboard, liste e dettagli competono con le scritture sul primario. Con
+DB_REPLICA_HOSTS configurato (minijet/settings.py) ogni replica diventa un
+alias di DATABASES ("replica1", "replica2", ...) e ReadReplicaRouter
+manda sulle repliche solo le letture che qualcuno ha dichiarato sicure:
+
+- le view con ReplicaReadMixin (employees/views.py) nelle azioni di sola
+  lettura (list, retrieve, GET delle APIView), sync e async;
+- i job di report, dentro `with read_from_replica():`.
+
+Tutto il resto — scritture, transazioni, letture non dichiarate, task
+Celery — resta sul primario: una lettura finisce su una replica solo se
+qualcuno ha accettato che possa essere indietro di qualche istante.
+
+Read-your-writes: la replica applica le scritture con un ritardo (di solito
+millisecondi, secondi sotto carico). Dopo una request di scrittura andata a
+buon fine ReadYourWritesMiddleware "inchioda" l'utente al primario per
+REPLICA_STICKY_SECONDS: chi ha appena salvato un dipendente lo ritrova
+nella lista. Il marcatore vive nella cache condivisa (Redis), quindi vale
+per tutti i worker. Per le statistiche che finiscono in cache (dashboard)
+conta anche la scrittura di chiunque altro: vedi mark_data_changed().
+
+Senza repliche (il default) il router non sceglie nulla e il middleware si
+toglie dalla catena al boot (MiddlewareNotUsed): costo zero.
+
+SQL analogy: come un Availability Group con un secondario leggibile e
+ApplicationIntent=ReadOnly scelto per query, non per connection string.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+# Alias del database per le letture della request (o del job) in corso.
+# None: nessuna preferenza, decide Django (cioè "default", il primario).
+read_database = ContextVar("read_database", default=None)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PINNED_USER_KEY = "replicas:pinned:{}"
+DATA_CHANGED_KEY = "replicas:data-changed"
+
+
+class ReadReplicaRouter:
+    """Routes reads to the replica chosen for the current request, writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Stessi dati su primario e repliche: una FK tra oggetti letti da
+        # alias diversi è comunque valida
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Le repliche ricevono lo schema dalla replica fisica, non da migrate
+        return db not in settings.DATABASE_REPLICAS
+
+
+def pin_to_primary(user):
+    """Dopo una scrittura: le letture di `user` restano sul primario per un po'."""
+    cache.set(PINNED_USER_KEY.format(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def mark_data_changed():
+    """Segna che i dati sono appena cambiati, chiunque sia stato a scriverli.
+
+    Serve ai risultati che finiscono in cache per tutti: una dashboard
+    invalidata da una scrittura e ricalcolata subito su una replica ancora
+    indietro verrebbe salvata vecchia per tutto il TTL. Chiamata
+    dall'invalidazione della dashboard (employees/signals.py), quindi
+    anche per le scritture dei task Celery.
+    """
+    if settings.DATABASE_REPLICAS:
+        cache.set(DATA_CHANGED_KEY, True, settings.REPLICA_STICKY_SECONDS)
+
+
+def choose_replica(user=None, after_any_write=False):
+    """La replica per le letture di `user`, o None per restare sul primario.
+
+    Args:
+        user: l'utente della request; None per un job senza utente.
+        after_any_write: resta sul primario anche dopo una scrittura
+            recente di un altro utente (vedi mark_data_changed).
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return None
+    keys = []
+    if user is not None and user.is_authenticated:
+        keys.append(PINNED_USER_KEY.format(user.pk))
+    if after_any_write:
+        keys.append(DATA_CHANGED_KEY)
+    # Un solo round trip verso la cache, qualunque sia il numero di marcatori
+    if keys and cache.get_many(keys):
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def use_database(alias):
+    """Le letture ORM nel blocco vanno su `alias` (None: primario)."""
+    token = read_database.set(alias)
+    try:
+        yield alias
+    finally:
+        read_database.reset(token)
+
+
+def read_from_replica():
+    """Per i job di report: `with read_from_replica(): ...` legge da una replica, se c'è."""
+    return use_database(choose_replica())
+
+
+class ReadYourWritesMiddleware:
+    """Pins a user to the primary for a short window after a successful write request.
+
+    The user is read after the response: with JWT it is authenticated by
+    DRF inside the view, which also sets it on the Django request.
+    Sync and async capable, so it does not push async views into a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.record_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.record_write(request, response)
+        return response
+
+    @staticmethod
+    def record_write(request, response):
+        # read_only: una POST che non scrive nulla, come un batch di sole GET (minijet/batch.py)
+        if request.method in SAFE_METHODS or getattr(request, "read_only", False) or response.status_code >= 400:
+            return
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user)
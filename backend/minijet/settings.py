@@ -5,10 +5,12 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.1/topics/settings/
 """
 
+import copy
 from datetime import timedelta
 from pathlib import Path
 
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,21 +44,28 @@ INSTALLED_APPS = [
     # Third-party
     "rest_framework",
     "rest_framework_simplejwt",
-    "rest_framework_simplejwt.token_blacklist",
     "corsheaders",
     "drf_spectacular",
     # Local apps
     "accounts",
     "employees",
+    "outbox",
+    "audit",
 ]
 
 MIDDLEWARE = [
+    # Primo della catena: il tempo "total" copre tutti gli altri middleware.
+    # Con SERVER_TIMING_ENABLED=False si rimuove da solo al boot (MiddlewareNotUsed).
+    "minijet.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "audit.middleware.AuditActorMiddleware",
+    # Solo con DB_REPLICA_HOSTS (altrimenti MiddlewareNotUsed): read-your-writes
+    "minijet.replicas.ReadYourWritesMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -93,9 +102,74 @@ DATABASES = {
         "PASSWORD": env("DB_PASSWORD"),
         "HOST": env("DB_HOST"),
         "PORT": env("DB_PORT", default="5432"),
+        # Health check prima di riusare una connessione (dal pool: un SELECT 1 a
+        # ogni prestito): una connessione caduta (restart del DB, timeout di rete)
+        # viene scartata invece di far fallire la request
+        "CONN_HEALTH_CHECKS": env.bool("DB_HEALTH_CHECKS", default=True),
     }
 }
 
+# Gestione delle connessioni (psycopg 3). Aprire una connessione PostgreSQL
+# (TCP + autenticazione + fork del backend) costa più di una query semplice:
+# senza riuso, ogni request ne apre una nuova.
+# DB_CONNECTION_MODE:
+# - "pool" (default): pool psycopg in ogni processo. Ogni request (o thread)
+#   prende una connessione già aperta e la restituisce alla fine.
+# - "pgbouncer": PgBouncer in transaction mode davanti al database (DB_HOST/
+#   DB_PORT puntano a PgBouncer, che fa da pool). Connessioni persistenti
+#   verso PgBouncer e niente cursori server-side (vivono oltre la transazione,
+#   ma PgBouncer può cambiare connessione al server tra una transazione e l'altra).
+#   PgBouncer non inoltra i SET di sessione: il fuso orario del server deve essere UTC.
+# - "direct": una connessione per request, tenuta per DB_CONN_MAX_AGE secondi.
+# I worker Celery (MINIJET_PROCESS=celery, vedi docker-compose.yml) eseguono un
+# task alla volta per processo figlio: pool più piccolo (CELERY_DB_POOL_*).
+# Con il pool il numero massimo di connessioni al server è processi × max_size:
+# deve restare sotto max_connections di PostgreSQL.
+DB_CONNECTION_MODE = env("DB_CONNECTION_MODE", default="pool")
+IS_CELERY_WORKER = env("MINIJET_PROCESS", default="web") == "celery"
+
+if DB_CONNECTION_MODE == "pool":
+    pool_prefix, min_size, max_size = ("CELERY_DB_POOL", 1, 2) if IS_CELERY_WORKER else ("DB_POOL", 2, 10)
+    DB_POOL = {
+        "min_size": env.int(f"{pool_prefix}_MIN_SIZE", default=min_size),
+        "max_size": env.int(f"{pool_prefix}_MAX_SIZE", default=max_size),
+        # Secondi di attesa di una connessione libera prima di PoolTimeout (errore 500)
+        "timeout": env.float("DB_POOL_TIMEOUT", default=10),
+        # Connessioni oltre min_size chiuse dopo max_idle secondi di inattività;
+        # tutte riaperte dopo max_lifetime (riequilibra dopo un failover)
+        "max_idle": env.float("DB_POOL_MAX_IDLE", default=300),
+        "max_lifetime": env.float("DB_POOL_MAX_LIFETIME", default=1800),
+    }
+    DATABASES["default"]["OPTIONS"] = {"pool": DB_POOL}
+elif DB_CONNECTION_MODE == "pgbouncer":
+    DATABASES["default"]["CONN_MAX_AGE"] = env.int("DB_CONN_MAX_AGE", default=600)
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+elif DB_CONNECTION_MODE == "direct":
+    DATABASES["default"]["CONN_MAX_AGE"] = env.int("DB_CONN_MAX_AGE", default=0)
+else:
+    raise ImproperlyConfigured(f"DB_CONNECTION_MODE must be pool, pgbouncer or direct, not {DB_CONNECTION_MODE!r}")
+
+# Repliche in lettura (minijet/replicas.py). DB_REPLICA_HOSTS=host[:port],...
+# aggiunge un alias per replica ("replica1", ...) con le stesse credenziali e
+# la stessa gestione delle connessioni del primario. Il router manda sulle
+# repliche solo le letture dichiarate (liste, dettagli, dashboard, report);
+# dopo una scrittura l'utente resta sul primario per REPLICA_STICKY_SECONDS
+# (più del ritardo di replica atteso). Nei test ogni replica è un mirror
+# di "default".
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(env.list("DB_REPLICA_HOSTS", default=[]), start=1):
+    host, _, port = replica_host.partition(":")
+    alias = f"replica{index}"
+    DATABASES[alias] = {
+        **copy.deepcopy(DATABASES["default"]),
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ["minijet.replicas.ReadReplicaRouter"]
+REPLICA_STICKY_SECONDS = env.int("REPLICA_STICKY_SECONDS", default=10)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -154,7 +228,9 @@ REST_FRAMEWORK = {
     # Authentication: JWT tokens (stateless, nessuna sessione server-side).
     # Ogni request porta il token nell'header: Authorization: Bearer <token>
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # Variante di JWTAuthentication che costruisce request.user dai claim
+        # firmati nel token, senza SELECT su accounts_user (accounts/authentication.py)
+        "accounts.authentication.ClaimsJWTAuthentication",
     ],
     # Authorization: tutti gli endpoint richiedono autenticazione di default.
     # Le singole view possono sovrascrivere con permission_classes = [AllowAny].
@@ -170,12 +246,26 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": True,  # Ogni refresh genera un nuovo Refresh Token
-    "BLACKLIST_AFTER_ROTATION": True,  # Il vecchio Refresh Token viene invalidato
+    "BLACKLIST_AFTER_ROTATION": True,  # Il vecchio Refresh Token viene invalidato (blacklist su Redis)
     "AUTH_HEADER_TYPES": ("Bearer",),
     "USER_ID_FIELD": "id",
     "USER_ID_CLAIM": "user_id",
+    # Login e refresh firmano nel token email, ruolo e dipendente collegato
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.serializers.ClaimsTokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "accounts.serializers.ClaimsTokenBlacklistSerializer",
 }
 
+# Blacklist dei refresh token (accounts/tokens.py): una chiave per jti nella
+# cache indicata, con TTL pari alla vita residua del token. Niente tabelle
+# token_blacklist_* in Postgres e niente cron di pulizia.
+JWT_BLACKLIST_CACHE = env("JWT_BLACKLIST_CACHE", default="default")
+
+# Cache per-processo dei record utente, usata solo quando una view legge un
+# attributo che non è nei claim del token (accounts/authentication.py).
+AUTH_USER_CACHE_MAX_ENTRIES = env.int("AUTH_USER_CACHE_MAX_ENTRIES", default=256)
+AUTH_USER_CACHE_TTL = env.int("AUTH_USER_CACHE_TTL", default=60)
+
 # drf-spectacular: API documentation settings
 SPECTACULAR_SETTINGS = {
     "TITLE": "Mini Jet HR API",
@@ -184,6 +274,12 @@ SPECTACULAR_SETTINGS = {
     # I docs devono restare accessibili senza autenticazione
     "SERVE_PERMISSIONS": ["rest_framework.permissions.AllowAny"],
 }
+# Schema servito da /api/schema/ (minijet/openapi.py): costruito una volta per
+# processo. In produzione si legge il file committato, rigenerato con
+# `python manage.py spectacular --file openapi.yaml` (un test lo verifica);
+# in sviluppo si genera all'avvio, così segue il codice.
+OPENAPI_SCHEMA_FILE = BASE_DIR / "openapi.yaml"
+OPENAPI_SCHEMA_FROM_FILE = env.bool("OPENAPI_SCHEMA_FROM_FILE", default=not DEBUG)
 
 # CORS: allow the Vue frontend dev server to call the API
 CORS_ALLOWED_ORIGINS = [
@@ -199,6 +295,27 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 
+# Transactional outbox (outbox/): i task vengono scritti in tabella nella
+# transazione della request e pubblicati su Redis da `manage.py dispatch_outbox`.
+# BATCH_SIZE: righe reclamate per transazione (FOR UPDATE SKIP LOCKED).
+# POLL_INTERVAL: attesa in secondi quando la coda è vuota.
+# ALWAYS_EAGER: pubblica subito invece di scrivere in tabella (solo test, come
+# CELERY_TASK_ALWAYS_EAGER).
+OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", default=100)
+OUTBOX_POLL_INTERVAL = env.float("OUTBOX_POLL_INTERVAL", default=0.5)
+OUTBOX_ALWAYS_EAGER = env.bool("OUTBOX_ALWAYS_EAGER", default=False)
+
+# Audit trail (audit/): il diff viene accodato in memoria e scritto da un
+# thread in background ogni FLUSH_INTERVAL secondi o BATCH_SIZE righe.
+# ASYNC=False scrive subito nella transazione della request (test).
+AUDIT_ASYNC = env.bool("AUDIT_ASYNC", default=True)
+AUDIT_BATCH_SIZE = env.int("AUDIT_BATCH_SIZE", default=500)
+AUDIT_FLUSH_INTERVAL = env.float("AUDIT_FLUSH_INTERVAL", default=1.0)
+
+# Propagazione di un nuovo template ai dipendenti in onboarding:
+# numero di dipendenti per INSERT ... SELECT (una transazione per blocco).
+ONBOARDING_PROPAGATION_CHUNK_SIZE = env.int("ONBOARDING_PROPAGATION_CHUNK_SIZE", default=1000)
+
 # Email — Strategy Pattern: stessa send_mail(), backend diverso per ambiente.
 # console → stampa su stdout (docker-compose logs backend)
 # smtp    → invia via server SMTP reale (produzione)
@@ -209,6 +326,16 @@ EMAIL_BACKEND = env(
 )
 DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default="hr@minijethr.local")
 
+# Email di benvenuto a lotti (employees/services.py).
+# BATCHING off: un task Celery e una connessione SMTP per ogni assunzione.
+# BATCHING on: la creazione accoda una riga, e dopo BATCH_DELAY secondi un
+# solo task invia tutta la coda su una connessione, BATCH_SIZE email per
+# transazione. Dopo MAX_ATTEMPTS fallimenti la riga resta in coda per HR.
+WELCOME_EMAIL_BATCHING = env.bool("WELCOME_EMAIL_BATCHING", default=False)
+WELCOME_EMAIL_BATCH_SIZE = env.int("WELCOME_EMAIL_BATCH_SIZE", default=100)
+WELCOME_EMAIL_BATCH_DELAY = env.int("WELCOME_EMAIL_BATCH_DELAY", default=30)
+WELCOME_EMAIL_MAX_ATTEMPTS = env.int("WELCOME_EMAIL_MAX_ATTEMPTS", default=5)
+
 # Cache — Django cache framework con Redis.
 # Come Celery (DB 0) usa Redis per la coda dei task,
 # la cache (DB 1) usa Redis come staging table: dati pre-calcolati
@@ -227,3 +354,36 @@ CACHES = {
 # In produzione si può alzare; l'invalidazione signal-based
 # garantisce dati freschi quando cambiano.
 CACHE_DASHBOARD_TTL = env.int("CACHE_DASHBOARD_TTL", default=300)
+
+# Cache L1 in-process (minijet/cache.py) davanti a Redis.
+# MAX_ENTRIES: limite LRU per processo (ogni worker gunicorn ha la sua copia).
+# TTL: rete di sicurezza se un messaggio pub/sub di invalidazione va perso.
+CACHE_LOCAL_MAX_ENTRIES = env.int("CACHE_LOCAL_MAX_ENTRIES", default=256)
+CACHE_LOCAL_TTL = env.int("CACHE_LOCAL_TTL", default=60)
+CACHE_INVALIDATION_CHANNEL = env("CACHE_INVALIDATION_CHANNEL", default="minijet:cache-invalidation")
+
+# Strumentazione per request (minijet/middleware.py): header Server-Timing e
+# log "minijet.performance" con query SQL, cache hit/miss, tempi di view e render.
+# Disattivato di default: espone dettagli interni, da accendere in dev/staging.
+# N_PLUS_ONE_THRESHOLD: esecuzioni della stessa forma SQL oltre cui segnalare un N+1.
+SERVER_TIMING_ENABLED = env.bool("SERVER_TIMING_ENABLED", default=False)
+SERVER_TIMING_N_PLUS_ONE_THRESHOLD = env.int("SERVER_TIMING_N_PLUS_ONE_THRESHOLD", default=5)
+
+# GET di dashboard, lista/dettaglio dipendenti, contratti e onboarding servite
+# da view async con ORM e cache async (employees/async_views.py).
+# Solo sotto un server ASGI: con WSGI ogni view async costa un event loop per request.
+# Nota: ServerTimingMiddleware è solo sync, attivo rimette la catena in un thread.
+ASYNC_READ_VIEWS = env.bool("ASYNC_READ_VIEWS", default=False)
+
+# POST /api/batch/ (minijet/batch.py): più GET/PATCH in un solo round trip.
+# Limite di sotto-request per batch: un batch tiene occupato un worker (e,
+# con scritture, una transazione) finché non finisce l'ultima.
+BATCH_MAX_REQUESTS = env.int("BATCH_MAX_REQUESTS", default=20)
+
+# Snapshot dei template di onboarding attivi (employees/services.py).
+# Invalidato dai signal su ogni modifica: il TTL è solo un limite superiore.
+CACHE_ONBOARDING_TEMPLATES_TTL = env.int("CACHE_ONBOARDING_TEMPLATES_TTL", default=3600)
+
+# Dimensioni dei sottoalberi dell'organigramma (employees/org_chart.py).
+# Invalidate dai signal quando cambiano le linee di riporto.
+CACHE_ORG_CHART_TTL = env.int("CACHE_ORG_CHART_TTL", default=3600)
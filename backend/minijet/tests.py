@@ -0,0 +1,628 @@
+"""Tests for project-level infrastructure (minijet package).
+
+Qui vivono i test dei moduli condivisi da tutte le app
+(cache a due livelli, middleware di strumentazione, ecc.), che non appartengono a employees o accounts.
+"""
+
+import gc
+import gzip
+import json
+import os
+import runpy
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import clear_url_caches, get_resolver
+from rest_framework.test import APIClient
+
+from accounts.authentication import ClaimsJWTAuthentication
+from accounts.serializers import ClaimsTokenObtainPairSerializer
+from employees.models import Employee, OnboardingTemplate
+from employees.signals import invalidate_dashboard_cache
+
+from .cache import TwoTierCache, two_tier_cache
+from .middleware import RequestMetrics, ServerTimingMiddleware
+from .openapi import generate_schema, load_schema
+from .replicas import ReadReplicaRouter, ReadYourWritesMiddleware, read_database, use_database
+from .warmup import warm_up
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    """Tests for the in-process LRU in front of the Django cache (L1 + L2).
+
+    SQL analogy: L1 = temp table di sessione, L2 = staging table condivisa.
+    Verifichiamo che la temp table eviti il round trip e che venga
+    svuotata quando la staging table cambia versione.
+    """
+
+    def setUp(self):
+        # Istanza dedicata: non condivide L1 con two_tier_cache del processo
+        self.tiered = TwoTierCache()
+
+    def test_miss_returns_default(self):
+        self.assertIsNone(self.tiered.get("missing"))
+        self.assertEqual(self.tiered.get("missing", 0), 0)
+
+    def test_local_hit_skips_shared_cache(self):
+        """Dopo il set, la lettura arriva da L1 senza toccare la cache Django."""
+        self.tiered.set("stats", {"active": 3}, 300)
+
+        with patch.object(cache, "get", wraps=cache.get) as shared_get:
+            self.assertEqual(self.tiered.get("stats"), {"active": 3})
+            shared_get.assert_not_called()
+
+    def test_cached_falsy_value_is_a_hit(self):
+        """0 e {} sono valori validi, non MISS (come IS NULL vs = 0)."""
+        self.tiered.set("zero", 0, 300)
+        self.assertEqual(self.tiered.get("zero", "miss"), 0)
+
+    def test_shared_value_is_promoted_to_local(self):
+        """Un valore scritto da un altro processo (L2) finisce in L1 alla prima lettura."""
+        other_process = TwoTierCache()
+        other_process.set("stats", "fresh", 300)
+
+        self.assertEqual(self.tiered.get("stats"), "fresh")
+        with patch.object(cache, "get", wraps=cache.get) as shared_get:
+            self.assertEqual(self.tiered.get("stats"), "fresh")
+            shared_get.assert_not_called()
+
+    def test_invalidate_bumps_version(self):
+        """Dopo invalidate() il valore della versione precedente non viene più letto."""
+        self.tiered.set("stats", "old", 300)
+        self.tiered.invalidate("stats")
+
+        self.assertIsNone(self.tiered.get("stats"))
+        self.assertEqual(cache.get("stats:version"), 2)
+        # Il vecchio valore è ancora in L2 sotto la chiave v1, ma è irraggiungibile
+        self.assertEqual(cache.get("stats:v1"), "old")
+
+    def test_invalidation_message_drops_local_copy(self):
+        """Il messaggio pub/sub di un altro processo scarta la copia in L1."""
+        self.tiered.set("stats", "old", 300)
+        other_process = TwoTierCache()
+        other_process.invalidate("stats")
+
+        # Senza il messaggio, L1 servirebbe ancora il dato vecchio fino al TTL locale
+        self.assertEqual(self.tiered.get("stats"), "old")
+
+        self.tiered._on_message({"data": b"stats|2"})
+        self.assertIsNone(self.tiered.get("stats"))
+
+    def test_stale_version_not_stored_locally(self):
+        """Un valore calcolato con una versione già invalidata non entra in L1."""
+        self.tiered._on_message({"data": b"stats|5"})
+        self.tiered._set_local("stats", 4, "stale", 300)
+
+        self.assertIsNone(self.tiered._local.get("stats"))
+
+    @override_settings(CACHE_LOCAL_TTL=0)
+    def test_local_ttl_expiry_falls_back_to_shared_cache(self):
+        self.tiered.set("stats", "value", 300)
+
+        with patch.object(cache, "get", wraps=cache.get) as shared_get:
+            self.assertEqual(self.tiered.get("stats"), "value")
+            self.assertTrue(shared_get.called)
+
+    @override_settings(CACHE_LOCAL_MAX_ENTRIES=2)
+    def test_lru_evicts_least_recently_used(self):
+        self.tiered.set("a", 1, 300)
+        self.tiered.set("b", 2, 300)
+        self.tiered.get("a")  # "a" diventa la più recente
+        self.tiered.set("c", 3, 300)
+
+        self.assertEqual(list(self.tiered._local), ["a", "c"])
+
+    def test_listener_retried_with_backoff_when_redis_is_down(self):
+        """Redis giù alla prima chiamata: il listener parte a una chiamata successiva."""
+        client = MagicMock()
+        redis_client = patch.object(self.tiered, "_redis_client", side_effect=[ConnectionError("down"), client])
+        with redis_client, patch("minijet.cache.time.monotonic", return_value=100.0) as monotonic:
+            with self.assertLogs("minijet.cache", "WARNING"):
+                self.tiered.get("stats")
+            self.tiered.set("stats", "maybe stale", 300)
+            client.pubsub.assert_not_called()  # ancora dentro il backoff
+
+            monotonic.return_value = 101.0
+            with patch.object(cache, "get", wraps=cache.get) as shared_get:
+                self.assertEqual(self.tiered.get("stats"), "maybe stale")
+
+        client.pubsub.return_value.subscribe.assert_called_once()
+        self.assertEqual(self.tiered._listener_pid, os.getpid())
+        # Invalidazioni perse mentre Redis era giù: L1 ripartito da zero, riletto da L2
+        self.assertTrue(shared_get.called)
+
+    def test_async_path_starts_listener_off_the_event_loop(self):
+        """aget_or_set: connect e subscribe a Redis girano in un thread, non sull'event loop."""
+        threads = []
+
+        async def compute():
+            threads.append(("loop", threading.get_ident()))
+            return "value"
+
+        def ensure_listener():
+            threads.append(("listener", threading.get_ident()))
+            self.tiered._listener_pid = os.getpid()
+
+        with patch.object(self.tiered, "_ensure_listener", side_effect=ensure_listener) as ensure:
+            self.assertEqual(async_to_sync(self.tiered.aget_or_set)("stats", compute, 300), "value")
+            self.assertEqual(async_to_sync(self.tiered.aget_or_set)("stats", compute, 300), "value")
+
+        # Listener già attivo nel processo: la seconda chiamata fa solo il controllo sul PID
+        ensure.assert_called_once()
+        (_, listener_thread), (_, loop_thread) = threads
+        self.assertNotEqual(listener_thread, loop_thread)
+
+
+class ServerTimingMiddlewareTest(TestCase):
+    """Per-request instrumentation: Server-Timing header, log record, N+1 detection."""
+
+    def setUp(self):
+        # Attivato prima di creare il client: il middleware decide al caricamento
+        # della catena se restare (MiddlewareNotUsed quando è disattivato)
+        enabled = override_settings(SERVER_TIMING_ENABLED=True, SERVER_TIMING_N_PLUS_ONE_THRESHOLD=3)
+        enabled.enable()
+        self.addCleanup(enabled.disable)
+
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(email="hr@minijethr.local", password="x", is_staff=True)
+        self.client.force_authenticate(user=user)
+
+    def timing(self, response):
+        return dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+
+    def test_disabled_middleware_leaves_the_chain(self):
+        with override_settings(SERVER_TIMING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ServerTimingMiddleware(lambda request: None)
+            response = APIClient().get("/api/docs/")
+        self.assertNotIn("Server-Timing", response)
+
+    def test_dashboard_cache_miss_then_local_hit(self):
+        first = self.timing(self.client.get("/api/dashboard/stats/"))
+        second = self.timing(self.client.get("/api/dashboard/stats/"))
+
+        self.assertEqual(first["cache-dashboard_stats"], 'desc="miss x1"')
+        self.assertEqual(second["cache-dashboard_stats"], 'desc="l1 x1"')
+        # Cache hit: nessuna query, e la view non passa dal DB
+        self.assertIn('desc="0 queries"', second["db"])
+        self.assertIn("view", second)
+        self.assertIn("render", second)
+        self.assertIn("total", second)
+
+    def test_log_record_carries_structured_fields(self):
+        with self.assertLogs("minijet.performance", "INFO") as logs:
+            self.client.get("/api/dashboard/stats/")
+
+        (record,) = logs.records
+        self.assertEqual(record.path, "/api/dashboard/stats/")
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.db_queries, 0)
+        self.assertEqual(record.cache, {"dashboard_stats:miss": 1})
+        self.assertEqual(record.repeated_queries, [])
+
+    def test_repeated_query_shape_flagged_as_n_plus_one(self):
+        metrics = RequestMetrics()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for pk in range(4):
+            metrics.execute_wrapper(execute, "SELECT * FROM t WHERE id = %s", [pk], False, {})
+        # Liste IN di lunghezza diversa sono la stessa forma
+        metrics.execute_wrapper(execute, "SELECT * FROM t WHERE id IN (%s, %s)", [1, 2], False, {})
+        metrics.execute_wrapper(execute, "SELECT * FROM t WHERE id IN (%s, %s, %s)", [1, 2, 3], False, {})
+
+        repeated = metrics.repeated_queries(3)
+        self.assertEqual(repeated, [("SELECT * FROM t WHERE id = %s", 4)])
+        self.assertEqual(metrics.query_shapes["SELECT * FROM t WHERE id IN (%s...)"], 2)
+
+        durations = metrics.durations(metrics.started)
+        self.assertIn(
+            'n-plus-one;desc="1 repeated queries up to x4"', ServerTimingMiddleware.header(metrics, durations, repeated)
+        )
+
+
+class WarmUpTest(SimpleTestCase):
+    """Warm-up run by the gunicorn master before forking the workers.
+
+    SimpleTestCase: una query al database farebbe fallire il test, e il
+    master non deve aprire connessioni che i worker erediterebbero.
+    """
+
+    def test_builds_url_resolver_and_serializer_fields(self):
+        clear_url_caches()
+
+        stats = warm_up()
+
+        self.assertTrue(get_resolver()._populated)
+        self.assertGreater(stats["views"], 0)
+        # Comprese le view JWT, che caricano il serializer dai settings
+        self.assertGreater(stats["serializers"], 5)
+
+
+class GunicornConfigTest(SimpleTestCase):
+    """gunicorn.conf.py: preload, worker class and app chosen from ASYNC_READ_VIEWS."""
+
+    def load_config(self, **environ):
+        # Il file spegne il GC fino al fork (riacceso in post_fork): qui va riacceso a mano
+        self.addCleanup(gc.enable)
+        with patch.dict(os.environ, environ):
+            return runpy.run_path(str(Path(settings.BASE_DIR) / "gunicorn.conf.py"))
+
+    def test_wsgi_threads_by_default(self):
+        config = self.load_config(ASYNC_READ_VIEWS="False")
+
+        self.assertTrue(config["preload_app"])
+        self.assertEqual(config["wsgi_app"], "minijet.wsgi:application")
+        self.assertEqual(config["worker_class"], "gthread")
+        self.assertGreater(config["max_requests_jitter"], 0)
+
+    def test_asgi_with_uvicorn_workers_for_async_reads(self):
+        config = self.load_config(ASYNC_READ_VIEWS="True", GUNICORN_WORKERS="3")
+
+        self.assertEqual(config["wsgi_app"], "minijet.asgi:application")
+        self.assertEqual(config["worker_class"], "uvicorn_worker.UvicornWorker")
+        self.assertEqual(config["workers"], 3)
+
+    def test_when_ready_closes_connection_pools_before_fork(self):
+        """Il pool psycopg di ogni alias (repliche comprese) non deve arrivare ai worker."""
+        config = self.load_config()
+        aliases = {
+            "default": MagicMock(settings_dict={"OPTIONS": {"pool": {"min_size": 2}}}),
+            "replica_1": MagicMock(settings_dict={"OPTIONS": {"pool": {"min_size": 2}}}),
+            "pgbouncer": MagicMock(settings_dict={"OPTIONS": {}}),
+        }
+        connections = MagicMock()
+        connections.__iter__.side_effect = lambda: iter(aliases)
+        connections.__getitem__.side_effect = aliases.__getitem__
+
+        with patch("django.db.connections", connections), patch("gc.freeze"):
+            config["when_ready"](MagicMock())
+
+        connections.close_all.assert_called_once_with()
+        aliases["default"].close_pool.assert_called_once_with()
+        aliases["replica_1"].close_pool.assert_called_once_with()
+        aliases["pgbouncer"].close_pool.assert_not_called()
+
+    def test_post_fork_starts_cache_listener(self):
+        """Il worker avvia il listener pub/sub appena nato, prima della prima request."""
+        config = self.load_config()
+
+        with patch("minijet.cache.two_tier_cache.start_listener") as start_listener:
+            config["post_fork"](MagicMock(), MagicMock())
+
+        start_listener.assert_called_once_with()
+
+
+class DatabaseConnectionSettingsTest(SimpleTestCase):
+    """DATABASES built from DB_CONNECTION_MODE (pool, pgbouncer, direct) and MINIJET_PROCESS."""
+
+    def load_settings(self, **environ):
+        with patch.dict(os.environ, environ):
+            return runpy.run_path(str(Path(settings.BASE_DIR) / "minijet" / "settings.py"))["DATABASES"]["default"]
+
+    def test_pool_by_default_with_health_checks(self):
+        database = self.load_settings(DB_CONNECTION_MODE="pool", MINIJET_PROCESS="web", DB_POOL_MAX_SIZE="7")
+
+        self.assertEqual(database["OPTIONS"]["pool"]["max_size"], 7)
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+        # Django rifiuta pool + connessioni persistenti
+        self.assertNotIn("CONN_MAX_AGE", database)
+
+    def test_celery_workers_get_a_smaller_pool(self):
+        database = self.load_settings(DB_CONNECTION_MODE="pool", MINIJET_PROCESS="celery")
+
+        self.assertEqual(database["OPTIONS"]["pool"]["min_size"], 1)
+        self.assertEqual(database["OPTIONS"]["pool"]["max_size"], 2)
+
+    def test_pgbouncer_mode_keeps_connections_without_server_side_cursors(self):
+        database = self.load_settings(DB_CONNECTION_MODE="pgbouncer")
+
+        self.assertNotIn("OPTIONS", database)
+        self.assertTrue(database["DISABLE_SERVER_SIDE_CURSORS"])
+        self.assertGreater(database["CONN_MAX_AGE"], 0)
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(DB_CONNECTION_MODE="pgpool")
+
+
+class ReplicaSettingsTest(SimpleTestCase):
+    """DB_REPLICA_HOSTS adds one replica alias per host, mirroring default in tests."""
+
+    def test_replica_aliases_copy_the_primary(self):
+        with patch.dict(os.environ, DB_REPLICA_HOSTS="replica-a:5433,replica-b", DB_CONNECTION_MODE="pool"):
+            loaded = runpy.run_path(str(Path(settings.BASE_DIR) / "minijet" / "settings.py"))
+
+        databases = loaded["DATABASES"]
+        self.assertEqual(loaded["DATABASE_REPLICAS"], ["replica1", "replica2"])
+        self.assertEqual((databases["replica1"]["HOST"], databases["replica1"]["PORT"]), ("replica-a", "5433"))
+        self.assertEqual(databases["replica2"]["PORT"], databases["default"]["PORT"])
+        self.assertEqual(databases["replica1"]["OPTIONS"], databases["default"]["OPTIONS"])
+        self.assertEqual(databases["replica1"]["TEST"], {"MIRROR": "default"})
+
+
+class ReadReplicaRoutingTest(TestCase):
+    """Declared reads go to a replica, writes and read-your-writes stay on the primary.
+
+    "default" fa da replica: nei test le repliche sono mirror del primario.
+    Si guarda quindi cosa decide il router (None = primario), non la connessione.
+    """
+
+    def setUp(self):
+        # Prima di creare il client: il middleware decide al caricamento della catena
+        replicas = override_settings(DATABASE_REPLICAS=["default"], REPLICA_STICKY_SECONDS=10)
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+
+        self.client = APIClient()
+        self.hr = get_user_model().objects.create_user(email="hr@minijethr.local", password="x", is_staff=True)
+        self.client.force_authenticate(user=self.hr)
+        self.employee = self.client.post(
+            "/api/employees/",
+            {"first_name": "Mario", "last_name": "Rossi", "email": "mario@example.com", "hire_date": "2024-01-15"},
+            format="json",
+        ).data
+        cache.clear()
+
+    def routed(self, request):
+        """Esegue `request` e ritorna le decisioni del router per le letture."""
+        decisions = []
+        original = ReadReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            decisions.append(original(router, model, **hints))
+            return decisions[-1]
+
+        with patch.object(ReadReplicaRouter, "db_for_read", spy):
+            response = request()
+        self.assertLess(response.status_code, 400)
+        return set(decisions)
+
+    def test_list_and_retrieve_read_from_a_replica(self):
+        self.assertEqual(self.routed(lambda: self.client.get("/api/employees/")), {"default"})
+        self.assertEqual(self.routed(lambda: self.client.get(f"/api/employees/{self.employee['id']}/")), {"default"})
+        # Fuori dalla request il ContextVar è tornato al primario
+        self.assertIsNone(read_database.get())
+
+    def test_undeclared_actions_and_writes_stay_on_the_primary(self):
+        self.assertEqual(self.routed(lambda: self.client.get(f"/api/employees/{self.employee['id']}/history/")), {None})
+        self.assertEqual(
+            self.routed(lambda: self.client.patch(f"/api/employees/{self.employee['id']}/", {"role": "manager"})),
+            {None},
+        )
+
+    def test_user_who_just_wrote_reads_from_the_primary(self):
+        self.client.patch(f"/api/employees/{self.employee['id']}/", {"role": "manager"})
+
+        self.assertEqual(self.routed(lambda: self.client.get("/api/employees/")), {None})
+
+        # Un altro utente non ha scritto nulla: le sue liste restano sulle repliche
+        other = APIClient()
+        other.force_authenticate(user=get_user_model().objects.create_user(email="hr2@minijethr.local", is_staff=True))
+        self.assertEqual(self.routed(lambda: other.get("/api/employees/")), {"default"})
+
+    def test_batch_reads_stay_on_replicas_unless_the_batch_writes(self):
+        detail = f"/api/employees/{self.employee['id']}/"
+
+        def batch(*requests):
+            return lambda: self.client.post("/api/batch/", {"requests": list(requests)}, format="json")
+
+        self.assertEqual(self.routed(batch({"method": "GET", "path": detail})), {"default"})
+        # Un batch di sole GET non inchioda l'utente al primario
+        self.assertEqual(self.routed(lambda: self.client.get("/api/employees/")), {"default"})
+
+        # Con una PATCH tutto il batch legge dal primario (la GET vede la scrittura):
+        # le view non scelgono nessuna replica
+        writes = batch({"method": "PATCH", "path": detail, "body": {"role": "manager"}}, {"method": "GET", "path": detail})
+        with patch("employees.views.choose_replica") as choose_replica:
+            writes()
+        choose_replica.assert_not_called()
+
+    def test_dashboard_recomputed_on_the_primary_after_any_write(self):
+        self.assertEqual(self.routed(lambda: self.client.get("/api/dashboard/stats/")), {"default"})
+
+        # Scrittura di un altro processo (es. un task Celery): nessun utente
+        # inchiodato, ma la dashboard invalidata si ricalcola sul primario
+        invalidate_dashboard_cache()
+        self.assertEqual(self.routed(lambda: self.client.get("/api/dashboard/stats/")), {None})
+        # Le liste non sono in cache condivisa: restano sulle repliche
+        self.assertEqual(self.routed(lambda: self.client.get("/api/employees/")), {"default"})
+
+    def test_template_snapshot_rebuilt_on_the_primary_after_a_template_write(self):
+        """Una replica indietro non deve finire nello snapshot dei template, cachato per un'ora."""
+        # Lo snapshot letto dal setUp (step del nuovo dipendente) è ancora in L1
+        two_tier_cache.clear_local()
+        self.assertEqual(self.routed(lambda: self.client.get("/api/onboarding-templates/")), {"default"})
+
+        # Scrittura fuori da questa sessione (altro utente, admin, task): nessun utente inchiodato
+        OnboardingTemplate.objects.create(name="Badge", order=1)
+        other = APIClient()
+        other.force_authenticate(user=get_user_model().objects.create_user(email="hr2@minijethr.local", is_staff=True))
+
+        self.assertEqual(self.routed(lambda: other.get("/api/onboarding-templates/")), {None})
+        # Lo snapshot appena salvato viene dal primario e contiene il nuovo template
+        self.assertIn("Badge", [template["name"] for template in other.get("/api/onboarding-templates/").data["results"]])
+
+    def test_without_replicas_everything_stays_on_the_primary(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReadYourWritesMiddleware(lambda request: None)
+            self.assertEqual(self.routed(lambda: self.client.get("/api/employees/")), {None})
+
+    def test_router_sends_writes_and_migrations_to_the_primary(self):
+        router = ReadReplicaRouter()
+        with use_database("replica1"):
+            self.assertEqual(router.db_for_read(None), "replica1")
+            self.assertEqual(router.db_for_write(None), "default")
+        self.assertIsNone(router.db_for_read(None))
+        with override_settings(DATABASE_REPLICAS=["replica1"]):
+            self.assertFalse(router.allow_migrate("replica1", "employees"))
+            self.assertTrue(router.allow_migrate("default", "employees"))
+
+
+class OpenAPISchemaTest(SimpleTestCase):
+    """/api/schema/ serves the committed schema from memory, with ETag and gzip."""
+
+    def setUp(self):
+        from_file = override_settings(OPENAPI_SCHEMA_FROM_FILE=True)
+        from_file.enable()
+        self.addCleanup(from_file.disable)
+        load_schema.cache_clear()
+        self.addCleanup(load_schema.cache_clear)
+        self.committed = Path(settings.OPENAPI_SCHEMA_FILE).read_bytes()
+
+    def test_committed_schema_is_up_to_date(self):
+        self.assertEqual(
+            generate_schema().decode(),
+            self.committed.decode(),
+            "backend/openapi.yaml is out of date: run `python manage.py spectacular --file openapi.yaml`",
+        )
+
+    def test_served_from_memory_without_regenerating(self):
+        with patch("minijet.openapi.generate_schema", side_effect=AssertionError("schema regenerated")):
+            first = self.client.get("/api/schema/")
+            second = self.client.get("/api/schema/")
+
+        self.assertEqual(first.content, self.committed)
+        self.assertEqual(first["Content-Type"], "application/vnd.oai.openapi; charset=utf-8")
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertEqual(first["Cache-Control"], "no-cache")
+
+    def test_matching_etag_gets_not_modified(self):
+        etag = self.client.get("/api/schema/")["ETag"]
+
+        response = self.client.get("/api/schema/", headers={"if-none-match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_gzip_and_json_have_their_own_etag(self):
+        plain = self.client.get("/api/schema/", headers={"accept": "application/json"})
+        compressed = self.client.get("/api/schema/", headers={"accept": "application/json", "accept-encoding": "gzip"})
+
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(json.loads(plain.content)["info"]["title"], "Mini Jet HR API")
+        self.assertNotEqual(compressed["ETag"], plain["ETag"])
+
+    def test_translated_schema_is_generated_on_request(self):
+        response = self.client.get("/api/schema/?lang=en-us")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+
+
+class BatchAPITest(TestCase):
+    """POST /api/batch/: several GET/PATCH calls in one round trip, authenticated once."""
+
+    def setUp(self):
+        self.boss = Employee.objects.create(
+            first_name="Anna", last_name="Bianchi", email="anna@example.com", hire_date="2020-01-01", role="manager"
+        )
+        self.dev = Employee.objects.create(
+            first_name="Mario", last_name="Rossi", email="mario@example.com", hire_date="2024-01-15", manager=self.boss
+        )
+        self.other = Employee.objects.create(
+            first_name="Luca", last_name="Verdi", email="luca@example.com", hire_date="2023-05-01"
+        )
+        hr = get_user_model().objects.create_user(email="hr@minijethr.local", password="x", is_staff=True)
+        manager = get_user_model().objects.create_user(email="anna@minijethr.local", password="x", employee=self.boss)
+        self.hr_headers = {"authorization": f"Bearer {ClaimsTokenObtainPairSerializer.get_token(hr).access_token}"}
+        self.manager_headers = {"authorization": f"Bearer {ClaimsTokenObtainPairSerializer.get_token(manager).access_token}"}
+
+    def batch(self, requests, headers=None, **options):
+        return self.client.post(
+            "/api/batch/",
+            {"requests": requests, **options},
+            content_type="application/json",
+            headers=headers or self.hr_headers,
+        )
+
+    def test_reads_match_single_requests_with_one_authentication(self):
+        paths = [f"/api/employees/{self.dev.pk}/", f"/api/employees/{self.dev.pk}/contracts/", "/api/employees/?page=1"]
+        single = [self.client.get(path, headers=self.hr_headers).json() for path in paths]
+
+        with patch.object(
+            ClaimsJWTAuthentication, "authenticate", autospec=True, side_effect=ClaimsJWTAuthentication.authenticate
+        ) as authenticate:
+            response = self.batch([{"method": "GET", "path": path} for path in paths])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(authenticate.call_count, 1)
+        self.assertEqual([sub["status"] for sub in response.json()["responses"]], [200, 200, 200])
+        self.assertEqual([sub["body"] for sub in response.json()["responses"]], single)
+        self.assertFalse(response.json()["rolled_back"])
+
+    def test_get_after_patch_sees_the_write(self):
+        response = self.batch(
+            [
+                {"method": "PATCH", "path": f"/api/employees/{self.dev.pk}/", "body": {"department": "IT"}},
+                {"method": "GET", "path": f"/api/employees/{self.dev.pk}/"},
+            ]
+        )
+
+        patched, read = response.json()["responses"]
+        self.assertEqual(patched["status"], 200)
+        self.assertEqual(read["body"]["department"], "IT")
+
+    def test_failed_request_rolls_back_the_atomic_batch(self):
+        response = self.batch(
+            [
+                {"method": "PATCH", "path": f"/api/employees/{self.dev.pk}/", "body": {"department": "IT"}},
+                {"method": "PATCH", "path": f"/api/employees/{self.other.pk}/", "body": {"email": "not-an-email"}},
+                {"method": "GET", "path": f"/api/employees/{self.dev.pk}/"},
+            ]
+        )
+
+        self.assertEqual([sub["status"] for sub in response.json()["responses"]], [200, 400, 424])
+        self.assertIn("email", response.json()["responses"][1]["body"])
+        self.assertTrue(response.json()["rolled_back"])
+        self.dev.refresh_from_db()
+        self.assertNotEqual(self.dev.department, "IT")
+
+    def test_non_atomic_batch_keeps_successful_writes(self):
+        response = self.batch(
+            [
+                {"method": "PATCH", "path": f"/api/employees/{self.other.pk}/", "body": {"email": "not-an-email"}},
+                {"method": "PATCH", "path": f"/api/employees/{self.dev.pk}/", "body": {"department": "IT"}},
+            ],
+            atomic=False,
+        )
+
+        self.assertEqual([sub["status"] for sub in response.json()["responses"]], [400, 200])
+        self.dev.refresh_from_db()
+        self.assertEqual(self.dev.department, "IT")
+
+    def test_sub_requests_keep_the_caller_scope(self):
+        response = self.batch(
+            [
+                {"method": "GET", "path": f"/api/employees/{self.dev.pk}/"},
+                {"method": "GET", "path": f"/api/employees/{self.other.pk}/"},
+            ],
+            headers=self.manager_headers,
+        )
+
+        self.assertEqual([sub["status"] for sub in response.json()["responses"]], [200, 404])
+
+    def test_invalid_batches_are_rejected(self):
+        with override_settings(BATCH_MAX_REQUESTS=2):
+            too_many = self.batch([{"method": "GET", "path": "/api/employees/"}] * 3)
+        self.assertEqual(too_many.status_code, 400)
+        self.assertEqual(self.batch([{"method": "DELETE", "path": "/api/employees/"}]).status_code, 400)
+        self.assertEqual(self.batch([{"method": "GET", "path": "/admin/"}]).status_code, 400)
+
+        nested = self.batch([{"method": "GET", "path": "/api/batch/"}, {"method": "GET", "path": "/api/nope/"}])
+        self.assertEqual([sub["status"] for sub in nested.json()["responses"]], [400, 404])
+
+        anonymous = self.client.post("/api/batch/", {"requests": []}, content_type="application/json")
+        self.assertEqual(anonymous.status_code, 401)
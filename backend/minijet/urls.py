@@ -19,13 +19,21 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
 from rest_framework_simplejwt.views import (
     TokenBlacklistView,
     TokenObtainPairView,
     TokenRefreshView,
 )
 
+# Registra lo schema OpenAPI di ClaimsJWTAuthentication (import per side effect).
+# Qui e non in AccountsConfig.ready(): drf-spectacular viene importato solo da chi
+# carica l'URLconf (server web, generazione dello schema), non da ogni manage.py.
+from accounts import schema  # noqa: F401
+
+from .batch import BatchView
+from .openapi import PrecomputedSchemaView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("employees.urls")),
@@ -36,8 +44,11 @@ urlpatterns = [
     path("api/auth/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/auth/logout/", TokenBlacklistView.as_view(), name="token_blacklist"),
-    # OpenAPI schema (YAML/JSON) — il "contratto" leggibile da tool esterni
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    # Batch: più GET/PATCH in un solo round trip, JWT verificato una volta (minijet/batch.py)
+    path("api/batch/", BatchView.as_view(), name="batch"),
+    # OpenAPI schema (YAML/JSON) — il "contratto" leggibile da tool esterni.
+    # Precalcolato una volta per processo, con ETag e gzip (minijet/openapi.py)
+    path("api/schema/", PrecomputedSchemaView.as_view(), name="schema"),
     # Swagger UI — interfaccia interattiva per esplorare e testare l'API
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
 ]
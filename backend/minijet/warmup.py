@@ -0,0 +1,89 @@
+"""Riscaldamento del processo prima di accettare traffico.
+
+Molte strutture di Django e DRF si costruiscono alla prima request che le
+usa: le tabelle di reverse() e resolve() dell'URLconf, le liste di campi
+dei model (_meta.get_fields, relation tree), i campi dei ModelSerializer,
+le impostazioni lette pigramente da api_settings, il catalogo delle
+traduzioni, lo schema OpenAPI (minijet/openapi.py). Sotto gunicorn con
+preload_app (gunicorn.conf.py) warm_up() gira una volta nel master prima
+del fork: i worker nascono con tutto già
+in memoria, la prima request non paga il costo e le pagine restano
+condivise (copy-on-write) tra i worker invece di essere ricostruite in
+ognuno.
+
+Niente query né cache: il master non deve aprire connessioni che i
+worker erediterebbero dopo il fork.
+
+SQL analogy: come pre-caricare il plan cache con le query più frequenti
+dopo un restart, prima di riaprire il database agli utenti.
+"""
+
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import translation
+
+from .openapi import load_schema
+
+logger = logging.getLogger(__name__)
+
+
+def iter_views(patterns):
+    """Le view dell'URLconf (callback di as_view()), URLResolver annidati compresi."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_views(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield pattern.callback
+
+
+def warm_up():
+    """Costruisce in anticipo le cache pigre di URLconf, model, view e serializer.
+
+    Returns:
+        dict: quante view e serializer sono stati riscaldati e quanto è durato.
+    """
+    started = time.perf_counter()
+
+    # URLconf: url_patterns importa tutte le view, reverse_dict popola le
+    # tabelle di reverse() per ogni namespace (anche i resolver annidati)
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for namespace in resolver.namespace_dict:
+        resolver.namespace_dict[namespace][1].reverse_dict
+
+    for model in apps.get_models():
+        model._meta.get_fields()
+
+    views = serializers = 0
+    seen = set()
+    for callback in iter_views(resolver.url_patterns):
+        view_class = getattr(callback, "cls", None)
+        if view_class is None or view_class in seen:
+            continue
+        seen.add(view_class)
+        views += 1
+        view = view_class(**getattr(callback, "initkwargs", {}))
+        # Istanziare le classi di autenticazione/permessi legge api_settings
+        view.get_authenticators()
+        view.get_permissions()
+        if hasattr(view, "get_serializer_class"):
+            # get_serializer_class: le view di simplejwt importano il serializer
+            # da una stringa nei settings. .fields costruisce i campi del
+            # ModelSerializer dai metadati del model.
+            view.get_serializer_class()(context={"view": view}).fields
+            serializers += 1
+
+    # Letto dal file committato in produzione, generato in sviluppo
+    load_schema()
+
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.gettext("This field is required.")
+    translation.deactivate()
+
+    stats = {"views": views, "serializers": serializers, "ms": round((time.perf_counter() - started) * 1000, 1)}
+    logger.info("Warm-up: %(views)s views, %(serializers)s serializers in %(ms)s ms", stats)
+    return stats
@@ -0,0 +1,50 @@
+"""Dispatcher dell'outbox: pubblica su Celery i task scritti dalle request.
+
+Uso:
+    python manage.py dispatch_outbox            # loop continuo (servizio)
+    python manage.py dispatch_outbox --once     # svuota la coda ed esce
+
+Si possono avviare più dispatcher in parallelo (docker compose
+--scale outbox_dispatcher=N): FOR UPDATE SKIP LOCKED li fa lavorare
+su righe diverse.
+"""
+
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from outbox.services import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = "Publish committed outbox messages to the Celery broker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the outbox and exit.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Rows claimed per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"] or settings.OUTBOX_BATCH_SIZE
+        self.running = True
+        if not options["once"]:
+            # SIGTERM (docker stop): finisce il lotto in corso, poi esce
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        total = 0
+        while self.running:
+            published, failed = dispatch_batch(batch_size)
+            total += published
+            if published + failed == batch_size:
+                # Lotto pieno: probabilmente ci sono altre righe, niente pausa
+                continue
+            if options["once"]:
+                break
+            time.sleep(settings.OUTBOX_POLL_INTERVAL)
+
+        self.stdout.write(f"Published {total} outbox messages.")
+
+    def stop(self, signum, frame):
+        self.running = False
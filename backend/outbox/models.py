@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """A Celery task waiting to be published to the broker.
+
+    Written in the same transaction as the business change that causes it
+    (transactional outbox): if the transaction rolls back the message
+    disappears with it, if it commits the message survives a broker outage.
+    The dispatcher (`manage.py dispatch_outbox`) publishes committed rows to
+    Celery and deletes them.
+
+    SQL analogy: una tabella coda di Service Broker scritta nella stessa
+    transazione dell'INSERT, svuotata da un processo esterno con
+    SELECT ... WITH (READPAST, UPDLOCK).
+    """
+
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["available_at", "id"], name="outbox_available_idx")]
+
+    def __str__(self):
+        return f"{self.task}{tuple(self.args)}"
@@ -0,0 +1,136 @@
+"""Transactional outbox: scrittura e pubblicazione dei messaggi.
+
+Il problema: `task.delay()` dentro una request parla subito con Redis.
+Se il broker è lento la request aspetta, se è giù il task si perde
+(oppure parte per una transazione poi annullata).
+
+La soluzione: la request scrive il task in OutboxMessage, nella stessa
+transazione dei dati di business (un INSERT in più, nessuna rete).
+Uno o più processi dispatcher (`manage.py dispatch_outbox`) leggono le
+righe committate e le pubblicano su Celery.
+
+Garanzia: at-least-once. Se il dispatcher cade dopo la pubblicazione ma
+prima del COMMIT, la riga verrà ripubblicata: i task devono essere
+idempotenti. L'email di benvenuto controlla Employee.welcome_email_sent_at
+(scritto nella transazione dell'invio, con la riga bloccata), il dispatch
+a lotti cancella le righe di PendingWelcomeEmail già inviate, la
+propagazione dei template usa ON CONFLICT DO NOTHING.
+
+SQL analogy: Service Broker con la coda nello stesso database —
+SEND ON CONVERSATION fa parte della transazione dell'INSERT.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Backoff massimo (secondi) tra due tentativi di pubblicazione della stessa riga
+MAX_RETRY_DELAY = 300
+
+
+def celery_app():
+    """L'app Celery del progetto, importata al primo uso invece che all'avvio di Django.
+
+    Va caricata prima di pubblicare: i task definiti con @shared_task
+    usano l'app "corrente", che senza questo import sarebbe un'app Celery
+    di default senza la configurazione CELERY_* dei settings.
+    """
+    from minijet.celery import app
+
+    return app
+
+
+def enqueue(task, args=(), kwargs=None, countdown=0):
+    """Accoda un task Celery nell'outbox, nella transazione corrente.
+
+    Stessa firma di task.apply_async(args, kwargs, countdown): si passa il
+    task (non il nome) così un refactoring che lo rinomina non lascia
+    stringhe orfane. Gli argomenti devono essere JSON-serializzabili
+    (PK, non oggetti), come per .delay().
+
+    Con OUTBOX_ALWAYS_EAGER (solo test) il task viene pubblicato subito.
+
+    Returns:
+        OutboxMessage | None: la riga creata (None in modalità eager).
+    """
+    if settings.OUTBOX_ALWAYS_EAGER:
+        celery_app()
+        task.apply_async(args=args, kwargs=kwargs, countdown=countdown)
+        return None
+
+    return OutboxMessage.objects.create(
+        task=task.name,
+        args=list(args),
+        kwargs=kwargs or {},
+        available_at=timezone.now() + timedelta(seconds=countdown),
+    )
+
+
+def publish(message):
+    """Pubblica una riga dell'outbox sul broker Celery."""
+    app = celery_app()
+    task = app.tasks.get(message.task)
+    if task is None:
+        # Task non importato in questo processo: lo pubblichiamo per nome,
+        # il worker che lo conosce lo eseguirà.
+        app.send_task(message.task, args=message.args, kwargs=message.kwargs)
+    else:
+        task.apply_async(args=message.args, kwargs=message.kwargs)
+
+
+def dispatch_batch(batch_size=None):
+    """Reclama un lotto di righe scadute, le pubblica e le cancella.
+
+    SQL equivalente:
+        BEGIN;
+        SELECT * FROM outbox_outboxmessage
+        WHERE available_at <= now()
+        ORDER BY id LIMIT @batch_size
+        FOR UPDATE SKIP LOCKED;
+        -- pubblica su Redis
+        DELETE FROM outbox_outboxmessage WHERE id IN (...pubblicati);
+        COMMIT;
+
+    SKIP LOCKED: i dispatcher in parallelo si dividono le righe invece di
+    aspettarsi a vicenda, quindi il throughput cresce con il loro numero.
+    Una riga che non si riesce a pubblicare resta in tabella con backoff
+    esponenziale (available_at nel futuro) e non blocca le altre.
+
+    Args:
+        batch_size: righe per transazione (default OUTBOX_BATCH_SIZE).
+
+    Returns:
+        tuple: (pubblicate, fallite).
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True).filter(available_at__lte=now).order_by("id")[:batch_size]
+        )
+
+        published_ids, failed = [], []
+        for message in messages:
+            try:
+                publish(message)
+            except Exception as exc:
+                message.attempts += 1
+                message.last_error = str(exc)
+                message.available_at = now + timedelta(seconds=min(2**message.attempts, MAX_RETRY_DELAY))
+                failed.append(message)
+                logger.warning("Outbox message %s (%s) not published: %s", message.pk, message.task, exc)
+            else:
+                published_ids.append(message.pk)
+
+        OutboxMessage.objects.filter(pk__in=published_ids).delete()
+        OutboxMessage.objects.bulk_update(failed, ["attempts", "last_error", "available_at"])
+
+    return len(published_ids), len(failed)
@@ -0,0 +1,127 @@
+"""Tests for the transactional outbox.
+
+OUTBOX_ALWAYS_EAGER è attivo in conftest.py per tutti i test: qui lo
+spegniamo, così enqueue() scrive davvero in tabella.
+
+SQL analogy: verifichiamo che la coda di Service Broker segua la
+transazione (ROLLBACK = messaggio mai esistito) e che il processo che
+la svuota cancelli solo ciò che ha consegnato.
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from celery import shared_task
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .services import celery_app, dispatch_batch, enqueue
+
+calls = []
+
+
+@shared_task
+def record_call(value, extra=None):
+    calls.append((value, extra))
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        calls.clear()
+        # In setUp, non sulla classe: il fixture autouse di conftest viene applicato dopo i decorator di classe
+        outbox_settings = override_settings(OUTBOX_ALWAYS_EAGER=False)
+        outbox_settings.enable()
+        self.addCleanup(outbox_settings.disable)
+
+    def test_enqueue_writes_row_instead_of_publishing(self):
+        with patch.object(record_call, "apply_async") as mock_apply:
+            enqueue(record_call, args=[1], kwargs={"extra": "x"})
+            mock_apply.assert_not_called()
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.task, record_call.name)
+        self.assertEqual((message.args, message.kwargs), ([1], {"extra": "x"}))
+
+    def test_rolled_back_transaction_drops_message(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue(record_call, args=[1])
+                raise RuntimeError("request failed")
+
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_countdown_delays_availability(self):
+        enqueue(record_call, args=[1], countdown=60)
+
+        self.assertEqual(dispatch_batch(), (0, 0))
+        self.assertEqual(calls, [])
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_dispatch_publishes_and_deletes(self):
+        enqueue(record_call, args=[1])
+        enqueue(record_call, args=[2], kwargs={"extra": "y"})
+
+        self.assertEqual(dispatch_batch(), (2, 0))
+        self.assertEqual(calls, [(1, None), (2, "y")])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_dispatch_claims_rows_with_skip_locked(self):
+        enqueue(record_call, args=[1])
+
+        with CaptureQueriesContext(connection) as ctx:
+            dispatch_batch()
+
+        self.assertTrue(any("FOR UPDATE SKIP LOCKED" in q["sql"] for q in ctx.captured_queries))
+
+    def test_dispatch_respects_batch_size(self):
+        for i in range(3):
+            enqueue(record_call, args=[i])
+
+        self.assertEqual(dispatch_batch(batch_size=2), (2, 0))
+        self.assertEqual(OutboxMessage.objects.get().args, [2])
+
+    def test_failed_publish_is_kept_with_backoff(self):
+        enqueue(record_call, args=[1])
+        enqueue(record_call, args=[2])
+
+        original = record_call.apply_async
+
+        def broker_down_for_first(args=None, kwargs=None, **options):
+            if args == [1]:
+                raise ConnectionError("Redis down")
+            return original(args=args, kwargs=kwargs, **options)
+
+        with patch.object(record_call, "apply_async", side_effect=broker_down_for_first):
+            self.assertEqual(dispatch_batch(), (1, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.args, [1])
+        self.assertEqual(message.attempts, 1)
+        self.assertIn("Redis down", message.last_error)
+        self.assertGreater(message.available_at, timezone.now())
+        self.assertEqual(calls, [(2, None)])
+
+    def test_unknown_task_is_sent_by_name(self):
+        OutboxMessage.objects.create(task="reports.tasks.not_imported_here", args=[7])
+
+        with patch.object(celery_app(), "send_task") as mock_send:
+            self.assertEqual(dispatch_batch(), (1, 0))
+
+        mock_send.assert_called_once_with("reports.tasks.not_imported_here", args=[7], kwargs={})
+
+    def test_command_once_drains_the_outbox(self):
+        for i in range(5):
+            enqueue(record_call, args=[i])
+        OutboxMessage.objects.create(task=record_call.name, args=[99], available_at=timezone.now() + timedelta(hours=1))
+
+        out = StringIO()
+        call_command("dispatch_outbox", "--once", "--batch-size", "2", stdout=out)
+
+        self.assertIn("Published 5", out.getvalue())
+        self.assertEqual([value for value, _ in calls], [0, 1, 2, 3, 4])
+        self.assertEqual(OutboxMessage.objects.get().args, [99])
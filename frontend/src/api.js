@@ -39,6 +39,64 @@ async function apiRequest(endpoint, options = {}) {
   throw new Error(`HTTP ${response.status}`)
 }
 
+// ===================== Batch delle GET =====================
+
+// Path dell'API sul server (es. "/api"): le sotto-request del batch usano path assoluti
+const API_PATH = new URL(API_BASE, window.location.origin).pathname.replace(/\/$/, '')
+
+// GET accodate nel tick corrente, in attesa di partire insieme
+let pendingGets = null
+
+/**
+ * Risultato di una sotto-request del batch, con le stesse regole di apiRequest:
+ * 2xx → { data }, 400 → { error }, 204 → { data: null }, altro → errore.
+ */
+function settle({ resolve, reject }, status, body) {
+  if (status === 204) resolve({ data: null, error: null, status })
+  else if (status >= 200 && status < 300) resolve({ data: body, error: null, status })
+  else if (status === 400) resolve({ data: null, error: body, status })
+  else reject(new Error(`HTTP ${status}`))
+}
+
+async function flushGets() {
+  const queued = pendingGets
+  pendingGets = null
+
+  // Una sola GET: request normale, il batch non farebbe risparmiare nulla
+  if (queued.length === 1) {
+    apiRequest(queued[0].endpoint).then(queued[0].resolve, queued[0].reject)
+    return
+  }
+
+  try {
+    const result = await apiRequest('/batch/', {
+      method: 'POST',
+      body: JSON.stringify({
+        requests: queued.map(({ endpoint }) => ({ method: 'GET', path: `${API_PATH}${endpoint}` })),
+      }),
+    })
+    result.data.responses.forEach(({ status, body }, index) => settle(queued[index], status, body))
+  } catch (err) {
+    queued.forEach(({ reject }) => reject(err))
+  }
+}
+
+/**
+ * GET con lo stesso risultato di apiRequest, ma le chiamate fatte nello
+ * stesso tick (es. dentro un Promise.all) partono in un solo POST /batch/:
+ * un round trip e una verifica del token invece di uno per chiamata.
+ */
+function batchedGet(endpoint) {
+  return new Promise((resolve, reject) => {
+    if (!pendingGets) {
+      pendingGets = []
+      // Dopo il codice sincrono corrente: raccoglie tutte le GET del Promise.all
+      queueMicrotask(flushGets)
+    }
+    pendingGets.push({ endpoint, resolve, reject })
+  })
+}
+
 // --- GET (lista paginata) — usato da EmployeeList ---
 export async function fetchAPI(endpoint) {
   const response = await fetch(`${API_BASE}${endpoint}`)
@@ -48,7 +106,7 @@ export async function fetchAPI(endpoint) {
 
 // --- GET singolo dipendente ---
 export function fetchEmployee(id) {
-  return apiRequest(`/employees/${id}/`)
+  return batchedGet(`/employees/${id}/`)
 }
 
 // --- POST nuovo dipendente ---
@@ -78,13 +136,13 @@ export function deleteEmployee(id) {
 export function fetchContract(employeeId, contractId) {
   if (!employeeId) throw new Error('Employee ID is required')
   if (!contractId) throw new Error('Contract ID is required')
-  return apiRequest(`/employees/${employeeId}/contracts/${contractId}/`)
+  return batchedGet(`/employees/${employeeId}/contracts/${contractId}/`)
 }
 
 // --- GET contratti di un dipendente ---
 export function fetchContracts(employeeId) {
   if (!employeeId) throw new Error('Employee ID is required')
-  return apiRequest(`/employees/${employeeId}/contracts/`)
+  return batchedGet(`/employees/${employeeId}/contracts/`)
 }
 
 /**
@@ -173,7 +231,7 @@ export function deleteOnboardingTemplate(id) {
 // --- GET step di onboarding per un dipendente ---
 export function fetchOnboardingSteps(employeeId) {
   if (!employeeId) throw new Error('Employee ID is required')
-  return apiRequest(`/employees/${employeeId}/onboarding/`)
+  return batchedGet(`/employees/${employeeId}/onboarding/`)
 }
 
 // --- POST avvia onboarding (bulk create da template attivi, no body) ---